@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la API: latencia y throughput de las operaciones de RSVP
+
+Para cada tamaño de datos (confirmaciones precargadas) levanta la app con un
+data/ temporal y un SMTP falso local (fake_smtp.py), y mide con clientes
+concurrentes:
+  - create:  POST /api/confirmations
+  - list:    GET /api/confirmations?limit=50 (misma página: caché con ETag)
+  - search:  GET /api/confirmations?name=... (una búsqueda distinta por solicitud)
+  - lookup:  GET /confirmation/{folio}
+  - send_pass_email: POST /api/send-pass-email (encolar) y el tiempo hasta
+    que el SMTP falso recibe todos los emails (pase generado en el servidor)
+  - delete:  DELETE /api/confirmations/{folio} (las confirmaciones creadas)
+
+Modos:
+  - inprocess: httpx con ASGITransport contra main.app (sin red), en un
+    proceso hijo por tamaño.
+  - uvicorn: main.app servido por uvicorn en otro proceso; los clientes van
+    por HTTP local. Con pocos núcleos, cliente y servidor compiten por CPU.
+
+Reporta p50/p95/p99, promedio y solicitudes por segundo, y guarda todo en
+JSON para comparar corridas (--compare resultados_anteriores.json).
+
+Uso:
+    python bench_api.py [--mode both|inprocess|uvicorn] [--sizes 0,1000,10000]
+                        [--requests 500] [--concurrency 16] [--emails 50]
+                        [--output bench_api.json] [--compare anterior.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from fake_smtp import FakeSMTPServer
+
+SCENARIOS = ("create", "list", "search", "lookup", "send_pass_email", "delete")
+
+# main.app servido por uvicorn con EmailService apuntando al SMTP falso
+# (aunque exista email_config.py)
+SERVER_CODE = """
+import sys, uvicorn, main
+main.email_service.smtp_server = "127.0.0.1"
+main.email_service.smtp_port = int(sys.argv[2])
+main.email_service.use_tls = False
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def make_record(i: int) -> dict:
+    folio = f"UP-20251101-{i:08X}"
+    return {
+        "folio": folio,
+        "name": f"Invitado Número {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 4 != 0,
+        "guests": i % 3,
+        "phone": f"+52 33 {i:08d}",
+        "comments": None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+        "qr_url": f"http://localhost:8000/confirmation/{folio}",
+    }
+
+
+async def preload(store, size: int):
+    for start in range(0, size, 5000):
+        await asyncio.gather(*(store.add(make_record(i)) for i in range(start, min(start + 5000, size))))
+
+
+# ----------------------------------------------------------------------
+# Medición
+# ----------------------------------------------------------------------
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (values ya ordenados)"""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+async def measure(requests: int, concurrency: int,
+                  send: Callable[[int], Awaitable[httpx.Response]], expected: tuple) -> dict:
+    """requests solicitudes repartidas entre concurrency clientes"""
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for i in pending:
+            started = time.perf_counter()
+            try:
+                ok = (await send(i)).status_code in expected
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def wait_for_messages(smtp: FakeSMTPServer, target: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while smtp.messages < target:
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def run_scenarios(client: httpx.AsyncClient, size: int, args, smtp: FakeSMTPServer) -> dict:
+    results: Dict[str, dict] = {}
+    created: List[str] = []
+    recipients: Dict[str, str] = {}  # folio -> correo registrado (send-pass-email lo exige)
+
+    async def create(i: int) -> httpx.Response:
+        email = f"bench{size}-{i}@email.com"
+        response = await client.post("/api/confirmations", json={
+            "name": f"Bench {i}", "email": email, "will_attend": True,
+            "guests": i % 3, "phone": f"+52 55 {size:04d}{i:06d}",
+        })
+        if response.status_code == 201:
+            created.append(response.json()["folio"])
+            recipients[created[-1]] = email
+        return response
+
+    results["create"] = await measure(args.requests, args.concurrency, create, (201,))
+    seeded = [make_record(i) for i in range(min(size, 1000))]
+    recipients.update((record["folio"], record["email"]) for record in seeded)
+    folios = [record["folio"] for record in seeded] + created
+
+    results["list"] = await measure(
+        args.requests, args.concurrency,
+        lambda i: client.get("/api/confirmations", params={"limit": 50, "sort": "name", "order": "asc"}), (200,))
+    results["search"] = await measure(
+        args.requests, args.concurrency,
+        lambda i: client.get("/api/confirmations", params={"limit": 50, "name": f"Número {i}"}), (200,))
+    results["lookup"] = await measure(
+        args.requests, args.concurrency,
+        lambda i: client.get(f"/confirmation/{folios[i % len(folios)]}"), (200,))
+
+    # Encolar los emails y esperar a que el SMTP falso los reciba todos
+    emails = min(args.emails, len(folios))
+    baseline = smtp.messages
+    started = time.perf_counter()
+    results["send_pass_email"] = await measure(
+        emails, args.concurrency,
+        lambda i: client.post("/api/send-pass-email", json={
+            "email": recipients[folios[i]], "name": f"Bench {i}", "folio": folios[i]}), (202,))
+    delivered = await wait_for_messages(smtp, baseline + emails, args.email_timeout)
+    delivery = time.perf_counter() - started
+    results["send_pass_email"].update({
+        "delivered": smtp.messages - baseline,
+        "delivery_seconds": round(delivery, 3),
+        "emails_per_second": round((smtp.messages - baseline) / delivery, 1) if delivered else None,
+    })
+
+    results["delete"] = await measure(
+        len(created), args.concurrency,
+        lambda i: client.delete(f"/api/confirmations/{created[i]}"), (200,))
+    return results
+
+
+# ----------------------------------------------------------------------
+# Modos
+# ----------------------------------------------------------------------
+async def inprocess_child(args):
+    """Se ejecuta en un proceso hijo: importa main con un data/ nuevo"""
+    smtp = FakeSMTPServer().start()
+    import main
+
+    main.email_service.smtp_server = "127.0.0.1"
+    main.email_service.smtp_port = smtp.port
+    main.email_service.use_tls = False
+    try:
+        async with main.lifespan(main.app):
+            await preload(main.confirmation_store, args.size)
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                results = await run_scenarios(client, args.size, args, smtp)
+    finally:
+        smtp.stop()
+    with open(args.child_output, 'w', encoding='utf-8') as f:
+        json.dump(results, f)
+
+
+def common_flags(args) -> List[str]:
+    return ["--requests", str(args.requests), "--concurrency", str(args.concurrency),
+            "--emails", str(args.emails), "--email-timeout", str(args.email_timeout)]
+
+
+def server_env(data_dir: str) -> dict:
+    """Entorno del servidor medido: datos propios y sin límites por IP (todo sale de 127.0.0.1)"""
+    env = dict(os.environ, DATA_DIR=data_dir, RATE_LIMIT_ENABLED="false")
+    env.pop("DATABASE_URL", None)
+    return env
+
+
+def run_inprocess(size: int, args, data_dir: str) -> dict:
+    output = os.path.join(data_dir, "results.json")
+    env = server_env(data_dir)
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--size", str(size),
+         "--child-output", output, *common_flags(args)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, check=True,
+    )
+    with open(output, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_uvicorn(size: int, args, data_dir: str) -> dict:
+    from confirmation_store import ConfirmationStore
+
+    store = ConfirmationStore(data_dir, fsync=False)
+    asyncio.run(preload(store, size))
+    store.close()
+
+    smtp = FakeSMTPServer().start()
+    port = free_port()
+    env = server_env(data_dir)
+    server = subprocess.Popen([sys.executable, "-c", SERVER_CODE, str(port), str(smtp.port)],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"{base_url}/test", timeout=1)
+                break
+            except httpx.HTTPError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn no arrancó")
+                time.sleep(0.2)
+
+        async def run():
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+                return await run_scenarios(client, size, args, smtp)
+
+        return asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        smtp.stop()
+
+
+# ----------------------------------------------------------------------
+# Reporte
+# ----------------------------------------------------------------------
+def print_run(run: dict):
+    print(f"\n🧪 {run['mode']}: {run['size']} confirmaciones precargadas")
+    print("=" * 70)
+    print(f"   {'':17}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>10}{'errores':>9}")
+    for name in SCENARIOS:
+        result = run["scenarios"][name]
+        print(f"   {name:<17}{result['p50_ms']:7.2f}ms{result['p95_ms']:7.2f}ms{result['p99_ms']:7.2f}ms"
+              f"{result['rps']:10.1f}{result['errors']:9d}")
+    emails = run["scenarios"]["send_pass_email"]
+    rate = f"{emails['emails_per_second']} emails/s" if emails["emails_per_second"] else "incompleto"
+    print(f"   📧 {emails['delivered']} emails entregados en {emails['delivery_seconds']} s ({rate})")
+    print("=" * 70)
+
+
+def print_comparison(previous: dict, current: dict):
+    before = {(run["mode"], run["size"]): run["scenarios"] for run in previous.get("runs", [])}
+    print(f"\n📊 Comparación con {previous.get('meta', {}).get('started_at', 'la corrida anterior')}")
+    print("=" * 70)
+    print(f"   {'':28}{'p95 antes':>11}{'p95 ahora':>11}{'req/s':>15}")
+    for run in current["runs"]:
+        old = before.get((run["mode"], run["size"]))
+        if old is None:
+            continue
+        for name in SCENARIOS:
+            if name not in old:
+                continue
+            a, b = old[name], run["scenarios"][name]
+            label = f"{run['mode']}/{run['size']}/{name}"
+            print(f"   {label:<28}{a['p95_ms']:9.2f}ms{b['p95_ms']:9.2f}ms"
+                  f"{a['rps']:7.0f} → {b['rps']:<6.0f}")
+    print("=" * 70)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la API de confirmaciones")
+    parser.add_argument("--mode", choices=("both", "inprocess", "uvicorn"), default="both")
+    parser.add_argument("--sizes", default="0,1000,10000", help="confirmaciones precargadas, separadas por coma")
+    parser.add_argument("--requests", type=int, default=500, help="solicitudes por escenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--emails", type=int, default=50, help="emails de send_pass_email")
+    parser.add_argument("--email-timeout", type=float, default=120.0)
+    parser.add_argument("--output", default=f"bench_api_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    # Uso interno: corrida en proceso dentro de un hijo
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(inprocess_child(args))
+        return
+
+    import fast_json
+
+    modes = ("inprocess", "uvicorn") if args.mode == "both" else (args.mode,)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "json_backend": fast_json.backend,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "emails": args.emails,
+        },
+        "runs": [],
+    }
+    print(f"🚀 Benchmark de la API: {', '.join(modes)}; tamaños {sizes}; "
+          f"{args.requests} solicitudes x {args.concurrency} clientes")
+
+    for mode in modes:
+        for size in sizes:
+            data_dir = tempfile.mkdtemp(prefix=f"bench_api_{mode}_")
+            try:
+                runner = run_inprocess if mode == "inprocess" else run_uvicorn
+                run = {"mode": mode, "size": size, "scenarios": runner(size, args, data_dir)}
+            finally:
+                shutil.rmtree(data_dir, ignore_errors=True)
+            report["runs"].append(run)
+            print_run(run)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
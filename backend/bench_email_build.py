@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de armado de emails a escala de campaña
+
+Compara, por mensaje:
+  1. HTML con el f-string original vs plantilla precompilada (con escape).
+  2. build_confirmation_message + as_bytes() (paquete email, lo que hacía
+     smtplib.send_message) vs build_confirmation_bytes (esqueleto precompilado).
+  3. Reenvío a los mismos invitados (HTML codificado desde el caché).
+
+Uso:
+    python bench_email_build.py [--guests 5000] [--with-pass]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import email_service as email_service_module
+from email_service import EmailService
+
+
+def guests(count: int):
+    return [
+        (f"invitado{i}@email.com", f"Invitado Número {i}", {
+            "email": f"invitado{i}@email.com",
+            "attending": True,
+            "companions": i % 3,
+            "whatsapp": f"+52 33 {i:08d}",
+            "confirmed_at": "01/11/2025 10:00",
+        })
+        for i in range(count)
+    ]
+
+
+def legacy_html(guest_name: str, event_details: dict) -> str:
+    # Mismo costo que el f-string anterior: documento completo en cada llamada
+    return f"""<html><head><style>body {{ font-family: Arial; }}</style></head><body>
+    <p>Estimado/a <strong>{guest_name}</strong>,</p>
+    <strong>Email:</strong> {event_details.get('email', 'No especificado')}
+    <strong>Asistencia:</strong> {'SÍ ASISTIRÉ' if event_details.get('attending') else 'NO ASISTIRÉ'}
+    <strong>Acompañantes:</strong> {event_details.get('companions', 0)}
+    <strong>WhatsApp:</strong> {event_details.get('whatsapp', 'No especificado')}
+    <strong>Confirmado:</strong> {event_details.get('confirmed_at', 'Ahora')}
+    </body></html>""" * 6
+
+
+def timed(label: str, fn, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(*item)
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<46} {elapsed / len(items) * 1e6:9.1f} µs/msg  ({len(items) / elapsed:10.0f} msg/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de armado de emails")
+    parser.add_argument("--guests", type=int, default=5000)
+    parser.add_argument("--with-pass", action="store_true", help="Adjuntar un pase de ~75 KB")
+    args = parser.parse_args()
+
+    service = EmailService()
+    pass_image = None
+    if args.with_pass:
+        from pass_generator import pass_generator
+        pass_image = base64.b64encode(pass_generator.render_png("Invitado", "UP-BENCH")).decode('ascii')
+
+    items = guests(args.guests)
+    # Sin los prints de "📎 Pase adjuntado" en la medición
+    email_service_module.print = lambda *a, **k: None
+
+    print(f"🧪 Armado de emails: {args.guests} invitados{' con pase adjunto' if pass_image else ''}")
+    print("=" * 80)
+
+    print("HTML:")
+    timed("f-string por mensaje", lambda to, name, details: legacy_html(name, details), items)
+    timed("plantilla precompilada + escape", lambda to, name, details: service._create_email_html(name, details), items)
+
+    print("Mensaje completo (listo para SMTP):")
+    mime = timed(
+        "MIMEMultipart + as_bytes()",
+        lambda to, name, details: service.build_confirmation_message(to, name, details, pass_image).as_bytes(),
+        items,
+    )
+    email_service_module._encoded_confirmation_html.cache_clear()
+    skeleton = timed(
+        "esqueleto precompilado (primer envío)",
+        lambda to, name, details: service.build_confirmation_bytes(to, name, details, pass_image),
+        items,
+    )
+    # Reenvío a tantos invitados como caben en el caché (EMAIL_HTML_CACHE_SIZE)
+    cached = items[:email_service_module.HTML_CACHE_SIZE]
+    for to, name, details in cached:
+        service.build_confirmation_bytes(to, name, details, pass_image)
+    resend = timed(
+        f"esqueleto precompilado (reenvío de {len(cached)}, caché)",
+        lambda to, name, details: service.build_confirmation_bytes(to, name, details, pass_image),
+        cached,
+    ) * len(items) / len(cached)
+    print(f"\n⚡ Primer envío: {mime / skeleton:.1f}x más rápido | reenvío: {mime / resend:.1f}x")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
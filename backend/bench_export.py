@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria de la exportación de confirmaciones
+
+Compara el pico de memoria (tracemalloc) de:
+  1. La lista completa en JSON (lo que descargaba el panel para armar el CSV).
+  2. GET /api/confirmations/export: CSV, CSV con gzip y XLSX en streaming.
+
+Uso:
+    python bench_export.py [--records 100000]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fast_json
+from confirmation_export import gzip_stream, iter_confirmations, stream_csv, stream_xlsx
+from confirmation_store import ConfirmationStore
+
+
+def make_record(i: int) -> dict:
+    return {
+        "folio": f"UP-20251101-{i:08X}",
+        "name": f"Invitado Número {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 4 != 0,
+        "guests": i % 3,
+        "phone": f"+52 33 {i:08d}",
+        "comments": "Nos vemos ahí" if i % 10 == 0 else None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+        "qr_url": f"http://localhost:8000/confirmation/UP-20251101-{i:08X}",
+    }
+
+
+def measure(label: str, produce):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+    for chunk in produce():
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {label:<28} {size / 1024 / 1024:8.1f} MB  pico {peak / 1024 / 1024:8.2f} MB  {elapsed:6.2f} s")
+
+
+async def fill(store: ConfirmationStore, count: int):
+    for start in range(0, count, 5000):
+        await asyncio.gather(*(store.add(make_record(i)) for i in range(start, min(start + 5000, count))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria de la exportación de confirmaciones")
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        store = ConfirmationStore(directory, fsync=False)
+        asyncio.run(fill(store, args.records))
+
+        print(f"🧪 Exportación de {args.records} confirmaciones")
+        print("=" * 70)
+        measure("Lista completa en JSON", lambda: [fast_json.dumps(store.all())])
+        measure("CSV (streaming)", lambda: stream_csv(iter_confirmations(store)))
+        measure("CSV + gzip (streaming)", lambda: gzip_stream(stream_csv(iter_confirmations(store))))
+        measure("XLSX (streaming)", lambda: stream_xlsx(iter_confirmations(store)))
+        print("=" * 70)
+        store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark de búsqueda por folio (GET /confirmation/{folio})
+
+Compara la búsqueda en el índice en memoria de ConfirmationStore contra el
+método anterior (json.load del archivo completo + búsqueda lineal) con 1k, 10k
+y 100k confirmaciones.
+
+Uso:
+    python bench_folio_lookup.py [--sizes 1000 10000 100000] [--lookups 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from confirmation_store import ConfirmationStore
+
+
+def make_record(i: int) -> dict:
+    folio = f"UP-20251101-{i:08X}"
+    return {
+        "folio": folio,
+        "name": f"Invitado {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 3 != 0,
+        "guests": i % 4,
+        "phone": f"+52 33 {i:08d}",
+        "comments": None,
+        "privacy_accept": True,
+        "timestamp": "2025-11-01T10:00:00",
+        "qr_url": f"http://localhost:8000/confirmation/{folio}",
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_store(data_dir: str, folios, lookups: int):
+    store = ConfirmationStore(data_dir)
+    started = time.perf_counter()
+    store.open()
+    load_time = time.perf_counter() - started
+
+    samples = []
+    for _ in range(lookups):
+        folio = random.choice(folios)
+        t0 = time.perf_counter()
+        store.get(folio)
+        samples.append(time.perf_counter() - t0)
+    store.close()
+    return load_time, samples
+
+
+def bench_legacy(legacy_file: str, folios, lookups: int):
+    samples = []
+    for _ in range(lookups):
+        folio = random.choice(folios)
+        t0 = time.perf_counter()
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            confirmations = json.load(f)
+        for conf in confirmations:
+            if conf['folio'] == folio:
+                break
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda por folio")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--legacy-lookups", type=int, default=20,
+                        help="búsquedas con el método anterior (es lento)")
+    args = parser.parse_args()
+
+    print("🧪 Benchmark de búsqueda por folio")
+    print("=" * 70)
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            records = [make_record(i) for i in range(size)]
+            folios = [r["folio"] for r in records]
+
+            # Log append-only con todos los registros (un solo commit)
+            store = ConfirmationStore(data_dir, fsync=False)
+            store.commit([{"op": "put", "data": r} for r in records])
+            store.close()
+
+            # Archivo con el formato anterior para comparar
+            legacy_file = os.path.join(data_dir, "legacy.json")
+            with open(legacy_file, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+
+            load_time, samples = bench_store(data_dir, folios, args.lookups)
+            legacy = bench_legacy(legacy_file, folios, args.legacy_lookups)
+
+        print(f"\n📊 {size:,} confirmaciones")
+        print(f"   Carga inicial del índice: {load_time * 1000:.1f} ms")
+        print(f"   Índice en memoria  p50={percentile(samples, 50) * 1e6:8.2f} µs   "
+              f"p99={percentile(samples, 99) * 1e6:8.2f} µs")
+        print(f"   Lectura + scan     p50={percentile(legacy, 50) * 1e6:8.0f} µs   "
+              f"p99={percentile(legacy, 99) * 1e6:8.0f} µs")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
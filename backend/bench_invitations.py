@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark del registro de invitaciones
+
+Con un CSV de N invitados (como el que se exporta de la hoja de cálculo) mide:
+  1. Validar renglón por renglón con EmailStr (email_validator completo en
+     cada correo) vs por lotes con el dominio validado una sola vez (lo que
+     hace la importación). Los correos usan una mezcla de dominios comunes y
+     algunos poco repetidos, como una lista real.
+  2. La importación completa (leer, validar, indexar y guardar).
+  3. Buscar la invitación de un RSVP: recorriendo la lista vs los índices por
+     código y por correo.
+
+Uso:
+    python bench_invitations.py [--invitations 50000] [--lookups 10000]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pydantic import EmailStr
+
+from invitation_registry import InvitationRegistry, InvitationRow, normalize_email
+
+DOMAINS = ["gmail.com", "hotmail.com", "outlook.com", "yahoo.com.mx", "icloud.com", "up.edu.mx"]
+
+
+class EmailStrRow(InvitationRow):
+    """El renglón como se validaría con EmailStr"""
+    email: EmailStr
+
+
+def make_csv(count: int) -> str:
+    lines = ["codigo,nombre,correo,telefono,acompanantes"]
+    for i in range(count):
+        # 1 de cada 20 con un dominio propio (empresa, despacho...)
+        domain = f"empresa{i}.com.mx" if i % 20 == 0 else DOMAINS[i % len(DOMAINS)]
+        lines.append(f"INV-{i:06d},Invitado Número {i},invitado{i}@{domain},+52 33 {i:08d},{i % 4}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de invitaciones")
+    parser.add_argument("--invitations", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    text = make_csv(args.invitations)
+    print(f"🧪 {args.invitations} invitaciones ({len(text) / 1024 / 1024:.1f} MB de CSV)")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = InvitationRegistry(os.path.join(tmp, "invitations.json"))
+
+        rows = [dict(zip(("code", "name", "email", "phone", "max_guests"), line.split(",")))
+                for line in text.splitlines()[1:]]
+        started = time.perf_counter()
+        for row in rows:
+            EmailStrRow.model_validate(row)
+        per_row = time.perf_counter() - started
+        print(f"   por renglón (EmailStr)   {per_row:8.2f} s")
+
+        started = time.perf_counter()
+        summary = registry.import_csv(io.StringIO(text), dry_run=True)
+        batched = time.perf_counter() - started
+        print(f"   por lotes (dominio 1 vez){batched:8.2f} s   ({per_row / batched:.1f}x)")
+
+        started = time.perf_counter()
+        summary = registry.import_csv(io.StringIO(text))
+        elapsed = time.perf_counter() - started
+        print(f"   importación completa     {elapsed:8.2f} s   ({summary['created']} invitaciones,"
+              f" {args.invitations / elapsed:.0f}/s)")
+
+        invitations = list(registry._by_code.values())
+        emails = [f" {invitation.email.upper()} " for invitation in random.choices(invitations, k=args.lookups)]
+        scans = emails[:max(1, args.lookups // 100)]
+        started = time.perf_counter()
+        for email in scans:
+            wanted = normalize_email(email)
+            next(invitation for invitation in invitations if invitation.email == wanted)
+        scan = (time.perf_counter() - started) / len(scans)
+        started = time.perf_counter()
+        for email in emails:
+            registry.match(None, email)
+        indexed = (time.perf_counter() - started) / len(emails)
+        print(f"   buscar recorriendo       {scan * 1e6:8.1f} µs/RSVP")
+        print(f"   buscar en el índice      {indexed * 1e6:8.2f} µs/RSVP ({scan / indexed:.0f}x)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de JSON: biblioteca estándar vs modo rápido (orjson / msgspec)
+
+Con N confirmaciones mide, dentro del proceso (TestClient) y en cada modo:
+  - Listado: GET /api/confirmations completo y una página de 500.
+  - Búsqueda: GET /confirmation/{folio}.
+  - Alta: POST /api/confirmations (validación + línea en el log).
+  - Arranque: leer el log completo y reconstruir el índice.
+El caché de respuestas se vacía antes de cada lectura para medir la
+serialización y no el caché.
+
+Uso:
+    python bench_json.py [--records 20000] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+DATA_DIR = tempfile.mkdtemp(prefix="bench_json_")
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ.pop("DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import fast_json
+import main
+from confirmation_store import ConfirmationStore
+
+
+def make_record(i: int) -> dict:
+    folio = f"UP-20251101-{i:08X}"
+    return {
+        "folio": folio,
+        "name": f"Invitado Número {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 4 != 0,
+        "guests": i % 3,
+        "phone": f"+52 33 {i:08d}",
+        "comments": "¡Ahí nos vemos!" if i % 10 == 0 else None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+        "qr_url": f"http://localhost:8000/confirmation/{folio}",
+    }
+
+
+def timed(fn, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        fn(i)
+    return (time.perf_counter() - started) / requests
+
+
+def uncached_get(client: TestClient, url: str):
+    def get(_):
+        main.response_cache.clear()
+        client.get(url)
+    return get
+
+
+def run_mode(client: TestClient, mode: str, args, offset: int) -> dict:
+    fast_json.use(mode)
+    folio = make_record(args.records // 2)["folio"]
+    full_requests = max(5, args.requests // 20)
+    results = {
+        "Lista completa": timed(uncached_get(client, "/api/confirmations"), full_requests),
+        "Página de 500": timed(uncached_get(client, "/api/confirmations?limit=500&sort=name&order=asc"),
+                               args.requests),
+        "Búsqueda por folio": timed(uncached_get(client, f"/confirmation/{folio}"), args.requests),
+        "Alta": timed(lambda i: client.post("/api/confirmations", json={
+            "name": f"Nuevo {mode} {i}", "email": f"nuevo{offset + i}@email.com", "will_attend": True,
+            "guests": 1, "phone": f"{offset + i:010d}"}), args.requests),
+    }
+    started = time.perf_counter()
+    store = ConfirmationStore(DATA_DIR)
+    store.open()
+    results["Arranque (leer log)"] = time.perf_counter() - started
+    store.close()
+    return results
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Benchmark de JSON estándar vs rápido")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    fast_mode = fast_json.use("auto")
+    if fast_mode == "stdlib":
+        print("⚠️  orjson/msgspec no están instalados: ambos modos usan json estándar")
+
+    async def fill():
+        for start in range(0, args.records, 5000):
+            await asyncio.gather(*(main.confirmation_store.add(make_record(i))
+                                   for i in range(start, min(start + 5000, args.records))))
+
+    try:
+        with TestClient(main.app) as client:
+            client.portal.call(fill)
+            stdlib = run_mode(client, "stdlib", args, 0)
+            fast = run_mode(client, fast_mode, args, args.requests)
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+    print(f"🧪 JSON: {args.records} confirmaciones, {args.requests} solicitudes por prueba")
+    print("=" * 72)
+    print(f"   {'':24}{'json estándar':>16}{fast_mode:>16}{'mejora':>12}")
+    for label in stdlib:
+        print(f"   {label:<24}{stdlib[label] * 1000:13.2f} ms{fast[label] * 1000:13.2f} ms"
+              f"{stdlib[label] / fast[label]:11.1f}x")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main_bench()
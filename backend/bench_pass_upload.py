@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria: pase en JSON base64 vs subida binaria en streaming
+
+Mide con tracemalloc el pico de memoria de un envío, desde que llega el cuerpo
+de la solicitud hasta que el mensaje MIME queda serializado (lo que hace
+smtplib.send_message):
+  1. JSON: cuerpo con data-URL -> json.loads -> b64decode -> encode_base64.
+  2. Binario: cuerpo por bloques -> SpooledTemporaryFile -> archivo en disco
+     -> adjunto codificado por bloques desde el archivo.
+
+Uso:
+    python bench_pass_upload.py [--size-kb 1500] [--concurrent 10]
+"""
+
+import argparse
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from email_service import email_service
+
+CHUNK = 64 * 1024
+EVENT_DETAILS = {
+    "email": "invitado@email.com",
+    "attending": True,
+    "companions": 2,
+    "whatsapp": "+52 33 1234 5678",
+    "confirmed_at": "01/11/2025 10:00",
+}
+
+
+def sample_png(size: int) -> bytes:
+    # Firma PNG + bytes pseudoaleatorios (no comprimibles, como un PNG real grande)
+    return b"\x89PNG\r\n\x1a\n" + os.urandom(size - 8)
+
+
+def json_body(png: bytes) -> bytes:
+    data_url = "data:image/png;base64," + base64.b64encode(png).decode('ascii')
+    return json.dumps({"email": "invitado@email.com", "name": "Invitado", "pass_image_base64": data_url}).encode()
+
+
+def send_json(body: bytes):
+    data = json.loads(body)
+    message = email_service.build_confirmation_message(
+        data["email"], data["name"], EVENT_DETAILS, pass_image_base64=data["pass_image_base64"]
+    )
+    return message.as_bytes()
+
+
+def send_binary(chunks, directory: str):
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        path = os.path.join(directory, "pase.png")
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(spool, f)
+    message = email_service.build_confirmation_message(
+        "invitado@email.com", "Invitado", EVENT_DETAILS, pass_image_path=path
+    )
+    return message.as_bytes()
+
+
+def measure(fn, *args) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por envío de pase")
+    parser.add_argument("--size-kb", type=int, default=1500, help="Tamaño del PNG")
+    parser.add_argument("--concurrent", type=int, default=10, help="Envíos simultáneos a estimar")
+    args = parser.parse_args()
+
+    png = sample_png(args.size_kb * 1024)
+    body = json_body(png)
+    chunks = [png[i:i + CHUNK] for i in range(0, len(png), CHUNK)]
+
+    # El cuerpo de la solicitud ya está en memoria en ambos casos (lo entrega
+    # el servidor ASGI); se mide solo lo que hace la aplicación con él
+    with tempfile.TemporaryDirectory() as directory:
+        json_peak = measure(send_json, body)
+        binary_peak = measure(send_binary, iter(chunks), directory)
+
+    mb = 1024 * 1024
+    print("🧪 Memoria por envío de pase")
+    print("=" * 70)
+    print(f"   PNG: {len(png) / mb:.2f} MB | cuerpo JSON: {len(body) / mb:.2f} MB")
+    print(f"\n📊 JSON base64:       pico {json_peak / mb:7.2f} MB ({json_peak / len(png):.1f}x el PNG)")
+    print(f"📊 Binario streaming: pico {binary_peak / mb:7.2f} MB ({binary_peak / len(png):.1f}x el PNG)")
+    print(f"⚡ Ahorro por envío: {(json_peak - binary_peak) / mb:.2f} MB "
+          f"({100 * (1 - binary_peak / json_peak):.0f}%)")
+    print(f"   Con {args.concurrent} envíos simultáneos: {args.concurrent * json_peak / mb:.1f} MB"
+          f" -> {args.concurrent * binary_peak / mb:.1f} MB")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark del costo de los límites por cliente (rate_limit)
+
+Mide microsegundos por verificación con N hilos golpeando llaves distintas
+(IPs de un campus) para:
+  1. MemoryBuckets con un solo candado (sin shards).
+  2. MemoryBuckets con shards (RATE_LIMIT_BACKEND=memory).
+  3. SharedBuckets: archivo mapeado en memoria compartido entre workers
+     (RATE_LIMIT_BACKEND=shared).
+
+Uso:
+    python bench_rate_limit.py [--hits 200000] [--threads 4] [--keys 5000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rate_limit import MemoryBuckets, SharedBuckets
+
+
+def run(backend, keys, hits: int, threads: int) -> float:
+    """Segundos para hits verificaciones repartidas entre threads hilos"""
+    per_thread = hits // threads
+
+    def worker(offset: int):
+        for i in range(per_thread):
+            backend.hit(keys[(offset + i) % len(keys)], 1.0, 30.0)
+
+    workers = [threading.Thread(target=worker, args=(n * 7919,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de los límites por cliente")
+    parser.add_argument("--hits", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=5000)
+    args = parser.parse_args()
+
+    keys = [f"confirm:ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(args.keys)]
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory, un candado", MemoryBuckets(shards=1, max_keys=args.keys * 2)),
+            ("memory, 16 shards", MemoryBuckets(shards=16, max_keys=args.keys * 2)),
+            ("shared (mmap + fcntl)", SharedBuckets(os.path.join(tmp, "rate_limits.bin"))),
+        ]
+
+        print(f"🧪 {args.hits} verificaciones, {args.threads} hilos, {args.keys} llaves")
+        print("=" * 70)
+        for label, backend in backends:
+            elapsed = run(backend, keys, args.hits, args.threads)
+            print(f"   {label:<24}{elapsed / args.hits * 1e6:8.2f} µs/verificación"
+                  f"{args.hits / elapsed:12.0f} por segundo")
+        backends[-1][1].close()
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria de las confirmaciones en memoria
+
+Con N confirmaciones leídas del log (una línea JSON por alta), compara el
+índice por folio del store como:
+  1. dict por registro (lo que se guardaba antes).
+  2. Confirmation (__slots__, timestamp como entero, qr_url derivado).
+
+Para cada uno mide con tracemalloc la memoria que queda ocupada (solo
+registros y registros + ConfirmationIndexes), el tiempo de carga, el de
+serializar la lista completa (GET /api/confirmations sin caché de respuestas:
+la primera vez y las siguientes, cuando Confirmation ya guardó su JSON), la
+memoria que agrega ese JSON y el de la exportación a CSV.
+
+Uso:
+    python bench_records.py [--records 100000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fast_json
+from confirmation_export import stream_csv
+from confirmation_index import ConfirmationIndexes
+from confirmation_record import Confirmation
+
+
+def make_record(i: int) -> dict:
+    folio = f"UP-20251101-{i:08X}"
+    return {
+        "folio": folio,
+        "name": f"Invitado Número {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 4 != 0,
+        "guests": i % 3,
+        "phone": f"+52 33 {i:08d}",
+        "comments": "Nos vemos ahí" if i % 10 == 0 else None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-01T10:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}",
+        "qr_url": f"http://localhost:8000/confirmation/{folio}",
+    }
+
+
+def load(lines, convert, with_indexes: bool):
+    """Carga el índice por folio como lo hace el store"""
+    records = {}
+    for line in lines:
+        entry = fast_json.loads(line)
+        key = sys.intern(entry["key"])
+        records[key] = convert(entry["data"])
+    indexes = ConfirmationIndexes.build(records) if with_indexes else None
+    return records, indexes
+
+
+def resident(lines, convert, with_indexes: bool) -> int:
+    """Bytes que quedan ocupados después de cargar (tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    loaded = load(lines, convert, with_indexes)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return current
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria de las confirmaciones en memoria")
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    lines = [fast_json.dumps({"op": "put", "key": record["folio"], "data": record})
+             for record in map(make_record, range(args.records))]
+    layouts = [("dict por registro", dict), ("Confirmation", Confirmation.from_dict)]
+
+    print(f"🧪 {args.records} confirmaciones en memoria (JSON: {fast_json.backend})")
+    print("=" * 70)
+    print(f"   {'':22}{'registros':>14}{'+ índices':>14}{'carga':>9}"
+          f"{'JSON 1ª':>9}{'JSON':>9}{'+ JSON':>10}{'CSV':>9}")
+    baseline = None
+    for label, convert in layouts:
+        size = resident(lines, convert, with_indexes=False)
+        total = resident(lines, convert, with_indexes=True)
+        started = time.perf_counter()
+        records, _ = load(lines, convert, with_indexes=True)
+        elapsed = time.perf_counter() - started
+        values = list(records.values())
+        started = time.perf_counter()
+        fast_json.dumps(values)
+        first = time.perf_counter() - started
+        serialized = best_of(lambda: fast_json.dumps(values))
+        # Memoria que agrega el primer listado (el JSON que guarda cada Confirmation)
+        fresh = list(load(lines, convert, with_indexes=False)[0].values())
+        gc.collect()
+        tracemalloc.start()
+        fast_json.dumps(fresh)
+        gc.collect()
+        cached_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del fresh
+        exported = best_of(lambda: sum(map(len, stream_csv(values))), repeat=3)
+        print(f"   {label:<22}{size / 1024 / 1024:11.1f} MB{total / 1024 / 1024:11.1f} MB"
+              f"{elapsed:8.2f}s{first * 1000:7.0f}ms{serialized * 1000:7.0f}ms"
+              f"{cached_bytes / 1024 / 1024:7.1f} MB{exported * 1000:7.0f}ms")
+        if baseline is None:
+            baseline = size
+        else:
+            print(f"   {'':22}{size / baseline * 100:12.0f} %   ({(baseline - size) / len(values):.0f} bytes menos por registro)")
+        del records, values
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark del caché de respuestas (ETag / If-None-Match)
+
+Con N confirmaciones, mide dentro del proceso (TestClient) el tiempo por
+solicitud de:
+  - GET /api/confirmations (lista completa), una página de 50,
+    /api/confirmations/stats y /confirmation/{folio}
+en tres casos: sin caché (se vacía antes de cada solicitud), con caché
+(200 con los bytes guardados) y revalidación con If-None-Match (304).
+
+Uso:
+    python bench_response_cache.py [--records 5000] [--requests 200]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+DATA_DIR = tempfile.mkdtemp(prefix="bench_response_cache_")
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ.pop("DATABASE_URL", None)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def make_record(i: int) -> dict:
+    folio = f"UP-20251101-{i:08X}"
+    return {
+        "folio": folio,
+        "name": f"Invitado Número {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 4 != 0,
+        "guests": i % 3,
+        "phone": f"+52 33 {i:08d}",
+        "comments": None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+        "qr_url": f"http://localhost:8000/confirmation/{folio}",
+    }
+
+
+def timed(client: TestClient, url: str, requests: int, clear: bool = False, etag: str = None) -> float:
+    headers = {"If-None-Match": etag} if etag else {}
+    started = time.perf_counter()
+    for _ in range(requests):
+        if clear:
+            main.response_cache.clear()
+        client.get(url, headers=headers)
+    return (time.perf_counter() - started) / requests
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Benchmark del caché de respuestas")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    async def fill():
+        for start in range(0, args.records, 5000):
+            await asyncio.gather(*(main.confirmation_store.add(make_record(i))
+                                   for i in range(start, min(start + 5000, args.records))))
+
+    try:
+        with TestClient(main.app) as client:
+            client.portal.call(fill)
+            urls = [
+                ("Lista completa", "/api/confirmations"),
+                ("Página de 50", "/api/confirmations?limit=50&sort=name&order=asc"),
+                ("Estadísticas", "/api/confirmations/stats"),
+                ("Pase por folio (QR)", f"/confirmation/{make_record(args.records // 2)['folio']}"),
+            ]
+            print(f"🧪 Caché de respuestas: {args.records} confirmaciones, {args.requests} solicitudes")
+            print("=" * 78)
+            print(f"   {'':24}{'sin caché':>16}{'caché (200)':>18}{'304':>18}")
+            for label, url in urls:
+                requests = max(10, args.requests // 20) if url == "/api/confirmations" else args.requests
+                cold = timed(client, url, requests, clear=True)
+                etag = client.get(url).headers["etag"]
+                warm = timed(client, url, requests)
+                revalidated = timed(client, url, requests, etag=etag)
+                print(f"   {label:<24}{cold * 1000:13.2f} ms{warm * 1000:15.2f} ms{revalidated * 1000:15.2f} ms")
+            print("=" * 78)
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark de envío masivo: una conexión SMTP por mensaje vs pool de sesiones
+
+Levanta fake_smtp.FakeSMTPServer en un puerto local (con latencia simulada de
+conexión y AUTH) y mide mensajes por segundo:
+  1. Como antes: connect + AUTH + envío + QUIT por cada mensaje.
+  2. EmailService.send_bulk reutilizando las sesiones del pool.
+
+Uso:
+    python bench_smtp_pool.py [--messages 200] [--connect-delay 0.05] [--auth-delay 0.05]
+"""
+
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_smtp import FakeSMTPServer
+
+
+def build_service(port: int, pool_size: int):
+    os.environ.update({
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(port),
+        "SMTP_USE_TLS": "false",
+        "SMTP_POOL_SIZE": str(pool_size),
+    })
+    from email_service import EmailService
+    service = EmailService()
+    # Si existe email_config.py se ignora: el benchmark siempre usa el servidor falso
+    service.smtp_server, service.smtp_port, service.use_tls = "127.0.0.1", port, False
+    return service
+
+
+def sample_messages(count: int):
+    return [
+        {
+            "to_email": f"invitado{i}@email.com",
+            "guest_name": f"Invitado {i}",
+            "event_details": {
+                "email": f"invitado{i}@email.com",
+                "attending": True,
+                "companions": i % 3,
+                "whatsapp": "+52 33 1234 5678",
+                "confirmed_at": "01/11/2025 10:00",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pool SMTP")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    parser.add_argument("--auth-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(connect_delay=args.connect_delay, auth_delay=args.auth_delay).start()
+    service = build_service(server.port, args.pool_size)
+    messages = sample_messages(args.messages)
+
+    print("🧪 Benchmark de envío masivo SMTP")
+    print("=" * 70)
+    print(f"   Mensajes: {args.messages} | latencia conexión: {args.connect_delay * 1000:.0f} ms"
+          f" | latencia AUTH: {args.auth_delay * 1000:.0f} ms")
+
+    # 1. Una conexión por mensaje (comportamiento anterior)
+    started = time.perf_counter()
+    for kwargs in messages:
+        message = service.build_confirmation_message(**kwargs)
+        with smtplib.SMTP(service.smtp_server, service.smtp_port) as smtp:
+            smtp.login(service.email, service.password)
+            smtp.send_message(message)
+    single = time.perf_counter() - started
+    connections_before = server.connections
+
+    # 2. Pool de sesiones + send_bulk
+    started = time.perf_counter()
+    results = service.send_bulk(messages)
+    pooled = time.perf_counter() - started
+    service.pool.close_all()
+
+    failures = sum(1 for r in results if not r["success"])
+    print(f"\n📊 Conexión por mensaje: {args.messages / single:8.1f} msg/s "
+          f"({connections_before} conexiones)")
+    print(f"📊 Pool + send_bulk:     {args.messages / pooled:8.1f} msg/s "
+          f"({service.pool.connections_opened} conexiones, {failures} fallos)")
+    print(f"⚡ Mejora: {single / pooled:.1f}x")
+    print("=" * 70)
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frío (lo que paga un contenedor nuevo al escalar)
+
+Mide, con un intérprete nuevo en cada corrida:
+  1. Importar email_service (con fastapi ya cargado, como en main) y main.
+  2. Tiempo hasta la primera respuesta: desde lanzar uvicorn hasta el primer
+     200 de GET /health, y hasta que se entrega el primer email de
+     POST /api/send-pass-email para una confirmación recién creada (SMTP
+     falso local), con EMAIL_WARMUP=false
+     (todo se inicializa con el primer envío) y EMAIL_WARMUP=true.
+  3. Contexto SSL de STARTTLS: crearlo vs reutilizar el que ya tiene
+     EmailService (el SMTP falso no usa TLS, así que se mide aparte).
+
+Uso:
+    python bench_startup.py [--runs 5]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from fake_smtp import FakeSMTPServer
+
+# argv: módulo a medir, módulos que se cargan antes (sin medir)
+IMPORT_CODE = """
+import sys, time
+for preloaded in sys.argv[2:]:
+    __import__(preloaded)
+started = time.perf_counter()
+__import__(sys.argv[1])
+print(time.perf_counter() - started)
+"""
+
+# Igual que en bench_api: EmailService apunta al SMTP falso aunque exista email_config.py
+SERVER_CODE = """
+import sys, uvicorn, main
+main.email_service.smtp_server = "127.0.0.1"
+main.email_service.smtp_port = int(sys.argv[2])
+main.email_service.use_tls = False
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def server_env(data_dir: str, **extra) -> dict:
+    env = dict(os.environ, DATA_DIR=data_dir, RATE_LIMIT_ENABLED="false", **extra)
+    env.pop("DATABASE_URL", None)
+    return env
+
+
+def measure_import(module: str, data_dir: str, *preloaded: str) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_CODE, module, *preloaded], cwd=BACKEND_DIR,
+                            env=server_env(data_dir), capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(warm_up: str, smtp: FakeSMTPServer) -> dict:
+    """Segundos desde lanzar uvicorn hasta el primer /health y hasta el primer email entregado"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        delivered_before = smtp.messages
+        started = time.perf_counter()
+        server = subprocess.Popen([sys.executable, "-c", SERVER_CODE, str(port), str(smtp.port)],
+                                  cwd=BACKEND_DIR, env=server_env(data_dir, EMAIL_WARMUP=warm_up),
+                                  stdout=subprocess.DEVNULL)
+        try:
+            with httpx.Client(base_url=base_url, timeout=5) as client:
+                while True:
+                    try:
+                        if client.get("/health").status_code == 200:
+                            break
+                    except httpx.HTTPError:
+                        pass
+                    if server.poll() is not None or time.perf_counter() - started > 60:
+                        raise RuntimeError("uvicorn no arrancó")
+                    time.sleep(0.005)
+                ready = time.perf_counter() - started
+
+                # El pase se envía al correo de una confirmación existente
+                folio = client.post("/api/confirmations", json={
+                    "name": "Invitado", "email": "invitado@email.com", "will_attend": True, "guests": 0,
+                }).json()["folio"]
+                sent = time.perf_counter()
+                client.post("/api/send-pass-email", json={"email": "invitado@email.com", "name": "Invitado",
+                                                          "folio": folio})
+                while smtp.messages == delivered_before:
+                    if time.perf_counter() - sent > 30:
+                        raise RuntimeError("el email no se entregó")
+                    time.sleep(0.002)
+                first_email = time.perf_counter() - sent
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return {"ready": ready, "first_email": first_email}
+
+
+def measure_ssl_context() -> tuple:
+    from email_service import EmailService
+
+    service = EmailService()
+    started = time.perf_counter()
+    service._tls_context()
+    created = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(1000):
+        service._tls_context()
+    reused = (time.perf_counter() - started) / 1000
+    return created, reused
+
+
+def summary(values) -> str:
+    return f"{statistics.median(values) * 1000:9.1f} ms (mín {min(values) * 1000:.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío de la API")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"🧪 Arranque en frío ({args.runs} corridas, mediana)")
+    print("=" * 70)
+    with tempfile.TemporaryDirectory() as data_dir:
+        times = [measure_import("email_service", data_dir, "fastapi") for _ in range(args.runs)]
+        print(f"   import email_service (tras fastapi)    {summary(times)}")
+        times = [measure_import("main", data_dir) for _ in range(args.runs)]
+        print(f"   import main                            {summary(times)}")
+
+    smtp = FakeSMTPServer().start()
+    try:
+        for warm_up in ("false", "true"):
+            runs = [measure_first_response(warm_up, smtp) for _ in range(args.runs)]
+            print(f"   EMAIL_WARMUP={warm_up:<6} primer /health       {summary([r['ready'] for r in runs])}")
+            print(f"   {'':20}primer email entregado{summary([r['first_email'] for r in runs])}")
+    finally:
+        smtp.stop()
+
+    created, reused = measure_ssl_context()
+    print(f"   contexto SSL: crearlo {created * 1000:.1f} ms, reutilizarlo {reused * 1e6:.2f} µs")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
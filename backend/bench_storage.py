@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark de almacenamiento: log en archivo vs base de datos
+
+Para cada backend mide, con N confirmaciones:
+  1. Altas concurrentes (asyncio.gather de add(), como varias solicitudes).
+  2. Arranque: cargar todo en memoria desde cero (start()).
+  3. Búsqueda por folio y listado filtrado (ambos desde memoria).
+  4. Migración de data/ a la base de datos (solo backends SQL).
+
+Por defecto la base de datos es SQLite (sustituto local); con --database-url
+postgresql://... se mide contra PostgreSQL (requiere asyncpg).
+
+Uso:
+    python bench_storage.py [--records 5000] [--concurrency 50] [--database-url URL]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from confirmation_store import ConfirmationStore
+from sql_store import PostgresDriver, SQLConfirmationStore, SQLiteDriver
+
+
+def make_record(i: int) -> dict:
+    folio = f"UP-20251101-{uuid.uuid4().hex[:8].upper()}"
+    return {
+        "folio": folio,
+        "name": f"Invitado Número {i}",
+        "email": f"invitado{i}@email.com",
+        "will_attend": i % 4 != 0,
+        "guests": i % 3,
+        "phone": f"+52 33 {i:08d}",
+        "comments": None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+        "qr_url": f"http://localhost:8000/confirmation/{folio}",
+    }
+
+
+def make_driver(url: str, directory: str):
+    if url:
+        return PostgresDriver(url)
+    return SQLiteDriver(os.path.join(directory, "bench.db"))
+
+
+async def reset_postgres(url: str):
+    import asyncpg
+    conn = await asyncpg.connect(url)
+    try:
+        await conn.execute("DROP TABLE IF EXISTS confirmations; DROP SEQUENCE IF EXISTS confirmations_seq")
+    finally:
+        await conn.close()
+
+
+async def insert_all(store, records, concurrency: int) -> float:
+    started = time.perf_counter()
+    for i in range(0, len(records), concurrency):
+        await asyncio.gather(*(store.add(record) for record in records[i:i + concurrency]))
+    return time.perf_counter() - started
+
+
+def read_benchmark(store, folios) -> tuple:
+    started = time.perf_counter()
+    for folio in folios:
+        store.get(folio)
+    lookup = (time.perf_counter() - started) / len(folios)
+    started = time.perf_counter()
+    for _ in range(100):
+        store.query(will_attend=True, name="numero 1", limit=50)
+    listing = (time.perf_counter() - started) / 100
+    return lookup, listing
+
+
+async def bench_file(records, concurrency: int, directory: str) -> dict:
+    data_dir = os.path.join(directory, "file")
+    store = ConfirmationStore(data_dir)
+    await store.start()
+    insert = await insert_all(store, records, concurrency)
+    await store.stop()
+
+    started = time.perf_counter()
+    store = ConfirmationStore(data_dir)
+    await store.start()
+    load = time.perf_counter() - started
+    lookup, listing = read_benchmark(store, [r["folio"] for r in records])
+    await store.stop()
+    return {"insert": insert, "load": load, "lookup": lookup, "listing": listing, "data_dir": data_dir}
+
+
+async def bench_sql(records, concurrency: int, directory: str, url: str, file_data_dir: str) -> dict:
+    if url:
+        await reset_postgres(url)
+    store = SQLConfirmationStore(make_driver(url, directory))
+    await store.start()
+    insert = await insert_all(store, records, concurrency)
+    await store.stop()
+
+    started = time.perf_counter()
+    store = SQLConfirmationStore(make_driver(url, directory))
+    await store.start()
+    load = time.perf_counter() - started
+    lookup, listing = read_benchmark(store, [r["folio"] for r in records])
+    await store.stop()
+
+    # Migración desde el log en archivo a una tabla vacía
+    if url:
+        await reset_postgres(url)
+    else:
+        os.remove(os.path.join(directory, "bench.db"))
+    started = time.perf_counter()
+    store = SQLConfirmationStore(make_driver(url, directory), data_dir=file_data_dir)
+    await store.start()
+    migrate = time.perf_counter() - started
+    await store.stop()
+    return {"insert": insert, "load": load, "lookup": lookup, "listing": listing, "migrate": migrate}
+
+
+async def run(args):
+    records = [make_record(i) for i in range(args.records)]
+    directory = tempfile.mkdtemp(prefix="bench_storage_")
+    try:
+        file_results = await bench_file(records, args.concurrency, directory)
+        sql_results = await bench_sql(records, args.concurrency, directory, args.database_url,
+                                      file_results["data_dir"])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    backend = "PostgreSQL" if args.database_url else "SQLite"
+    print("🧪 Benchmark de almacenamiento de confirmaciones")
+    print("=" * 70)
+    print(f"   Registros: {args.records} | altas concurrentes: {args.concurrency}")
+    print(f"\n{'':28}{'Archivo (JSONL)':>18}{backend:>18}")
+    print(f"{'Altas (altas/s)':28}{args.records / file_results['insert']:18.0f}"
+          f"{args.records / sql_results['insert']:18.0f}")
+    print(f"{'Arranque (ms)':28}{file_results['load'] * 1000:18.1f}{sql_results['load'] * 1000:18.1f}")
+    print(f"{'Búsqueda por folio (µs)':28}{file_results['lookup'] * 1e6:18.2f}{sql_results['lookup'] * 1e6:18.2f}")
+    print(f"{'Listado filtrado (ms)':28}{file_results['listing'] * 1000:18.2f}{sql_results['listing'] * 1000:18.2f}")
+    print(f"\n📥 Migración de {args.records} registros desde archivo: {sql_results['migrate'] * 1000:.0f} ms")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de almacenamiento")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--database-url", default="",
+                        help="postgresql://... (por defecto SQLite en un directorio temporal)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Lista de invitados para los escáneres de la entrada
+
+Cada escáner guarda una copia local de la lista (folio, nombre, acompañantes,
+asistencia y hora de llegada) para seguir registrando llegadas cuando se cae
+el Wi-Fi. Al reconectar envía las llegadas que acumuló y el cursor de su
+última sincronización; CheckinSync le regresa solo lo que cambió desde ese
+cursor:
+
+    {"cursor": "<generación>-<n>", "full": false,
+     "fields": ["folio", "name", "guests", "will_attend", "checked_in_at"],
+     "guests": [[...], ...], "removed": ["<folio>", ...], "checked_in": 12}
+
+Se registra como listener del store, así que ve las altas, bajas y llegadas
+propias y de otros workers. El cursor es la posición del store
+(store.sequence), la misma en todos los workers: generación del log (cambia
+al compactar) y bytes con el log en data/, seq con la base de datos. Así un
+escáner puede sincronizar con cualquier worker. Guarda para cada folio la
+posición de su último cambio (hasta journal_size folios); si el cursor es de
+otra generación o ya no alcanza, se envía la lista completa con "full": true,
+igual que el "reset" de los eventos del panel.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Set
+
+FIELDS = ("folio", "name", "guests", "will_attend", "checked_in_at")
+
+
+def guest_row(record) -> list:
+    """Renglón compacto de la lista (mismo orden que FIELDS)"""
+    return [record.get(field) for field in FIELDS]
+
+
+class CheckinSync:
+    def __init__(self, store, journal_size: int = 50000):
+        self.store = store
+        self.journal_size = journal_size
+        self._generation = None
+        self._next = 0   # posición del último cambio visto
+        self._floor = 0  # cursores menores ya no alcanzan el historial
+        self._journal: "OrderedDict[str, int]" = OrderedDict()  # folio -> posición del último cambio
+        self._removed: Set[str] = set()
+        # Folios que ya llegaron; None = hay que recontar desde el store
+        self._checked_in: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Se registra en el store (llamar después de store.start())"""
+        with self._lock:
+            self.store.add_listener(self._on_changes)
+            self._reset()
+
+    @property
+    def checked_in_count(self) -> int:
+        with self._lock:
+            if self._checked_in is not None:
+                return len(self._checked_in)
+        # Fuera del candado: el store puede avisar cambios mientras se recorre
+        checked_in = {record.get("folio") for record in self.store.all() if record.get("checked_in_at")}
+        with self._lock:
+            if self._checked_in is None:
+                self._checked_in = checked_in
+            return len(self._checked_in)
+
+    # ------------------------------------------------------------------
+    # Cambios del store (desde cualquier hilo)
+    # ------------------------------------------------------------------
+    def _on_changes(self, changes: List[dict]):
+        with self._lock:
+            # Se avisa con el store ya en la posición de este lote
+            generation, position = self.store.sequence
+            if generation != self._generation:
+                # Se compactó el log en este worker: las posiciones anteriores no valen
+                self._reset()
+            for change in changes:
+                kind = change["type"]
+                if kind in ("cleared", "reset"):
+                    self._reset()
+                    continue
+                folio = change["folio"]
+                self._next = max(self._next, position)
+                self._journal.pop(folio, None)
+                self._journal[folio] = self._next
+                arrived = kind != "deleted" and bool(change["record"].get("checked_in_at"))
+                if kind == "deleted":
+                    self._removed.add(folio)
+                else:
+                    self._removed.discard(folio)
+                if self._checked_in is not None:
+                    if arrived:
+                        self._checked_in.add(folio)
+                    else:
+                        self._checked_in.discard(folio)
+            while len(self._journal) > self.journal_size:
+                folio, n = self._journal.popitem(last=False)
+                self._removed.discard(folio)
+                self._floor = n
+
+    def _reset(self):
+        # Todo cursor anterior recibe la lista completa
+        self._generation, self._next = self.store.sequence
+        self._floor = self._next
+        self._journal.clear()
+        self._removed.clear()
+        self._checked_in = None
+
+    # ------------------------------------------------------------------
+    # Delta para un escáner
+    # ------------------------------------------------------------------
+    def _since(self, cursor: Optional[str]) -> Optional[int]:
+        """Posición del cursor si todavía hay historial desde ahí; None = lista completa"""
+        if not cursor:
+            return None
+        generation, _, number = cursor.rpartition("-")
+        if generation != self._generation or not number.isdigit():
+            return None
+        since = int(number)
+        if since < self._floor:
+            return None
+        return since
+
+    def delta(self, cursor: Optional[str] = None) -> dict:
+        """Cambios de la lista desde cursor (o la lista completa)"""
+        with self._lock:
+            since = self._since(cursor)
+            # Un cursor de otro worker que va adelante de este: no hay nada
+            # nuevo que enviar y se conserva (lo que falta aquí ya lo tiene)
+            position = self._next if since is None else max(since, self._next)
+            current = f"{self._generation}-{position}"
+            if since is None:
+                folios: Iterable[str] = ()
+                removed: List[str] = []
+            else:
+                folios = []
+                for folio, n in reversed(self._journal.items()):
+                    if n <= since:
+                        break
+                    folios.append(folio)
+                removed = [folio for folio in folios if folio in self._removed]
+
+        if since is None:
+            rows = [guest_row(record) for record in self.store.all()]
+        else:
+            rows = [guest_row(record) for record in map(self.store.get, folios) if record is not None]
+        return {
+            "cursor": current,
+            "full": since is None,
+            "fields": list(FIELDS),
+            "guests": rows,
+            "removed": removed,
+            "checked_in": self.checked_in_count,
+        }
@@ -0,0 +1,209 @@
+"""
+Eventos en tiempo real para el panel de administración (Server-Sent Events)
+
+El store avisa cada lote de cambios que aplica a su índice (altas, bajas y lo
+que escriban otros workers); ConfirmationEvents los convierte en eventos SSE y
+los reparte a cada panel conectado en GET /api/confirmations/events:
+
+    event: created | updated | deleted   data: {"folio", "record"}
+    event: stats                         data: contadores de /api/confirmations/stats
+    event: reset                         data: {}  (el panel debe recargar)
+
+Cada cliente tiene una cola acotada. Si un panel no lee a tiempo y su cola se
+llena, se vacía y se le envía un solo "reset": nunca se bloquea a quien
+escribe ni crece la memoria por un cliente lento. Los lotes grandes (borrar
+todo, importaciones) también se envían como "reset" en lugar de evento por
+evento.
+
+Los eventos llevan id "<proceso>-<n>" y se guardan los últimos en memoria: al
+reconectar, EventSource envía Last-Event-ID y se reenvía lo que faltó; si ya
+no está (o el id es de otro worker), se envía "reset".
+"""
+
+import asyncio
+import uuid
+from collections import deque
+from typing import List, Optional, Set
+
+import fast_json
+
+HEARTBEAT_SECONDS = 15.0
+
+
+def format_event(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    """Un evento SSE listo para enviar"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + fast_json.dumps(data).decode('utf-8'))
+    return "\n".join(lines) + "\n\n"
+
+
+class ConfirmationEvents:
+    def __init__(self, store, queue_size: int = 100, max_clients: int = 50,
+                 max_batch: int = 200, refresh_interval: float = 1.0):
+        """
+        store es el store de confirmaciones (ConfirmationStore o
+        SQLConfirmationStore); max_batch es el tamaño de lote a partir del
+        cual se envía "reset" en lugar de cada cambio.
+        """
+        self.store = store
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.max_batch = max_batch
+        self.refresh_interval = refresh_interval
+
+        self._clients: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._prefix = uuid.uuid4().hex[:8]
+        self._next_id = 0
+        self._history: deque = deque(maxlen=queue_size)  # (n, mensaje) de los últimos eventos
+        self._stats_pending = False
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    async def start(self):
+        """Se registra en el store (llamar después de store.start())"""
+        self._loop = asyncio.get_running_loop()
+        self.store.add_listener(self._on_changes)
+        # El log en archivo solo ve lo que escriben otros workers al leer:
+        # mientras haya paneles conectados se revisa periódicamente
+        if hasattr(self.store, "refresh"):
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        # Despertar a los clientes para que cierren su respuesta
+        for queue in list(self._clients):
+            self._put(queue, None)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ------------------------------------------------------------------
+    # Suscripción
+    # ------------------------------------------------------------------
+    def subscribe(self, last_event_id: Optional[str] = None) -> Optional[asyncio.Queue]:
+        """
+        Cola para un nuevo cliente (None si ya se alcanzó max_clients). Con
+        last_event_id (reconexión) se precarga con los eventos que faltaron.
+        """
+        if self.is_full():
+            return None
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id:
+            missed = self._missed_since(last_event_id)
+            for message in missed if missed is not None else [self._message("reset", {})]:
+                queue.put_nowait(message)
+        self._clients.add(queue)
+        return queue
+
+    def _missed_since(self, last_event_id: str) -> Optional[List[str]]:
+        prefix, _, number = last_event_id.rpartition("-")
+        if prefix != self._prefix or not number.isdigit():
+            return None
+        last = int(number)
+        if last > self._next_id:
+            return None
+        # Si el historial ya no llega hasta last, se perdieron eventos
+        if self._history and last + 1 < self._history[0][0]:
+            return None
+        return [message for n, message in self._history if n > last]
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def is_full(self) -> bool:
+        return len(self._clients) >= self.max_clients
+
+    async def stream(self, last_event_id: Optional[str] = None):
+        """Cuerpo de la respuesta SSE: contadores actuales, luego los eventos"""
+        # Se suscribe al empezar a enviar: si el cliente se va antes, no queda cola huérfana
+        queue = self.subscribe(last_event_id)
+        if queue is None:
+            return
+        try:
+            yield "retry: 3000\n\n"
+            yield format_event("stats", self.store.stats())
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(queue)
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+    def _on_changes(self, changes: List[dict]):
+        # Lo llama el store desde cualquier hilo: se publica en el event loop.
+        # Aun sin clientes se guarda en el historial, para quien esté reconectando
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._publish, changes)
+        except RuntimeError:  # loop cerrado durante el apagado
+            pass
+
+    def _publish(self, changes: List[dict]):
+        if len(changes) > self.max_batch or any(c["type"] in ("reset", "cleared") for c in changes):
+            messages = [self._message("reset", {})]
+        else:
+            messages = [self._message(c["type"], {"folio": c["folio"], "record": c["record"]})
+                        for c in changes]
+        for queue in list(self._clients):
+            for message in messages:
+                if not self._put(queue, message):
+                    break
+        # Un solo evento de contadores por vuelta del loop, aunque lleguen varios lotes
+        if not self._stats_pending:
+            self._stats_pending = True
+            self._loop.call_soon(self._publish_stats)
+
+    def _publish_stats(self):
+        self._stats_pending = False
+        if not self._clients:
+            return
+        message = self._message("stats", self.store.stats())
+        for queue in list(self._clients):
+            self._put(queue, message)
+
+    def _message(self, event: str, data: dict) -> str:
+        self._next_id += 1
+        message = format_event(event, data, f"{self._prefix}-{self._next_id}")
+        self._history.append((self._next_id, message))
+        return message
+
+    def _put(self, queue: asyncio.Queue, message: Optional[str]) -> bool:
+        """Encola sin bloquear; si la cola está llena se reemplaza por un reset"""
+        try:
+            queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self._message("reset", {}) if message is not None else None)
+            return False
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            if not self._clients:
+                continue
+            try:
+                await asyncio.to_thread(self.store.refresh)
+            except Exception as e:
+                print(f"❌ Error revisando cambios de confirmaciones: {str(e)}")
@@ -0,0 +1,234 @@
+"""
+Exportación de confirmaciones en streaming (CSV y XLSX)
+
+GET /api/confirmations/export recorre el store página por página con los
+mismos filtros del listado (iter_confirmations) y va escribiendo el archivo
+conforme avanza, así que la memoria del worker no depende del número de
+invitados:
+
+- CSV en UTF-8 con BOM (para que Excel respete los acentos), opcionalmente
+  comprimido con gzip (gzip_stream) si el cliente lo acepta.
+- XLSX escrito a mano: un ZIP con las partes mínimas de SpreadsheetML y la
+  hoja con celdas inlineStr, generada fila por fila (no requiere openpyxl).
+"""
+
+import csv
+import io
+import re
+import zipfile
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+from confirmation_record import Confirmation, epoch_to_datetime
+from pass_batch import StreamSink
+
+PAGE_SIZE = 1000
+FLUSH_BYTES = 64 * 1024
+
+HEADERS = ("Folio", "Nombre", "Correo", "WhatsApp", "Asiste", "Acompañantes",
+           "Comentarios", "Fecha Confirmación")
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Un teléfono con + o - al inicio es válido; otro texto así se tomaría como fórmula
+_PHONE = re.compile(r"[+-]?[\d\s().-]*")
+# Caracteres de control que XML 1.0 no admite
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def iter_confirmations(store, page_size: int = PAGE_SIZE, **filters) -> Iterator[dict]:
+    """
+    Confirmaciones que cumplen filters (los de store.query), en orden. Se pide
+    una página a la vez con cursor, así que nunca se copia la lista completa.
+    """
+    cursor = None
+    while True:
+        page = store.query(cursor=cursor, limit=page_size, count_total=False, **filters)
+        yield from page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return
+
+
+def _timestamp_text(moment: datetime) -> str:
+    # Igual que strftime('%d/%m/%Y %H:%M'), que cuesta varias veces más por fila
+    return f"{moment.day:02d}/{moment.month:02d}/{moment.year} {moment.hour:02d}:{moment.minute:02d}"
+
+
+def _format_timestamp(value) -> str:
+    try:
+        return _timestamp_text(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        return value or ""
+
+
+def _row(record: dict) -> tuple:
+    if isinstance(record, Confirmation):
+        # Atributos directos y el timestamp desde el entero, sin pasar por el texto ISO
+        timestamp_us = record.timestamp_us
+        return (
+            record.folio or "",
+            record.name or "",
+            record.email or "",
+            record.phone or "",
+            "SÍ" if record.will_attend else "NO",
+            record.guests or 0,
+            record.comments or "",
+            _timestamp_text(epoch_to_datetime(timestamp_us)) if timestamp_us is not None
+            else _format_timestamp(record.get("timestamp")),
+        )
+    return (
+        record.get("folio") or "",
+        record.get("name") or "",
+        record.get("email") or "",
+        record.get("phone") or "",
+        "SÍ" if record.get("will_attend") else "NO",
+        record.get("guests") or 0,
+        record.get("comments") or "",
+        _format_timestamp(record.get("timestamp")),
+    )
+
+
+def _safe_csv(value):
+    """Evita que una hoja de cálculo interprete texto del formulario como fórmula"""
+    if not isinstance(value, str) or not value:
+        return value
+    if value[0] in "=@\t\r" or (value[0] in "+-" and not _PHONE.fullmatch(value)):
+        return "'" + value
+    return value
+
+
+# ----------------------------------------------------------------------
+# CSV
+# ----------------------------------------------------------------------
+def stream_csv(records: Iterable[dict]) -> Iterator[bytes]:
+    """CSV por bloques de ~64 KB"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(HEADERS)
+    for record in records:
+        writer.writerow([_safe_csv(value) for value in _row(record)])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    El header Accept-Encoding admite gzip: "gzip" (o "x-gzip") con q > 0, o
+    "*" con q > 0 si gzip no aparece. "gzip;q=0" o solo "identity" no lo admiten.
+    """
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ("gzip", "x-gzip"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return qualities.get("*", 0.0) > 0
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime un flujo de bytes en formato gzip sin juntarlo en memoria"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ----------------------------------------------------------------------
+# XLSX
+# ----------------------------------------------------------------------
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Asistentes" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _xlsx_cell(value) -> str:
+    if isinstance(value, int):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(_XML_INVALID.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+def stream_xlsx(records: Iterable[dict]) -> Iterator[bytes]:
+    """Libro de una hoja; la hoja se comprime y se entrega conforme se escribe"""
+    sink = StreamSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            pending: List[str] = [_SHEET_HEAD, _xlsx_row(HEADERS)]
+            size = 0
+            for record in records:
+                row = _xlsx_row(_row(record))
+                pending.append(row)
+                size += len(row)
+                if size >= FLUSH_BYTES:
+                    sheet.write("".join(pending).encode('utf-8'))
+                    pending, size = [], 0
+                    yield sink.drain()
+            pending.append(_SHEET_TAIL)
+            sheet.write("".join(pending).encode('utf-8'))
+    yield sink.drain()
@@ -0,0 +1,412 @@
+"""
+Índices secundarios de confirmaciones
+
+Se mantienen junto al índice folio -> registro de ConfirmationStore y se
+actualizan en cada alta/baja, de modo que el listado paginado de
+GET /api/confirmations no recorre todas las confirmaciones en cada solicitud:
+
+- Listas ordenadas (bisect) de (valor, folio) por fecha, nombre, acompañantes
+  y folio: sirven para ordenar, paginar con cursor, filtrar por rango de
+  fechas y por prefijo de folio.
+- Conjuntos por asistencia (will_attend True/False).
+- Trigramas de nombre, correo y teléfono para búsqueda por subcadena. Cada
+  trigrama guarda un array de ids enteros (4 bytes por entrada); las bajas solo
+  marcan el id como muerto y los arrays se depuran cuando los muertos dominan.
+- Contadores de asistencia (ConfirmationStats) que se suman/restan en cada
+  alta/baja, con una serie por día para GET /api/confirmations/stats.
+- Llaves únicas (correo+teléfono normalizados e Idempotency-Key) -> folio,
+  para detectar envíos repetidos del formulario sin recorrer los registros.
+"""
+
+import base64
+import json
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set
+
+SORT_FIELDS = ("timestamp", "name", "guests", "folio")
+TEXT_FIELDS = ("name", "email", "phone")
+# Todo lo que leen los índices y los contadores de un registro
+INDEXED_FIELDS = ("folio", "timestamp", "name", "guests", "email", "phone", "will_attend", "idempotency_key")
+NGRAM = 3
+
+_COMBINING = re.compile("[\u0300-\u036f]")
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_text(value) -> str:
+    """Minúsculas y sin acentos, para búsquedas y orden por nombre"""
+    if not value:
+        return ""
+    value = str(value)
+    if value.isascii():
+        return value.lower()
+    return _COMBINING.sub("", unicodedata.normalize('NFKD', value)).casefold()
+
+
+def normalize_phone(value) -> str:
+    """Solo dígitos, para que '+52 33 1234' coincida con '523312'"""
+    if not value:
+        return ""
+    return _NON_DIGITS.sub("", str(value))
+
+
+def contact_key(email, phone) -> str:
+    """Correo + teléfono normalizados: identifica al mismo invitado entre envíos"""
+    email = normalize_text(email).strip()
+    if not email:
+        return ""
+    return f"{email}|{normalize_phone(phone)}"
+
+
+def _normalize_field(field: str, value) -> str:
+    return normalize_phone(value) if field == "phone" else normalize_text(value)
+
+
+def _sort_value(field: str, record: dict):
+    if field == "name":
+        return normalize_text(record.get("name"))
+    if field == "guests":
+        try:
+            return int(record.get("guests") or 0)
+        except (TypeError, ValueError):
+            return 0
+    return str(record.get(field) or "")
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def encode_cursor(sort: str, value, key: str) -> str:
+    raw = json.dumps([sort, value, key], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    """
+    Decodifica un cursor generado para el orden sort; lanza ValueError si no
+    es válido o si viene de otro orden (sus valores no se pueden comparar)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        field, value, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if field != sort:
+        raise ValueError("El cursor corresponde a otro orden; vuelve a la primera página")
+    expected = int if sort == "guests" else str
+    if not isinstance(key, str) or type(value) is not expected:
+        raise ValueError("Cursor inválido")
+    return value, key
+
+
+class ConfirmationStats:
+    """Contadores acumulados de asistencia, actualizados de forma incremental"""
+
+    def __init__(self):
+        self.total = 0
+        self.confirmed = 0
+        self.declined = 0
+        self.total_guests = 0
+        self.total_people = 0
+        self.by_day: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _guests(record: dict) -> int:
+        try:
+            return int(record.get("guests") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _update(self, record: dict, sign: int):
+        attending = bool(record.get("will_attend"))
+        people = 1 + self._guests(record) if attending else 0
+
+        self.total += sign
+        if attending:
+            self.confirmed += sign
+            self.total_guests += sign * self._guests(record)
+            self.total_people += sign * people
+        else:
+            self.declined += sign
+
+        day = str(record.get("timestamp") or "")[:10] or "sin-fecha"
+        counters = self.by_day.setdefault(day, {"total": 0, "confirmed": 0, "declined": 0, "people": 0})
+        counters["total"] += sign
+        counters["confirmed" if attending else "declined"] += sign
+        counters["people"] += sign * people
+        if counters["total"] == 0:
+            del self.by_day[day]
+
+    def add(self, record: dict):
+        self._update(record, 1)
+
+    def remove(self, record: dict):
+        self._update(record, -1)
+
+    def snapshot(self) -> dict:
+        return {
+            "total_registrations": self.total,
+            "confirmed": self.confirmed,
+            "declined": self.declined,
+            "total_guests": self.total_guests,
+            "total_people": self.total_people,
+            "by_day": [{"date": day, **counters} for day, counters in sorted(self.by_day.items())],
+        }
+
+
+class ConfirmationIndexes:
+    def __init__(self):
+        self._sorted: Dict[str, list] = {field: [] for field in SORT_FIELDS}
+        self._attend: Dict[bool, Set[str]] = {True: set(), False: set()}
+        self._ngrams: Dict[str, Dict[str, array]] = {field: {} for field in TEXT_FIELDS}
+        self._ids: Dict[str, int] = {}          # folio -> id entero vigente
+        self._keys: List[Optional[str]] = []    # id -> folio (None si se eliminó)
+        self._texts: List[Optional[tuple]] = [] # id -> (nombre, correo, teléfono) normalizados
+        self._dead = 0
+        self._contacts: Dict[str, str] = {}     # contact_key -> folio (el primero registrado)
+        self._idempotency: Dict[str, str] = {}  # Idempotency-Key -> folio
+        self.stats = ConfirmationStats()
+
+    @classmethod
+    def build(cls, records: Dict[str, dict]) -> "ConfirmationIndexes":
+        """Construye todos los índices de una vez (ordena al final, no con insort)"""
+        indexes = cls()
+        for key, record in records.items():
+            indexes._index(key, record, sort_now=False)
+        for entries in indexes._sorted.values():
+            entries.sort()
+        return indexes
+
+    # ------------------------------------------------------------------
+    # Mantenimiento (lo llama ConfirmationStore con su candado tomado)
+    # ------------------------------------------------------------------
+    def add(self, key: str, record: dict):
+        self._index(key, record, sort_now=True)
+
+    @staticmethod
+    def same_entry(previous: dict, record: dict) -> bool:
+        """
+        True si reemplazar previous por record no cambia ningún índice (p. ej.
+        solo registra la llegada): basta con cambiar el registro en O(1).
+        """
+        return all(previous.get(field) == record.get(field) for field in INDEXED_FIELDS)
+
+    def _index(self, key: str, record: dict, sort_now: bool):
+        for field in SORT_FIELDS:
+            entry = (_sort_value(field, record), key)
+            if sort_now:
+                insort(self._sorted[field], entry)
+            else:
+                self._sorted[field].append(entry)
+        self._attend[bool(record.get("will_attend"))].add(key)
+        self.stats.add(record)
+        contact = contact_key(record.get("email"), record.get("phone"))
+        if contact:
+            self._contacts.setdefault(contact, key)
+        if record.get("idempotency_key"):
+            self._idempotency.setdefault(record["idempotency_key"], key)
+        # Los ids son crecientes, así que cada array queda ordenado
+        record_id = len(self._keys)
+        texts = tuple(_normalize_field(field, record.get(field)) for field in TEXT_FIELDS)
+        self._keys.append(key)
+        self._texts.append(texts)
+        self._ids[key] = record_id
+        for field, text in zip(TEXT_FIELDS, texts):
+            postings = self._ngrams[field]
+            for gram in _ngrams(text):
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = array('I', (record_id,))
+                else:
+                    ids.append(record_id)
+
+    def remove(self, key: str, record: dict):
+        for field in SORT_FIELDS:
+            entries = self._sorted[field]
+            entry = (_sort_value(field, record), key)
+            pos = bisect_left(entries, entry)
+            if pos < len(entries) and entries[pos] == entry:
+                del entries[pos]
+        self._attend[bool(record.get("will_attend"))].discard(key)
+        self.stats.remove(record)
+        contact = contact_key(record.get("email"), record.get("phone"))
+        if self._contacts.get(contact) == key:
+            del self._contacts[contact]
+        if self._idempotency.get(record.get("idempotency_key")) == key:
+            del self._idempotency[record["idempotency_key"]]
+        record_id = self._ids.pop(key, None)
+        if record_id is not None:
+            self._keys[record_id] = None
+            self._texts[record_id] = None
+            self._dead += 1
+            if self._dead > max(1000, len(self._ids)):
+                self._vacuum()
+
+    def clear(self):
+        self.__init__()
+
+    def _vacuum(self):
+        """Quita de los arrays de trigramas los ids de registros eliminados"""
+        keys = self._keys
+        for postings in self._ngrams.values():
+            for gram in list(postings):
+                alive = array('I', (i for i in postings[gram] if keys[i] is not None))
+                if alive:
+                    postings[gram] = alive
+                else:
+                    del postings[gram]
+        self._dead = 0
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def find_duplicate(self, record: dict, dedup: bool = True) -> Optional[str]:
+        """
+        Folio de una confirmación previa con la misma Idempotency-Key o (si
+        dedup) con el mismo correo + teléfono; None si no hay.
+        """
+        if record.get("idempotency_key"):
+            key = self._idempotency.get(record["idempotency_key"])
+            if key is not None:
+                return key
+        if dedup:
+            return self._contacts.get(contact_key(record.get("email"), record.get("phone")))
+        return None
+
+    def _range_keys(self, field: str, low: Optional[str], high: Optional[str]) -> Set[str]:
+        """Folios cuyo valor está en [low, high] usando la lista ordenada"""
+        entries = self._sorted[field]
+        start = bisect_left(entries, (low,)) if low is not None else 0
+        end = bisect_right(entries, (high + "\uffff",)) if high is not None else len(entries)
+        return {key for _, key in entries[start:end]}
+
+    def _text_candidates(self, field: str, text: str) -> Optional[Set[str]]:
+        """Folios que contienen todos los trigramas de text (None si text es corto)"""
+        grams = _ngrams(text)
+        if not grams:
+            return None
+        postings = self._ngrams[field]
+        empty = array('I')
+        lists = sorted((postings.get(gram, empty) for gram in grams), key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            if not result:
+                break
+            result.intersection_update(ids)
+        keys = self._keys
+        return {keys[i] for i in result if keys[i] is not None}
+
+    def query(self, records: Dict[str, dict], will_attend: Optional[bool] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              name: Optional[str] = None, email: Optional[str] = None,
+              phone: Optional[str] = None, folio_prefix: Optional[str] = None,
+              sort: str = "timestamp", descending: bool = True,
+              cursor: Optional[str] = None, limit: int = 50, count_total: bool = True) -> dict:
+        """
+        Regresa una página de confirmaciones:
+            {"items": [...], "total": <coincidencias>, "next_cursor": <str o None>}
+        Con count_total=False no se cuentan las coincidencias (total es None):
+        así se recorre todo el resultado página por página en O(n).
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Orden no soportado: {sort}")
+
+        candidates: Optional[Set[str]] = None
+
+        def narrow(keys: Set[str]):
+            nonlocal candidates
+            candidates = set(keys) if candidates is None else candidates & keys
+
+        if will_attend is not None:
+            narrow(self._attend[will_attend])
+        if date_from or date_to:
+            narrow(self._range_keys("timestamp", date_from, date_to))
+        if folio_prefix:
+            narrow(self._range_keys("folio", folio_prefix, folio_prefix))
+
+        # Subcadenas: los trigramas reducen candidatos y luego se verifica
+        # contra el texto normalizado que guarda el índice
+        checks = []
+        for position, (field, text) in enumerate((("name", name), ("email", email), ("phone", phone))):
+            if not text:
+                continue
+            normalized = _normalize_field(field, text)
+            checks.append((position, normalized))
+            keys = self._text_candidates(field, normalized)
+            if keys is not None:
+                narrow(keys)
+
+        ids, texts = self._ids, self._texts
+
+        def matches(key: str) -> bool:
+            record_id = ids.get(key)
+            if record_id is None:
+                return False
+            fields = texts[record_id]
+            return all(text in fields[position] for position, text in checks)
+
+        after = decode_cursor(cursor, sort) if cursor else None
+        entries = self._sorted[sort]
+
+        if candidates is not None and len(candidates) * 4 < len(entries):
+            # Pocos candidatos: ordenar solo esos (el nombre normalizado ya está en caché)
+            if sort == "name":
+                sort_value = lambda key: texts[ids[key]][0]
+            else:
+                sort_value = lambda key: _sort_value(sort, records[key])
+            ordered = sorted(
+                (sort_value(key), key) for key in candidates
+                if key in records and (not checks or matches(key))
+            )
+            total = len(ordered) if count_total else None
+            if after is not None:
+                ordered = ordered[bisect_right(ordered, tuple(after)):] if not descending \
+                    else ordered[:bisect_left(ordered, tuple(after))]
+            page_entries = self._take(reversed(ordered) if descending else ordered, limit)
+        else:
+            # Recorrer el índice ordenado desde el cursor
+            def keep(key: str) -> bool:
+                if candidates is not None and key not in candidates:
+                    return False
+                return not checks or matches(key)
+
+            if not count_total:
+                total = None
+            elif candidates is None and not checks:
+                total = len(entries)
+            elif not checks:
+                total = len(candidates)
+            else:
+                total = sum(1 for key in (candidates if candidates is not None else records) if keep(key))
+
+            if descending:
+                end = bisect_left(entries, tuple(after)) if after is not None else len(entries)
+                walk = (entries[i] for i in range(end - 1, -1, -1))
+            else:
+                start = bisect_right(entries, tuple(after)) if after is not None else 0
+                walk = (entries[i] for i in range(start, len(entries)))
+            page_entries = self._take((entry for entry in walk if keep(entry[1])), limit)
+
+        has_more = len(page_entries) > limit
+        page_entries = page_entries[:limit]
+        next_cursor = encode_cursor(sort, *page_entries[-1]) if has_more and page_entries else None
+
+        return {
+            "items": [records[key] for _, key in page_entries],
+            "total": total,
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def _take(entries: Iterable[tuple], limit: int) -> List[tuple]:
+        """Toma limit + 1 elementos (el extra indica si hay más páginas)"""
+        taken = []
+        for entry in entries:
+            taken.append(entry)
+            if len(taken) > limit:
+                break
+        return taken
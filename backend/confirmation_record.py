@@ -0,0 +1,247 @@
+"""
+Registro compacto de una confirmación
+
+Las confirmaciones en memoria (índice por folio del store) eran un dict por
+registro con las mismas diez llaves repetidas. Confirmation guarda los mismos
+datos en __slots__ y además:
+
+- timestamp (y checked_in_at) se guarda como entero (microsegundos desde
+  1970, sin zona horaria) y se vuelve a formatear en ISO-8601 al leerlo. Si el texto original
+  no se puede reproducir exactamente (zona horaria, otro formato), se guarda
+  tal cual.
+- qr_url no se guarda cuando es la URL estándar del folio: se deriva.
+- El folio y los comentarios cortos se internan (sys.intern): el folio es la
+  misma cadena en el registro, el índice y los índices secundarios.
+- Las llaves que faltan en un registro antiguo se marcan en una máscara de
+  bits y las que no son del formulario van a extra, así to_dict() regresa
+  las mismas llaves que se guardaron.
+
+Para el código que trata los registros como dict (índices, exportación,
+pases, campañas), Confirmation ofrece la parte de solo lectura de un mapeo:
+get(), [], in, keys(), items() y to_dict() para serializar.
+
+Un registro no cambia una vez creado (la llegada crea una copia), así que
+to_json() guarda el JSON del registro la primera vez que se lista: el
+listado completo solo vuelve a armar el dict (y formatear el timestamp) de
+los registros nuevos, no de todos después de cada alta.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+FIELDS: Tuple[str, ...] = (
+    "folio", "name", "email", "will_attend", "guests", "phone", "comments",
+    "privacy_accept", "timestamp", "qr_url", "idempotency_key",
+    "checked_in_at", "checked_in_by", "invitation_code",
+)
+_FIELD_SET = frozenset(FIELDS)
+_BITS = {field: 1 << i for i, field in enumerate(FIELDS)}
+# Campos que solo algunos registros traen: presentes si no son None
+OPTIONAL_FIELDS = ("idempotency_key", "checked_in_at", "checked_in_by", "invitation_code")
+_OPTIONAL_SET = frozenset(OPTIONAL_FIELDS)
+_OPTIONAL_BITS = sum(_BITS[field] for field in OPTIONAL_FIELDS)
+
+QR_URL_PREFIX = "http://localhost:8000/confirmation/"
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_INTERN_MAX = 64
+
+
+def timestamp_to_epoch(value: str) -> Union[int, str]:
+    """ISO-8601 sin zona -> microsegundos desde 1970 (o el texto si no es reversible)"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return value
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def epoch_to_datetime(value: int) -> datetime:
+    """Microsegundos desde 1970 -> datetime sin zona"""
+    return _EPOCH + value * _MICROSECOND
+
+
+def epoch_to_timestamp(value: Union[int, str, None]) -> Optional[str]:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return epoch_to_datetime(value).isoformat()
+    return value
+
+
+def _intern(value):
+    if isinstance(value, str) and len(value) <= _INTERN_MAX:
+        return sys.intern(value)
+    return value
+
+
+class Confirmation:
+    __slots__ = ("folio", "name", "email", "will_attend", "guests", "phone", "comments",
+                 "privacy_accept", "_timestamp", "_qr_url", "idempotency_key",
+                 "_checked_in_at", "checked_in_by", "invitation_code", "extra", "_absent", "_json")
+
+    def __init__(self, folio: Optional[str] = None, name: Optional[str] = None,
+                 email: Optional[str] = None, will_attend: Optional[bool] = None,
+                 guests: Optional[int] = 0, phone: Optional[str] = None,
+                 comments: Optional[str] = None, privacy_accept: Optional[bool] = True,
+                 timestamp: Union[str, int, None] = None, qr_url: Optional[str] = None,
+                 idempotency_key: Optional[str] = None, checked_in_at: Union[str, int, None] = None,
+                 checked_in_by: Optional[str] = None, invitation_code: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None, _absent: int = 0):
+        self.folio = _intern(folio)
+        self.name = name
+        self.email = email
+        self.will_attend = will_attend
+        self.guests = guests
+        self.phone = phone
+        self.comments = _intern(comments)
+        self.privacy_accept = privacy_accept
+        self._timestamp = timestamp_to_epoch(timestamp) if isinstance(timestamp, str) else timestamp
+        # None = URL estándar del folio (se deriva al leer)
+        self._qr_url = None if folio and qr_url == QR_URL_PREFIX + folio else qr_url
+        self.idempotency_key = idempotency_key
+        self._checked_in_at = timestamp_to_epoch(checked_in_at) if isinstance(checked_in_at, str) else checked_in_at
+        self.checked_in_by = _intern(checked_in_by)
+        self.invitation_code = invitation_code
+        self.extra = {sys.intern(k): v for k, v in extra.items()} if extra else None
+        self._absent = _absent & ~_OPTIONAL_BITS
+        self._json = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Confirmation":
+        """Registro a partir del dict guardado (si ya es Confirmation, se regresa igual)"""
+        if isinstance(data, Confirmation):
+            return data
+        absent = 0
+        for field in FIELDS:
+            if field not in data:
+                absent |= _BITS[field]
+        if _FIELD_SET.issuperset(data):
+            return cls(_absent=absent, **data)
+        known = {k: v for k, v in data.items() if k in _FIELD_SET}
+        extra = {k: v for k, v in data.items() if k not in _FIELD_SET}
+        return cls(_absent=absent, extra=extra, **known)
+
+    # ------------------------------------------------------------------
+    # Campos derivados
+    # ------------------------------------------------------------------
+    @property
+    def timestamp(self) -> Optional[str]:
+        return epoch_to_timestamp(self._timestamp)
+
+    @property
+    def timestamp_us(self) -> Optional[int]:
+        """Microsegundos desde 1970 (None si el timestamp no es ISO sin zona)"""
+        value = self._timestamp
+        return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+    @property
+    def checked_in_at(self) -> Optional[str]:
+        return epoch_to_timestamp(self._checked_in_at)
+
+    @property
+    def qr_url(self) -> Optional[str]:
+        if self._qr_url is None and self.folio and not self._absent & _BITS["qr_url"]:
+            return QR_URL_PREFIX + self.folio
+        return self._qr_url
+
+    # ------------------------------------------------------------------
+    # Interfaz de mapeo (solo lectura)
+    # ------------------------------------------------------------------
+    def _present(self, field: str) -> bool:
+        if field in _OPTIONAL_SET:
+            return getattr(self, field) is not None
+        return not self._absent & _BITS[field]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key) if self._present(key) else default
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            if self._present(key):
+                return getattr(self, key)
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key in _FIELD_SET:
+            return self._present(key)
+        return bool(self.extra) and key in self.extra
+
+    def keys(self) -> Iterator[str]:
+        return (key for key, _ in self.items())
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for field in FIELDS:
+            if self._present(field):
+                yield field, getattr(self, field)
+        if self.extra:
+            yield from self.extra.items()
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self._absent and self.extra is None:
+            # Caso común (todas las llaves del formulario): sin pasar por las propiedades
+            folio = self.folio
+            timestamp = self._timestamp
+            if type(timestamp) is int:
+                timestamp = (_EPOCH + timestamp * _MICROSECOND).isoformat()
+            qr_url = self._qr_url
+            if qr_url is None and folio:
+                qr_url = QR_URL_PREFIX + folio
+            data = {
+                "folio": folio, "name": self.name, "email": self.email,
+                "will_attend": self.will_attend, "guests": self.guests, "phone": self.phone,
+                "comments": self.comments, "privacy_accept": self.privacy_accept,
+                "timestamp": timestamp, "qr_url": qr_url,
+            }
+            if self.idempotency_key is not None:
+                data["idempotency_key"] = self.idempotency_key
+            if self._checked_in_at is not None:
+                data["checked_in_at"] = self.checked_in_at
+            if self.checked_in_by is not None:
+                data["checked_in_by"] = self.checked_in_by
+            if self.invitation_code is not None:
+                data["invitation_code"] = self.invitation_code
+            return data
+        return dict(self.items())
+
+    def to_json(self, dumps) -> bytes:
+        """to_dict() codificado con dumps (fast_json); se guarda para los siguientes listados"""
+        data = self._json
+        if data is None:
+            # Copia al tamaño exacto: orjson deja ~1 KB de capacidad en los bytes chicos
+            data = self._json = bytes(memoryview(dumps(self.to_dict())))
+        return data
+
+    def checked_in(self, at: str, by: Optional[str] = None) -> Optional["Confirmation"]:
+        """
+        Copia con la llegada registrada a la hora at (ISO-8601). Si ya tenía
+        una llegada igual o anterior regresa None: entre dos registros de la
+        misma llegada (p. ej. dos escáneres sin conexión) gana el primero.
+        """
+        current = self.checked_in_at
+        if current is not None and current <= at:
+            return None
+        copy = Confirmation.__new__(Confirmation)
+        for slot in Confirmation.__slots__:
+            setattr(copy, slot, getattr(self, slot))
+        copy._checked_in_at = timestamp_to_epoch(at)
+        copy.checked_in_by = _intern(by)
+        copy._json = None
+        return copy
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Confirmation):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Confirmation({self.to_dict()!r})"
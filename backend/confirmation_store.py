@@ -0,0 +1,622 @@
+"""
+Almacenamiento de confirmaciones en un log append-only (JSON Lines)
+
+Cada escritura agrega una sola línea al archivo data/confirmations.jsonl:
+    {"op": "put", "key": "<folio>", "data": {...}}   -> alta de confirmación
+    {"op": "del", "key": "<folio>"}                   -> eliminación (tombstone)
+    {"op": "clear"}                                   -> eliminar todas
+
+La primera línea de un log reescrito (compactación, importación, log nuevo)
+es su generación: {"op": "generation", "id": "<uuid>"}. Cada reescritura
+usa una nueva.
+
+En memoria se mantiene un índice folio -> registro, así que ninguna operación
+necesita volver a leer ni reescribir el archivo completo. Un hilo en segundo
+plano compacta el log cuando la proporción de líneas muertas crece.
+
+Concurrencia:
+- Todas las escrituras toman un candado de archivo (flock) sobre
+  confirmations.jsonl.lock, por lo que varios workers de uvicorn pueden
+  compartir el mismo log. Antes de escribir, cada proceso lee la cola del log
+  que hayan agregado los demás.
+- Las altas/bajas concurrentes se encolan y se escriben juntas en un solo
+  write + fsync (group commit).
+- La compactación y la importación escriben a un archivo temporal, hacen fsync
+  y lo renombran de forma atómica.
+- Quien se registre con add_listener() recibe los cambios aplicados al
+  índice (propios y de otros workers) para publicarlos en tiempo real.
+- Las lecturas comparan inode/tamaño/mtime del log con los últimos vistos (un
+  solo stat); si otro worker escribió, se aplica solo la cola nueva y si el log
+  fue compactado (cambió la generación de la primera línea) se reconstruye el
+  índice. No basta el inode: el sistema de archivos reutiliza los números de
+  inode entre compactaciones. Una búsqueda por folio es O(1).
+- Dos candados en el proceso: _write_lock serializa a quien escribe o se pone
+  al día con el log (commit, compactación, refresh) y _lock protege solo el
+  índice en memoria mientras se le aplican cambios. La espera del flock, la
+  escritura y el fsync se hacen sin _lock, así que las lecturas del event
+  loop no esperan al disco; si hay un commit en curso, refresh() no lo espera
+  (el commit se pone al día con el log bajo el flock).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fast_json
+from confirmation_index import ConfirmationIndexes
+from confirmation_record import Confirmation
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializa dentro del proceso
+    fcntl = None
+
+LOG_FILENAME = "confirmations.jsonl"
+LEGACY_FILENAME = "confirmations.json"
+
+
+def change_for(entry: dict, records: Dict[str, dict]) -> Optional[dict]:
+    """
+    Describe una entrada del log antes de aplicarla sobre records:
+        {"type": "created" | "updated", "folio", "record"}
+        {"type": "deleted", "folio", "record"}   (el registro eliminado)
+        {"type": "cleared"}
+    None si la entrada no cambia nada (baja de un folio inexistente).
+    """
+    op = entry.get("op")
+    if op == "put":
+        kind = "updated" if entry["key"] in records else "created"
+        return {"type": kind, "folio": entry["key"], "record": entry["data"]}
+    if op == "del":
+        previous = records.get(entry["key"])
+        if previous is None:
+            return None
+        return {"type": "deleted", "folio": entry["key"], "record": previous}
+    if op == "clear":
+        return {"type": "cleared"}
+    return None
+
+
+class ConfirmationStore:
+    def __init__(self, data_dir: str, compact_interval: float = 60.0,
+                 compact_min_dead: int = 1000, compact_ratio: float = 0.5,
+                 fsync: bool = True):
+        self.data_dir = data_dir
+        self.log_file = os.path.join(data_dir, LOG_FILENAME)
+        self.lock_file = self.log_file + ".lock"
+        self.legacy_file = os.path.join(data_dir, LEGACY_FILENAME)
+        self.fsync = fsync
+
+        # Parámetros de compactación: se compacta cuando hay al menos
+        # compact_min_dead líneas muertas y representan compact_ratio del log
+        self.compact_interval = compact_interval
+        self.compact_min_dead = compact_min_dead
+        self.compact_ratio = compact_ratio
+
+        self._records: Dict[str, dict] = {}  # folio -> registro (orden de inserción)
+        self._indexes = ConfirmationIndexes()  # índices secundarios para el listado
+        self._log_lines = 0                   # líneas totales en el log
+        self._offset = 0                      # bytes del log ya aplicados en memoria
+        self._generation = None               # id de la última reescritura (compactaciones de otros procesos)
+        self._signature = None                # (inode, tamaño, mtime) de la última lectura
+        self._lock = threading.RLock()        # índice en memoria
+        self._write_lock = threading.Lock()   # escrituras y sincronización con el log
+        self._lock_fd = None
+        self._loaded = False
+        self._anonymous = 0
+
+        # Cola de escrituras pendientes (group commit)
+        self._pending: List[tuple] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self._version = 0  # avanza con cada cambio aplicado al índice (caché de respuestas)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def open(self):
+        """Carga el log en memoria (importando confirmations.json si es necesario)"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.data_dir, exist_ok=True)
+            self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+
+            with self._file_lock():
+                if not os.path.exists(self.log_file):
+                    if os.path.exists(self.legacy_file):
+                        self._import_legacy()
+                    else:
+                        self._atomic_write([])
+                self._replay()
+            self._loaded = True
+
+    def start_compactor(self):
+        """Inicia el hilo de compactación en segundo plano"""
+        self.open()
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._stop.clear()
+        self._compactor = threading.Thread(
+            target=self._compact_loop, name="confirmation-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    async def start(self):
+        """Carga el log e inicia el compactador (lifespan de FastAPI)"""
+        await asyncio.to_thread(self.start_compactor)
+
+    async def stop(self):
+        await asyncio.to_thread(self.close)
+
+    def close(self):
+        """Detiene el compactador y libera el candado"""
+        self._stop.set()
+        if self._compactor:
+            self._compactor.join(timeout=5)
+            self._compactor = None
+        with self._lock:
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+            self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Lecturas (siempre desde memoria)
+    # ------------------------------------------------------------------
+    def get(self, folio: str) -> Optional[dict]:
+        """Busca una confirmación por folio"""
+        self.refresh()
+        return self._records.get(folio)
+
+    async def fetch(self, folio: str) -> Optional[dict]:
+        """Igual que get() (el log se relee en cada lectura); misma interfaz que SQLConfirmationStore"""
+        return self.get(folio)
+
+    def all(self) -> List[dict]:
+        """Regresa todas las confirmaciones en orden de registro"""
+        self.refresh()
+        with self._lock:
+            return list(self._records.values())
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._records)
+
+    def query(self, **filters) -> dict:
+        """Página filtrada y ordenada desde los índices secundarios (ver ConfirmationIndexes.query)"""
+        self.refresh()
+        with self._lock:
+            return self._indexes.query(self._records, **filters)
+
+    def stats(self) -> dict:
+        """Contadores de asistencia mantenidos en cada alta/baja (sin recalcular)"""
+        self.refresh()
+        with self._lock:
+            return self._indexes.stats.snapshot()
+
+    @property
+    def version(self) -> int:
+        """Versión de los datos: avanza cada vez que cambia algún registro (o se recarga el log)"""
+        self.refresh()
+        return self._version
+
+    @property
+    def sequence(self) -> Tuple[str, int]:
+        """
+        Posición de lo aplicado en el log, la misma en todos los workers:
+        (generación, bytes). Compactar cambia la generación y reinicia los bytes;
+        un log anterior sin generación usa "0" hasta su primera compactación.
+        """
+        return self._generation or "0", self._offset
+
+    async def ping(self):
+        """Comprueba que el log y su candado siguen accesibles (healthcheck)"""
+        await asyncio.to_thread(self._check)
+
+    def _check(self):
+        self.open()
+        if self._lock_fd is not None:
+            os.fstat(self._lock_fd)
+        os.stat(self.log_file)
+        if not os.access(self.data_dir, os.W_OK):
+            raise PermissionError(f"Sin permiso de escritura en {self.data_dir}")
+
+    def add_listener(self, callback: Callable[[List[dict]], None]):
+        """
+        Registra callback(changes) para cada lote de cambios aplicado al índice
+        (ver change_for). Se llama en el hilo que aplicó los cambios.
+        """
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """Sincroniza el índice si el log cambió en disco (p. ej. por otro worker)"""
+        self.open()
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            return
+        if (st.st_ino, st.st_size, st.st_mtime_ns) == self._signature:
+            return
+        # Un commit en curso se pone al día él mismo: no esperar su fsync
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            self._catch_up()
+        finally:
+            self._write_lock.release()
+
+    # ------------------------------------------------------------------
+    # Escrituras (se agrupan y se escribe una línea por operación)
+    # ------------------------------------------------------------------
+    async def add(self, record: dict) -> dict:
+        """Agrega una confirmación al log y al índice"""
+        await self._submit({"op": "put", "data": record})
+        return record
+
+    async def add_unique(self, record: dict, dedup: bool = True) -> Tuple[dict, bool]:
+        """
+        Agrega la confirmación salvo que ya exista una con la misma
+        Idempotency-Key o (si dedup) el mismo correo + teléfono. Regresa
+        (registro guardado, creado); si ya existía no se escribe nada.
+        """
+        return await self._submit({"op": "put", "data": record, "unique": True, "dedup": dedup})
+
+    async def check_in(self, folio: str, at: str, by: Optional[str] = None) -> Tuple[Optional[dict], bool]:
+        """
+        Registra la llegada del invitado (at en ISO-8601). Se resuelve con el
+        índice al día bajo el candado de archivo: si ya tenía una llegada
+        igual o anterior no se escribe nada. Regresa (registro, cambió);
+        (None, False) si el folio no existe.
+        """
+        return await self._submit({"op": "checkin", "key": folio, "at": at, "by": by})
+
+    async def delete(self, folio: str) -> bool:
+        """Elimina una confirmación escribiendo un tombstone"""
+        return await self._submit({"op": "del", "key": folio})
+
+    async def clear(self) -> int:
+        """Elimina todas las confirmaciones; regresa cuántas había"""
+        return await self._submit({"op": "clear"})
+
+    async def _submit(self, op: dict):
+        """Encola una operación y espera a que quede escrita en disco"""
+        self.open()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((op, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_pending())
+        return await future
+
+    async def _flush_pending(self):
+        # Mientras un lote se escribe en un hilo, las nuevas solicitudes se
+        # acumulan en _pending y se escriben juntas en el siguiente ciclo
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                results = await asyncio.to_thread(self.commit, [op for op, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def commit(self, ops: List[dict]) -> list:
+        """
+        Aplica un lote de operaciones bajo el candado de archivo y las escribe
+        con un solo write + fsync. Regresa el resultado de cada operación.
+
+        El índice se actualiza (con _lock, sin I/O) antes del write + fsync,
+        que se hacen sin _lock; si la escritura falla, el índice se reconstruye
+        desde el log.
+        """
+        self.open()
+        with self._write_lock, self._file_lock():
+            self._catch_up()
+            try:
+                with self._lock:
+                    lines, results, changes = self._apply_ops(ops)
+                if lines:
+                    self._append(lines)
+            except Exception:
+                self._replay()
+                raise
+            self._notify(changes)
+        return results
+
+    def _apply_ops(self, ops: List[dict]) -> Tuple[List[bytes], list, List[dict]]:
+        """Resuelve y aplica el lote al índice (con _lock); regresa líneas, resultados y cambios"""
+        lines = []
+        results = []
+        changes = []
+        for op in ops:
+            kind = op["op"]
+            if kind == "put":
+                record = op["data"]
+                if op.get("unique"):
+                    # Se revisa con el candado de archivo tomado y el índice al
+                    # día, así que dos workers no pueden crear el mismo invitado
+                    existing = self._indexes.find_duplicate(record, op.get("dedup", True))
+                    if existing is not None and existing in self._records:
+                        results.append((self._records[existing], False))
+                        continue
+                    results.append((record, True))
+                else:
+                    results.append(record)
+                entry = {"op": "put", "key": self._key_for(record), "data": record}
+            elif kind == "checkin":
+                # Se escribe como un put del registro con la llegada
+                previous = self._records.get(op["key"])
+                record = previous.checked_in(op["at"], op.get("by")) if previous is not None else None
+                if record is None:
+                    results.append((previous, False))
+                    continue
+                results.append((record, True))
+                entry = {"op": "put", "key": op["key"], "data": record}
+            elif kind == "del":
+                if op["key"] not in self._records:
+                    results.append(False)
+                    continue
+                entry = op
+                results.append(True)
+            elif kind == "clear":
+                deleted_count = len(self._records)
+                results.append(deleted_count)
+                if not deleted_count:
+                    continue
+                entry = op
+            else:
+                raise ValueError(f"Operación desconocida: {kind}")
+
+            changes.append(change_for(entry, self._records))
+            self._apply(entry, self._records, self._indexes)
+            lines.append(self._encode(entry))
+
+        if lines:
+            self._version += 1
+        return lines, results, changes
+
+    # ------------------------------------------------------------------
+    # Compactación
+    # ------------------------------------------------------------------
+    def dead_lines(self) -> int:
+        """Líneas del log que ya no aportan a un registro vivo"""
+        return self._log_lines - len(self._records)
+
+    def needs_compaction(self) -> bool:
+        dead = self.dead_lines()
+        if dead < self.compact_min_dead or self._log_lines == 0:
+            return False
+        return dead / self._log_lines >= self.compact_ratio
+
+    def compact(self):
+        """Reescribe el log solo con los registros vivos"""
+        self.open()
+        with self._write_lock, self._file_lock():
+            # Incluir lo que otros workers hayan agregado antes de reescribir
+            self._catch_up()
+            self._atomic_write(
+                self._encode({"op": "put", "key": key, "data": record})
+                for key, record in self._records.items()
+            )
+            self._replay()
+        print(f"🗜️  Log de confirmaciones compactado ({self._log_lines} registros)")
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                if self.needs_compaction():
+                    self.compact()
+            except Exception as e:
+                print(f"❌ Error compactando log de confirmaciones: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _file_lock(self):
+        """Candado exclusivo entre procesos sobre confirmations.jsonl.lock"""
+        if fcntl is None or self._lock_fd is None:
+            yield
+            return
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _key_for(self, record: dict) -> str:
+        folio = record.get("folio")
+        if folio:
+            return folio
+        # Registros antiguos sin folio: clave interna para no pisarse entre sí
+        self._anonymous += 1
+        return f"_sin_folio_{self._anonymous}"
+
+    @staticmethod
+    def _encode(entry: dict) -> bytes:
+        return fast_json.dumps(entry) + b"\n"
+
+    def _append(self, lines: List[bytes]):
+        """Agrega varias líneas al log con una sola escritura"""
+        data = b"".join(lines)
+        fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            if self.fsync:
+                os.fsync(fd)
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        self._offset += len(data)
+        self._log_lines += len(lines)
+        # Con el candado tomado nadie más escribió: el índice ya refleja el log
+        self._signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _atomic_write(self, lines):
+        """Escribe el log completo (con una nueva generación) en un temporal, fsync y rename atómico"""
+        tmp_file = self.log_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(self._encode({"op": "generation", "id": uuid.uuid4().hex}))
+            for line in lines:
+                f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.log_file)
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(self.data_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    @staticmethod
+    def _apply(entry: dict, records: Dict[str, dict], indexes: Optional[ConfirmationIndexes]):
+        """Aplica una entrada del log al índice por folio y (si se da) a los secundarios"""
+        op = entry.get("op")
+        if op == "put":
+            # El índice guarda registros compactos; el folio es la misma cadena en todos lados
+            key = sys.intern(entry["key"])
+            record = Confirmation.from_dict(entry["data"])
+            previous = records.get(key)
+            if indexes is not None and previous is not None:
+                if indexes.same_entry(previous, record):
+                    records[key] = record
+                    return
+                indexes.remove(key, previous)
+            records[key] = record
+            if indexes is not None:
+                indexes.add(key, record)
+        elif op == "del":
+            previous = records.pop(entry["key"], None)
+            if previous is not None and indexes is not None:
+                indexes.remove(entry["key"], previous)
+        elif op == "clear":
+            records.clear()
+            if indexes is not None:
+                indexes.clear()
+
+    def _notify(self, changes: List[dict]):
+        changes = [change for change in changes if change is not None]
+        if not changes:
+            return
+        for callback in self._listeners:
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"❌ Error notificando cambios de confirmaciones: {str(e)}")
+
+    def _read_from(self, f, offset: int, records=None, indexes=False):
+        """Aplica las líneas completas del log (ya abierto) a partir de offset"""
+        # Solo se notifica al aplicar sobre el índice vivo (no al reconstruir)
+        changes = [] if records is None and self._listeners else None
+        f.seek(offset)
+        chunk = f.read()
+        # Ignorar una posible línea a medio escribir al final
+        end = chunk.rfind(b"\n") + 1
+        entries = []
+        generation = None
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = fast_json.loads(line)
+            except ValueError:
+                # Una línea truncada (p. ej. por un corte de energía) no invalida el resto
+                print(f"⚠️  Línea inválida en {LOG_FILENAME}, se ignora")
+                continue
+            if entry.get("op") == "generation":
+                generation = entry.get("id")
+            else:
+                entries.append(entry)
+        # La lectura del disco va sin _lock; solo aplicar al índice vivo lo toma
+        with self._lock if records is None else nullcontext():
+            for entry in entries:
+                if changes is not None:
+                    changes.append(change_for(entry, self._records))
+                self._apply(entry,
+                            self._records if records is None else records,
+                            self._indexes if indexes is False else indexes)
+            self._log_lines += len(entries)
+            self._offset = offset + end
+            if offset == 0:
+                self._generation = generation
+            if records is None and end:
+                self._version += 1
+        if changes:
+            self._notify(changes)
+
+    def _replay(self):
+        """Reconstruye el índice en memoria leyendo el log completo"""
+        with open(self.log_file, 'rb') as f:
+            self._replay_from(f, os.fstat(f.fileno()))
+
+    def _replay_from(self, f, st):
+        # Se construye aparte y se sustituye al final, para que las lecturas
+        # concurrentes nunca vean un índice a medio reconstruir
+        records: Dict[str, dict] = {}
+        self._log_lines = 0
+        self._read_from(f, 0, records, None)
+        indexes = ConfirmationIndexes.build(records)
+        with self._lock:
+            self._records = records
+            self._indexes = indexes
+            self._version += 1
+        self._signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self._anonymous = sum(1 for key in self._records if key.startswith("_sin_folio_"))
+
+    @staticmethod
+    def _read_generation(f) -> Optional[str]:
+        """Generación del log abierto (primera línea); None si es un log anterior sin ella"""
+        f.seek(0)
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
+        try:
+            entry = fast_json.loads(line)
+        except ValueError:
+            return None
+        return entry.get("id") if entry.get("op") == "generation" else None
+
+    def _catch_up(self):
+        """Aplica lo que otros procesos hayan escrito desde la última lectura"""
+        # Generación y contenido se leen del mismo archivo abierto, para no
+        # mezclar un stat previo con un log recién compactado
+        with open(self.log_file, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if self._read_generation(f) != self._generation or st.st_size < self._offset:
+                # Otro proceso compactó el log: reconstruir desde cero
+                self._replay_from(f, st)
+                self._notify([{"type": "reset"}])
+                return
+            if st.st_size > self._offset:
+                self._read_from(f, self._offset)
+            self._signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _import_legacy(self):
+        """Importa data/confirmations.json al nuevo log (solo la primera vez)"""
+        try:
+            with open(self.legacy_file, 'rb') as f:
+                confirmations = fast_json.loads(f.read())
+        except ValueError:
+            confirmations = []
+
+        self._atomic_write(
+            self._encode({"op": "put", "key": self._key_for(record), "data": record})
+            for record in confirmations
+        )
+        print(f"📥 Importadas {len(confirmations)} confirmaciones desde {LEGACY_FILENAME}")
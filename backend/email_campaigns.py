@@ -0,0 +1,328 @@
+"""
+Campañas de reenvío de pases por email
+
+Una campaña toma una foto de los folios a los que hay que escribir (por
+defecto, las confirmaciones que SÍ asisten) y los envía con EmailService en
+paralelo, respetando un límite de mensajes por segundo.
+
+El progreso se guarda en data/campaigns/<id>.json (escritura atómica) después
+de cada bloque de envíos, así que si el proceso se cae la campaña se reanuda
+desde el último bloque confirmado al reiniciar; como mucho se reenvía un
+bloque (concurrency mensajes). Mientras una campaña corre, el proceso tiene un
+flock sobre data/campaigns/<id>.lock para que otro worker de uvicorn no la
+ejecute al mismo tiempo.
+
+Cada checkpoint y cada cancelación leen y escriben el estado bajo otro flock
+(data/campaigns/<id>.state.lock): el checkpoint conserva el estado que haya
+escrito otro worker (p. ej. cancelled) en lugar de pisarlo con running. La
+lectura y escritura de los archivos se hace en un hilo (asyncio.to_thread).
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin exclusión entre procesos
+    fcntl = None
+
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+MAX_FAILURES_REPORTED = 200
+
+
+class RateLimiter:
+    """Token bucket asíncrono: como máximo rate adquisiciones por segundo"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def event_details_for(record: dict) -> dict:
+    """Detalles del evento para el email a partir de una confirmación guardada"""
+    confirmed_at = record.get("timestamp") or ""
+    try:
+        confirmed_at = datetime.fromisoformat(confirmed_at).strftime('%d/%m/%Y %H:%M')
+    except ValueError:
+        pass
+    return {
+        'email': record.get("email"),
+        'attending': bool(record.get("will_attend")),
+        'companions': record.get("guests", 0),
+        'whatsapp': record.get("phone", ''),
+        'confirmed_at': confirmed_at,
+    }
+
+
+class CampaignManager:
+    def __init__(self, data_dir: str, store, send: Callable[[dict], dict]):
+        """
+        store es el ConfirmationStore; send recibe una confirmación y regresa
+        {"success": bool, "message": str} (bloqueante, se ejecuta en un hilo).
+        """
+        self.campaigns_dir = os.path.join(data_dir, "campaigns")
+        self.store = store
+        self.send = send
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock_fds: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def _path(self, campaign_id: str) -> str:
+        return os.path.join(self.campaigns_dir, f"{campaign_id}.json")
+
+    def _save(self, state: dict):
+        state["updated_at"] = datetime.now().isoformat()
+        path = self._path(state["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _load(self, campaign_id: str) -> Optional[dict]:
+        if not campaign_id.isalnum():
+            return None
+        try:
+            with open(self._path(campaign_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @contextmanager
+    def _state_lock(self, campaign_id: str):
+        """Candado entre procesos para leer y reescribir el estado de la campaña"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(os.path.join(self.campaigns_dir, f"{campaign_id}.state.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _checkpoint(self, state: dict, status: Optional[str] = None) -> bool:
+        """
+        Guarda el progreso de state (y status, si se da) conservando un estado
+        final que otro worker haya escrito mientras tanto. Regresa True si la
+        campaña sigue en curso.
+        """
+        with self._state_lock(state["id"]):
+            current = self._load(state["id"])
+            if current is not None and current["status"] != RUNNING:
+                state["status"] = current["status"]
+            elif status is not None:
+                state["status"] = status
+            self._save(state)
+        return state["status"] == RUNNING
+
+    def _mark_cancelled(self, campaign_id: str) -> Optional[dict]:
+        if self._load(campaign_id) is None:
+            return None
+        with self._state_lock(campaign_id):
+            state = self._load(campaign_id)
+            if state is not None and state["status"] == RUNNING:
+                state["status"] = CANCELLED
+                self._save(state)
+        return state
+
+    def _try_lock(self, campaign_id: str) -> bool:
+        """Toma el candado de la campaña sin bloquear (False si otro proceso la corre)"""
+        if fcntl is None:
+            return True
+        fd = os.open(os.path.join(self.campaigns_dir, f"{campaign_id}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fds[campaign_id] = fd
+        return True
+
+    def _unlock(self, campaign_id: str):
+        fd = self._lock_fds.pop(campaign_id, None)
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def create(self, rate_per_second: float = 5.0, concurrency: int = 4,
+               only_attending: bool = True) -> dict:
+        """Crea una campaña de reenvío con la lista actual de confirmaciones"""
+        os.makedirs(self.campaigns_dir, exist_ok=True)
+        folios = [
+            record["folio"] for record in self.store.all()
+            if record.get("folio") and record.get("email")
+            and (record.get("will_attend") or not only_attending)
+        ]
+        state = {
+            "id": uuid.uuid4().hex[:12],
+            "status": RUNNING,
+            "created_at": datetime.now().isoformat(),
+            "rate_per_second": rate_per_second,
+            "concurrency": concurrency,
+            "only_attending": only_attending,
+            "folios": folios,
+            "total": len(folios),
+            "position": 0,
+            "sent": 0,
+            "failed": 0,
+            "skipped": 0,
+            "failures": [],
+        }
+        self._save(state)
+        print(f"📣 Campaña {state['id']} creada: {len(folios)} destinatarios")
+        return state
+
+    def start(self, campaign_id: str) -> bool:
+        """Ejecuta la campaña en segundo plano si nadie más la está ejecutando"""
+        if campaign_id in self._tasks and not self._tasks[campaign_id].done():
+            return True
+        if not self._try_lock(campaign_id):
+            return False
+        self._tasks[campaign_id] = asyncio.create_task(self._run(campaign_id))
+        return True
+
+    def get(self, campaign_id: str) -> Optional[dict]:
+        """Progreso de una campaña (sin la lista completa de folios)"""
+        state = self._load(campaign_id)
+        if state is None:
+            return None
+        return self._summary(state)
+
+    def list(self) -> List[dict]:
+        if not os.path.isdir(self.campaigns_dir):
+            return []
+        campaigns = []
+        for filename in sorted(os.listdir(self.campaigns_dir)):
+            if filename.endswith(".json"):
+                state = self._load(filename[:-5])
+                if state:
+                    campaigns.append(self._summary(state))
+        return sorted(campaigns, key=lambda c: c["created_at"], reverse=True)
+
+    async def cancel(self, campaign_id: str) -> Optional[dict]:
+        if not campaign_id.isalnum():
+            return None
+        task = self._tasks.get(campaign_id)
+        if task and not task.done():
+            task.cancel()
+        state = await asyncio.to_thread(self._mark_cancelled, campaign_id)
+        if state is None:
+            return None
+        return self._summary(state)
+
+    async def resume_all(self):
+        """Reanuda las campañas que quedaron en curso (llamar al iniciar la app)"""
+        for state in await asyncio.to_thread(self.list):
+            if state["status"] == RUNNING and self.start(state["id"]):
+                print(f"♻️  Campaña {state['id']} reanudada en {state['position']}/{state['total']}")
+
+    async def stop(self):
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _summary(state: dict) -> dict:
+        summary = {key: value for key, value in state.items() if key != "folios"}
+        summary["progress"] = round(100 * state["position"] / state["total"], 1) if state["total"] else 100.0
+        return summary
+
+    async def _send_one(self, folio: str, limiter: RateLimiter) -> Optional[dict]:
+        record = await self.store.fetch(folio)
+        if record is None:
+            return None  # la confirmación se eliminó después de crear la campaña
+        await limiter.acquire()
+        try:
+            result = await asyncio.to_thread(self.send, record)
+        except Exception as e:
+            result = {"success": False, "message": str(e)}
+        result["folio"] = folio
+        result["email"] = record.get("email")
+        return result
+
+    async def _run(self, campaign_id: str):
+        state = None
+        try:
+            state = await asyncio.to_thread(self._load, campaign_id)
+            if state is None or state["status"] != RUNNING:
+                return
+            limiter = RateLimiter(state["rate_per_second"], burst=state["concurrency"])
+            block = max(1, int(state["concurrency"]))
+            started = time.monotonic()
+
+            while state["position"] < state["total"]:
+                folios = state["folios"][state["position"]:state["position"] + block]
+                results = await asyncio.gather(*(self._send_one(folio, limiter) for folio in folios))
+
+                for result in results:
+                    if result is None:
+                        state["skipped"] += 1
+                    elif result["success"]:
+                        state["sent"] += 1
+                    else:
+                        state["failed"] += 1
+                        if len(state["failures"]) < MAX_FAILURES_REPORTED:
+                            state["failures"].append({
+                                "folio": result["folio"],
+                                "email": result["email"],
+                                "error": result.get("message"),
+                            })
+                state["position"] += len(folios)
+                elapsed = time.monotonic() - started
+                state["messages_per_second"] = round(state["position"] / elapsed, 2) if elapsed else None
+                # Checkpoint: al reanudar se continúa después de este bloque.
+                # Si otro worker la canceló durante el bloque, se detiene aquí
+                if not await asyncio.to_thread(self._checkpoint, state):
+                    print(f"🛑 Campaña {campaign_id} detenida ({state['status']}) en {state['position']}/{state['total']}")
+                    return
+
+            if not await asyncio.to_thread(self._checkpoint, state, COMPLETED):
+                return
+            print(f"✅ Campaña {campaign_id} terminada: {state['sent']} enviados, {state['failed']} fallidos")
+
+        except asyncio.CancelledError:
+            # Cancelada o apagado de la app: el último checkpoint queda guardado
+            raise
+        except Exception as e:
+            print(f"❌ Error en campaña {campaign_id}: {str(e)}")
+            if state is not None:
+                state["error"] = str(e)
+                await asyncio.to_thread(self._checkpoint, state, FAILED)
+        finally:
+            self._unlock(campaign_id)
@@ -0,0 +1,223 @@
+"""
+Bandeja de salida (outbox) durable para envío de emails
+
+POST /api/send-pass-email ya no envía el correo dentro de la solicitud: guarda
+el trabajo en una base SQLite (data/email_outbox.db) y regresa 202 con su id.
+Un grupo de workers asyncio toma los trabajos pendientes, los envía en un hilo
+y reintenta con backoff exponencial si falla. Como la cola vive en disco, los
+trabajos sobreviven a reinicios y pueden compartirse entre varios workers de
+uvicorn (SQLite serializa la toma de cada trabajo).
+"""
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_email_jobs_due ON email_jobs (status, next_attempt_at);
+"""
+
+
+class EmailOutbox:
+    def __init__(self, db_path: str, sender: Callable[[dict], dict], workers: int = 2,
+                 max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0,
+                 poll_interval: float = 1.0, lease_seconds: float = 300.0):
+        """
+        sender recibe el payload de un trabajo y regresa {"success": bool, "message": str};
+        se ejecuta en un hilo, así que puede ser bloqueante (smtplib).
+        """
+        self.db_path = db_path
+        self.sender = sender
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+
+        self._local = threading.local()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._initialized = False
+
+    # ------------------------------------------------------------------
+    # Base de datos
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload: dict) -> str:
+        """Guarda un trabajo nuevo y regresa su id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO email_jobs (id, status, payload, attempts, max_attempts, next_attempt_at,"
+            " created_at, updated_at) VALUES (?, ?, ?, 0, ?, ?, ?, ?)",
+            (job_id, PENDING, json.dumps(payload, ensure_ascii=False), self.max_attempts, now, now, now),
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Estado de un trabajo (sin el payload, que puede incluir la imagen)"""
+        row = self._connect().execute(
+            "SELECT id, status, attempts, max_attempts, next_attempt_at, last_error, created_at, updated_at"
+            " FROM email_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def counts(self) -> dict:
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) AS total FROM email_jobs GROUP BY status"
+        ).fetchall()
+        return {row["status"]: row["total"] for row in rows}
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Toma el siguiente trabajo vencido y lo marca como 'sending'"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM email_jobs WHERE status = ? AND next_attempt_at <= ?"
+                " ORDER BY next_attempt_at LIMIT 1",
+                (PENDING, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE email_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (SENDING, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _finish(self, job_id: str, attempts: int, max_attempts: int, result: dict):
+        now = time.time()
+        if result.get("success"):
+            self._connect().execute(
+                "UPDATE email_jobs SET status = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                (SENT, now, job_id),
+            )
+            return
+
+        error = result.get("message") or "Error desconocido"
+        if attempts >= max_attempts:
+            status, next_attempt_at = FAILED, now
+        else:
+            status, next_attempt_at = PENDING, now + self._backoff(attempts)
+        self._connect().execute(
+            "UPDATE email_jobs SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+            (status, error, next_attempt_at, now, job_id),
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        """Espera exponencial con jitter: base, 2*base, 4*base... hasta max_delay"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _release_stale(self):
+        """Regresa a pendientes los trabajos que quedaron 'sending' tras una caída"""
+        cutoff = time.time() - self.lease_seconds
+        released = self._connect().execute(
+            "UPDATE email_jobs SET status = ?, next_attempt_at = ? WHERE status = ? AND updated_at < ?",
+            (PENDING, time.time(), SENDING, cutoff),
+        ).rowcount
+        if released:
+            print(f"♻️  {released} trabajos de email reanudados tras reinicio")
+
+    def process_one(self) -> bool:
+        """Procesa un trabajo (bloqueante). Regresa False si no había trabajos vencidos"""
+        row = self._claim()
+        if row is None:
+            return False
+
+        attempts = row["attempts"] + 1
+        try:
+            result = self.sender(json.loads(row["payload"]))
+        except Exception as e:
+            result = {"success": False, "message": str(e)}
+
+        self._finish(row["id"], attempts, row["max_attempts"], result)
+        if result.get("success"):
+            print(f"✅ Trabajo de email {row['id']} enviado (intento {attempts})")
+        else:
+            print(f"❌ Trabajo de email {row['id']} falló (intento {attempts}): {result.get('message')}")
+        return True
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    async def start(self):
+        """Inicia los workers (llamar desde el lifespan de FastAPI)"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._release_stale)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"email-outbox-{i}")
+            for i in range(self.workers)
+        ]
+        print(f"📬 Outbox de emails iniciado con {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, number: int):
+        while True:
+            try:
+                processed = await asyncio.to_thread(self.process_one)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error en worker de emails {number}: {str(e)}")
+                processed = False
+
+            if not processed:
+                # Sin trabajos vencidos: esperar un aviso de enqueue o el siguiente sondeo
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -1,68 +1,285 @@
-import smtplib
+"""
+Envío de emails de confirmación con el pase adjunto
+
+EmailService no hace nada al importarse: la configuración (email_config.py o
+variables de entorno), el contexto SSL, el pool SMTP y los módulos smtplib y
+email.mime se cargan en el primer uso, o antes con warm_up() (lo llama el
+lifespan de main en segundo plano). Así un contenedor nuevo responde antes y
+el primer envío no paga la configuración ni el contexto SSL, que se crea una
+sola vez y se reutiliza en cada conexión.
+
+Los envíos transmiten el mensaje por partes (confirmation_parts): el esqueleto
+precompilado, el HTML del caché y el pase en bloques de líneas base64 van
+directo al socket SMTP, sin armar el mensaje completo en memoria.
+"""
+
+import asyncio
 import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 import os
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, List, Optional
 import base64
-from io import BytesIO
-from dotenv import load_dotenv
+import functools
+import itertools
+import random
+import sys
+from metrics import stage
+from email_templates import CONFIRMATION_HTML, confirmation_fields
+
+if TYPE_CHECKING:
+    import smtplib
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from smtp_pool import SMTPConnectionPool
+
+# Atributos que se leen de email_config.py o del entorno en el primer uso
+CONFIG_ATTRIBUTES = frozenset(("smtp_server", "smtp_port", "email", "password", "use_tls", "timeout"))
+
+# Bloque de lectura para codificar adjuntos: 57 bytes crudos = una línea base64 de 76
+BASE64_BLOCK = 57 * 1024
+
+# Subject sin emojis para evitar problemas de encoding
+SUBJECT = "Confirmacion de Asistencia - Posgrado en TICs"
+
+def _base64_lines(data: bytes) -> bytes:
+    """base64 en líneas de 76 caracteres terminadas en CRLF (como lo envía smtplib)"""
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+def _base64_blocks(data: bytes) -> Iterator[bytes]:
+    """data codificado por bloques de BASE64_BLOCK bytes (líneas completas)"""
+    view = memoryview(data)
+    for start in range(0, len(view), BASE64_BLOCK):
+        yield _base64_lines(view[start:start + BASE64_BLOCK])
+
+def _file_base64_blocks(f: BinaryIO) -> Iterator[bytes]:
+    """Archivo ya abierto codificado por bloques; lo cierra al terminar"""
+    with f:
+        while True:
+            block = f.read(BASE64_BLOCK)
+            if not block:
+                return
+            yield _base64_lines(block)
+
+# Cada entrada es el HTML en base64 de un invitado (~7.5 KB)
+HTML_CACHE_SIZE = int(os.getenv("EMAIL_HTML_CACHE_SIZE", "1024"))
 
-# Cargar variables de entorno
-load_dotenv()
+@functools.lru_cache(maxsize=HTML_CACHE_SIZE)
+def _encoded_confirmation_html(fields: tuple) -> bytes:
+    """
+    Parte HTML ya codificada para unos datos de invitado. Se guarda en caché
+    para que los reintentos y las campañas de reenvío no la vuelvan a generar.
+    """
+    return _base64_lines(CONFIRMATION_HTML.render_utf8(**dict(fields)))
 
 class EmailService:
     def __init__(self):
-        # Importar configuración local
-        try:
-            from email_config import EMAIL_CONFIG
-            self.smtp_server = EMAIL_CONFIG["smtp_server"]
-            self.smtp_port = EMAIL_CONFIG["smtp_port"]
-            self.email = EMAIL_CONFIG["email"]
-            self.password = EMAIL_CONFIG["password"]
-        except ImportError:
-            # Fallback a variables de entorno
-            self.smtp_server = "smtp.gmail.com"
-            self.smtp_port = 587
-            self.email = os.getenv("SMTP_EMAIL", "tu-email@gmail.com")
-            self.password = os.getenv("SMTP_PASSWORD", "tu-contrasena-de-aplicacion")
+        self._configured = False
+        self._lock = threading.Lock()
+        self._pool: Optional["SMTPConnectionPool"] = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        
+        # Esqueleto MIME precompilado (se recompila si cambia el remitente)
+        self._skeleton_for = None
+        self._skeleton = None
     
-    async def send_confirmation_email(self, to_email: str, guest_name: str, 
-                                    event_details: dict, pass_image_base64: Optional[str] = None):
+    def __getattr__(self, name: str):
+        # Solo se llega aquí si el atributo todavía no existe
+        if name in CONFIG_ATTRIBUTES and not self.__dict__.get("_configured"):
+            self.configure()
+            return getattr(self, name)
+        raise AttributeError(f"'EmailService' object has no attribute '{name}'")
+    
+    def configure(self):
         """
-        Envía email de confirmación con el pase de acceso
+        Lee la configuración (email_config.py o variables de entorno). Los
+        valores asignados antes (p. ej. un benchmark que apunta a un servidor
+        SMTP local) se respetan.
         """
-        try:
-            # Crear mensaje
-            message = MIMEMultipart("alternative")
-            # Subject sin emojis para evitar problemas de encoding
-            message["Subject"] = "Confirmacion de Asistencia - Posgrado en TICs"
-            message["From"] = self.email
-            message["To"] = to_email
-            
-            # Crear contenido HTML
-            html_content = self._create_email_html(guest_name, event_details)
-            
-            # Adjuntar contenido HTML con codificación UTF-8
-            html_part = MIMEText(html_content, "html", "utf-8")
-            message.attach(html_part)
-            
-            # Adjuntar imagen del pase si está disponible
-            if pass_image_base64:
-                self._attach_pass_image(message, pass_image_base64, guest_name)
-            
-            # Enviar email
+        with self._lock:
+            if self._configured:
+                return
+            # .env para scripts que importan este módulo sin pasar por main
+            from dotenv import load_dotenv
+            load_dotenv()
+            try:
+                # Importar configuración local
+                from email_config import EMAIL_CONFIG
+                settings = {
+                    "smtp_server": EMAIL_CONFIG["smtp_server"],
+                    "smtp_port": EMAIL_CONFIG["smtp_port"],
+                    "email": EMAIL_CONFIG["email"],
+                    "password": EMAIL_CONFIG["password"],
+                    "use_tls": EMAIL_CONFIG.get("use_tls", True),
+                }
+            except ImportError:
+                # Fallback a variables de entorno
+                settings = {
+                    "smtp_server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+                    "smtp_port": int(os.getenv("SMTP_PORT", "587")),
+                    "email": os.getenv("SMTP_EMAIL", "tu-email@gmail.com"),
+                    "password": os.getenv("SMTP_PASSWORD", "tu-contrasena-de-aplicacion"),
+                    "use_tls": os.getenv("SMTP_USE_TLS", "true").lower() != "false",
+                }
+            settings["timeout"] = float(os.getenv("SMTP_TIMEOUT", "30"))
+            for name, value in settings.items():
+                self.__dict__.setdefault(name, value)
+            self._configured = True
+    
+    @property
+    def pool(self) -> "SMTPConnectionPool":
+        """Sesiones SMTP reutilizables (evita connect + STARTTLS + AUTH por mensaje)"""
+        if self._pool is None:
+            from smtp_pool import SMTPConnectionPool
+            with self._lock:
+                if self._pool is None:
+                    self._pool = SMTPConnectionPool(
+                        self._connect,
+                        max_size=int(os.getenv("SMTP_POOL_SIZE", "4")),
+                        max_messages=int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")),
+                    )
+        return self._pool
+    
+    def close(self):
+        """Cierra las sesiones SMTP abiertas (si llegó a crearse el pool)"""
+        if self._pool is not None:
+            self._pool.close_all()
+    
+    def _tls_context(self) -> ssl.SSLContext:
+        """
+        Contexto para STARTTLS. Crearlo carga los certificados del sistema
+        (decenas de ms), así que se crea una vez y lo comparten las conexiones.
+        """
+        context = self._ssl_context
+        if context is None:
             context = ssl.create_default_context()
             # Solución para macOS - deshabilitar verificación SSL si es necesario
             context.check_hostname = False
             context.verify_mode = ssl.CERT_NONE
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=context)
+            self._ssl_context = context
+        return context
+    
+    def warm_up(self, connect: bool = False):
+        """
+        Prepara lo que pagaría el primer envío: configuración, módulos de
+        smtplib/email.mime, contexto SSL, pool y esqueleto MIME. Con connect=True
+        además deja abierta una sesión SMTP autenticada en el pool.
+        """
+        self.configure()
+        # Se importan aquí para que el primer envío no los cargue
+        import smtplib, email.mime.multipart, email.mime.text
+        if self.use_tls:
+            self._tls_context()
+        if self.email.isascii():
+            self._compiled_skeleton()
+        pool = self.pool
+        if connect:
+            with pool.connection():
+                pass
+    
+    def _connect(self) -> "smtplib.SMTP":
+        """
+        Abre una sesión SMTP autenticada (la usa el pool de conexiones)
+        """
+        import smtplib
+        with stage("smtp_connect"):
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                with stage("smtp_starttls"):
+                    server.starttls(context=self._tls_context())
+            with stage("smtp_login"):
                 server.login(self.email, self.password)
-                server.send_message(message)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def _deliver(self, message, to_email: Optional[str] = None):
+        """
+        Envía un mensaje por una sesión del pool: un MIMEMultipart o una
+        función que regresa las partes en bytes (confirmation_parts; en ese
+        caso se necesita to_email). Si la sesión prestada estaba caída (p. ej.
+        el servidor cerró por inactividad) se reintenta una vez con una sesión
+        nueva, volviendo a generar las partes.
+        """
+        import smtplib
+        for attempt in range(2):
+            try:
+                with self.pool.connection(fresh=attempt > 0) as server, stage("smtp_send"):
+                    if callable(message):
+                        self._send_parts(server, to_email, message())
+                    else:
+                        server.send_message(message)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if attempt:
+                    raise
+    
+    def _send_parts(self, server: "smtplib.SMTP", to_email: str, parts: Iterable[bytes]):
+        """
+        Como sendmail(), pero el cuerpo se escribe al socket parte por parte.
+        No hace falta duplicar puntos al inicio de línea: ninguna línea de las
+        partes empieza con "." (encabezados fijos, base64 y el destinatario a
+        media línea, que no admite saltos de línea).
+        """
+        import smtplib
+        server.ehlo_or_helo_if_needed()
+        code, response = server.mail(self.email)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, response, self.email)
+        code, response = server.rcpt(to_email)
+        if code not in (250, 251):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused({to_email: (code, response)})
+        code, response = server.docmd("data")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, response)
+        try:
+            for part in parts:
+                server.send(part)
+        except Exception:
+            # A medio DATA la sesión ya no se puede reutilizar
+            server.close()
+            raise
+        server.send(b".\r\n")
+        code, response = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+    
+    async def send_confirmation_email(self, to_email: str, guest_name: str, 
+                                    event_details: dict, pass_image_base64: Optional[str] = None,
+                                    pass_image_path: Optional[str] = None):
+        """
+        Envía email de confirmación con el pase de acceso (en un hilo, para no
+        bloquear el event loop durante la conexión SMTP)
+        """
+        return await asyncio.to_thread(
+            self.send_confirmation_email_sync, to_email, guest_name, event_details,
+            pass_image_base64, pass_image_path
+        )
+    
+    def send_confirmation_email_sync(self, to_email: str, guest_name: str, 
+                                     event_details: dict, pass_image_base64: Optional[str] = None,
+                                     pass_image_path: Optional[str] = None):
+        """
+        Envía email de confirmación con el pase de acceso (bloqueante). El pase
+        puede venir en base64 o como ruta a un PNG en disco.
+        """
+        try:
+            if self._can_use_skeleton(to_email):
+                def parts() -> Iterable[bytes]:
+                    with stage("mime_build"):
+                        return self.confirmation_parts(
+                            to_email, guest_name, event_details, pass_image_base64, pass_image_path
+                        )
+                self._deliver(parts, to_email)
+            else:
+                with stage("mime_build"):
+                    message = self.build_confirmation_message(
+                        to_email, guest_name, event_details, pass_image_base64, pass_image_path
+                    )
+                self._deliver(message)
                 
             return {"success": True, "message": "Email enviado exitosamente"}
             
@@ -73,101 +290,141 @@ class EmailService:
             traceback.print_exc()
             return {"success": False, "message": f"Error enviando email: {str(e)}"}
     
+    def send_bulk(self, messages: List[dict]) -> List[dict]:
+        """
+        Envía muchos emails reutilizando las sesiones del pool. Cada elemento
+        de messages tiene los argumentos de send_confirmation_email_sync; se
+        regresa un resultado por mensaje, en el mismo orden.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.pool.max_size) as executor:
+            return list(executor.map(lambda kwargs: self.send_confirmation_email_sync(**kwargs), messages))
+    
+    async def send_bulk_async(self, messages: List[dict]) -> List[dict]:
+        """
+        Versión asíncrona de send_bulk (se ejecuta en un hilo)
+        """
+        return await asyncio.to_thread(self.send_bulk, messages)
+    
+    def build_confirmation_message(self, to_email: str, guest_name: str,
+                                   event_details: dict, pass_image_base64: Optional[str] = None,
+                                   pass_image_path: Optional[str] = None) -> "MIMEMultipart":
+        """
+        Construye el mensaje MIME de confirmación
+        """
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        message = MIMEMultipart("alternative")
+        message["Subject"] = SUBJECT
+        message["From"] = self.email
+        message["To"] = to_email
+        
+        # Crear contenido HTML
+        html_content = self._create_email_html(guest_name, event_details)
+        
+        # Adjuntar contenido HTML con codificación UTF-8
+        html_part = MIMEText(html_content, "html", "utf-8")
+        message.attach(html_part)
+        
+        # Adjuntar imagen del pase si está disponible
+        if pass_image_path:
+            self._attach_pass_file(message, pass_image_path, guest_name)
+        elif pass_image_base64:
+            self._attach_pass_image(message, pass_image_base64, guest_name)
+        
+        return message
+    
+    def _can_use_skeleton(self, to_email: str) -> bool:
+        # Direcciones no ASCII o con saltos de línea van por el paquete email,
+        # que se encarga de codificarlas (o rechazarlas)
+        return (to_email.isascii() and self.email.isascii()
+                and not any(c in to_email for c in "\r\n,;") and "\n" not in self.email)
+    
+    def _compiled_skeleton(self) -> tuple:
+        """
+        Partes fijas del mensaje ya serializadas: encabezados, separadores MIME y
+        encabezados de la parte HTML y del adjunto. Solo el destinatario, el
+        HTML del invitado y el pase cambian entre mensajes.
+        """
+        if self._skeleton_for != self.email:
+            boundary = "=" * 15 + "%019d" % random.randrange(sys.maxsize) + "=="
+            self._skeleton = (
+                (f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'
+                 f'MIME-Version: 1.0\r\nSubject: {SUBJECT}\r\nFrom: {self.email}\r\nTo: ').encode('ascii'),
+                (f'\r\n\r\n--{boundary}\r\nContent-Type: text/html; charset="utf-8"\r\n'
+                 f'MIME-Version: 1.0\r\nContent-Transfer-Encoding: base64\r\n\r\n').encode('ascii'),
+                (f'--{boundary}\r\nContent-Type: image/png\r\nMIME-Version: 1.0\r\n'
+                 f'Content-Transfer-Encoding: base64\r\n').encode('ascii'),
+                f'--{boundary}--\r\n'.encode('ascii'),
+            )
+            self._skeleton_for = self.email
+        return self._skeleton
+    
+    def confirmation_parts(self, to_email: str, guest_name: str,
+                           event_details: dict, pass_image_base64: Optional[str] = None,
+                           pass_image_path: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Mismo mensaje que build_confirmation_message, en partes de bytes sobre
+        el esqueleto precompilado (sin construir ni serializar objetos del
+        paquete email). El pase se codifica un bloque a la vez mientras se
+        recorren las partes, así que nunca está completo en base64 en memoria;
+        el archivo se abre (o el base64 se decodifica) antes de regresar.
+        """
+        head, html_head, attachment_head, closing = self._compiled_skeleton()
+        parts: List[Iterable[bytes]] = [(
+            head, to_email.encode('ascii'), html_head,
+            _encoded_confirmation_html(confirmation_fields(guest_name, event_details)),
+        )]
+        
+        pass_blocks = self._pass_base64_blocks(pass_image_base64, pass_image_path)
+        if pass_blocks is not None:
+            filename = self._pass_filename(guest_name)
+            parts.append((
+                attachment_head,
+                f"Content-Disposition: attachment; filename*=utf-8''{filename}\r\n"
+                f"Content-ID: <pass_image>\r\n\r\n".encode('ascii'),
+            ))
+            parts.append(pass_blocks)
+            print(f"📎 Pase adjuntado: {filename}")
+        
+        parts.append((closing,))
+        return itertools.chain.from_iterable(parts)
+    
+    def build_confirmation_bytes(self, to_email: str, guest_name: str,
+                                 event_details: dict, pass_image_base64: Optional[str] = None,
+                                 pass_image_path: Optional[str] = None) -> bytes:
+        """El mensaje de confirmation_parts completo (para pruebas y benchmarks)"""
+        return b"".join(self.confirmation_parts(
+            to_email, guest_name, event_details, pass_image_base64, pass_image_path
+        ))
+    
+    def _pass_base64_blocks(self, pass_image_base64: Optional[str],
+                            pass_image_path: Optional[str]) -> Optional[Iterator[bytes]]:
+        """Pase en bloques de líneas base64, o None si no hay pase o no se pudo leer"""
+        try:
+            if pass_image_path:
+                return _file_base64_blocks(open(pass_image_path, 'rb'))
+            if pass_image_base64:
+                if ',' in pass_image_base64:
+                    pass_image_base64 = pass_image_base64.split(',')[1]
+                return _base64_blocks(base64.b64decode(pass_image_base64))
+        except Exception as e:
+            print(f"❌ Error adjuntando imagen: {str(e)}")
+            # No fallar el email si el adjunto falla
+        return None
+    
     def _create_email_html(self, guest_name: str, event_details: dict) -> str:
         """
-        Crea el contenido HTML del email
-        """
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
-                .container {{ max-width: 600px; margin: 0 auto; background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
-                .header {{ background: linear-gradient(135deg, #B8860B, #DAA520); color: white; padding: 30px; text-align: center; }}
-                .content {{ padding: 30px; }}
-                .confirmation-badge {{ background: #22C55E; color: white; padding: 10px 20px; border-radius: 25px; display: inline-block; margin: 20px 0; }}
-                .details {{ background: #f9f9f9; padding: 20px; border-radius: 8px; margin: 20px 0; }}
-                .detail-item {{ margin: 10px 0; display: flex; align-items: center; }}
-                .icon {{ margin-right: 10px; font-size: 18px; }}
-                .footer {{ background: #f9f9f9; padding: 20px; text-align: center; color: #666; }}
-                .button {{ background: #B8860B; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎓 Posgrado en TIC's</h1>
-                    <h2>¡Confirmación de Asistencia!</h2>
-                </div>
-                
-                <div class="content">
-                    <div class="confirmation-badge">
-                        ✅ Tu confirmación se guardó exitosamente
-                    </div>
-                    
-                    <p>Estimado/a <strong>{guest_name}</strong>,</p>
-                    
-                    <p>¡Excelente! Hemos recibido tu confirmación de asistencia para nuestro evento del Posgrado en TIC's.</p>
-                    
-                    <div class="details">
-                        <h3>📋 Datos de tu confirmación:</h3>
-                        <div class="detail-item">
-                            <span class="icon">👤</span>
-                            <strong>Nombre:</strong> {guest_name}
-                        </div>
-                        <div class="detail-item">
-                            <span class="icon">📧</span>
-                            <strong>Email:</strong> {event_details.get('email', 'No especificado')}
-                        </div>
-                        <div class="detail-item">
-                            <span class="icon">✅</span>
-                            <strong>Asistencia:</strong> {'SÍ ASISTIRÉ' if event_details.get('attending') else 'NO ASISTIRÉ'}
-                        </div>
-                        <div class="detail-item">
-                            <span class="icon">👥</span>
-                            <strong>Acompañantes:</strong> {event_details.get('companions', 0)}
-                        </div>
-                        <div class="detail-item">
-                            <span class="icon">📱</span>
-                            <strong>WhatsApp:</strong> {event_details.get('whatsapp', 'No especificado')}
-                        </div>
-                        <div class="detail-item">
-                            <span class="icon">🕐</span>
-                            <strong>Confirmado:</strong> {event_details.get('confirmed_at', 'Ahora')}
-                        </div>
-                    </div>
-                    
-                    <div style="background: #f0f9ff; padding: 15px; border-radius: 8px; border-left: 4px solid #3b82f6; margin: 20px 0;">
-                        <p><strong>📎 PASE DE ACCESO ADJUNTO</strong></p>
-                        <p>Hemos adjuntado tu pase de acceso oficial como archivo PNG a este correo.</p>
-                    </div>
-                    
-                    <p>🎯 <strong>Información importante:</strong></p>
-                    <ul>
-                        <li><strong>📎 Descarga el archivo adjunto</strong> "pase_acceso_[tu_nombre].png"</li>
-                        <li><strong>📱 Presenta el pase</strong> el día del evento (impreso o digital)</li>
-                        <li><strong>✅ Guarda el archivo</strong> en tu dispositivo móvil para fácil acceso</li>
-                        <li><strong>❓ Dudas:</strong> Contacta a la persona que te envió la invitación</li>
-                    </ul>
-                    
-                    <p>¡Te esperamos en este importante evento del Posgrado en TIC's!</p>
-                </div>
-                
-                <div class="footer">
-                    <p><small>Sistema de invitaciones desarrollado por <strong>IUX - Software Jurídico</strong></small></p>
-                    <p><small>Este es un mensaje automático, por favor no responder a este correo.</small></p>
-                </div>
-            </div>
-        </body>
-        </html>
+        Crea el contenido HTML del email (plantilla precompilada, campos escapados)
         """
+        return CONFIRMATION_HTML.render(**dict(confirmation_fields(guest_name, event_details)))
     
-    def _attach_pass_image(self, message: MIMEMultipart, image_base64: str, guest_name: str):
+    def _attach_pass_image(self, message: "MIMEMultipart", image_base64: str, guest_name: str):
         """
         Adjunta la imagen del pase de acceso al email
         """
+        from email import encoders
+        from email.mime.base import MIMEBase
         try:
             # Decodificar imagen base64
             if ',' in image_base64:
@@ -180,30 +437,63 @@ class EmailService:
             attachment.set_payload(image_data)
             encoders.encode_base64(attachment)
             
-            # Nombre del archivo limpio (solo ASCII)
-            import unicodedata
-            # Normalizar y remover acentos
-            normalized_name = unicodedata.normalize('NFKD', guest_name)
-            ascii_name = normalized_name.encode('ASCII', 'ignore').decode('ASCII')
-            safe_name = "".join(c for c in ascii_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            filename = f"pase_acceso_{safe_name.replace(' ', '_')}.png"
+            self._add_pass_attachment(message, attachment, guest_name)
             
-            # Usar codificación RFC 2231 para nombres de archivo con caracteres especiales
-            attachment.add_header(
-                'Content-Disposition',
-                'attachment',
-                filename=('utf-8', '', filename)
-            )
+        except Exception as e:
+            print(f"❌ Error adjuntando imagen: {str(e)}")
+            # No fallar el email si el adjunto falla
+    
+    def _attach_pass_file(self, message: "MIMEMultipart", path: str, guest_name: str):
+        """
+        Adjunta el pase desde un PNG en disco. El archivo se codifica en base64
+        por bloques (múltiplos de 57 bytes = líneas completas de 76 caracteres),
+        así que nunca se tienen en memoria los bytes crudos y el base64 a la vez.
+        """
+        from email.mime.base import MIMEBase
+        try:
+            chunks = []
+            with open(path, 'rb') as f:
+                while True:
+                    block = f.read(BASE64_BLOCK)
+                    if not block:
+                        break
+                    chunks.append(base64.encodebytes(block).decode('ascii'))
             
-            # También agregar Content-ID para mostrar inline si es necesario
-            attachment.add_header('Content-ID', '<pass_image>')
+            attachment = MIMEBase('image', 'png')
+            attachment.set_payload(''.join(chunks))
+            attachment['Content-Transfer-Encoding'] = 'base64'
             
-            message.attach(attachment)
-            print(f"📎 Pase adjuntado: {filename}")
+            self._add_pass_attachment(message, attachment, guest_name)
             
         except Exception as e:
             print(f"❌ Error adjuntando imagen: {str(e)}")
             # No fallar el email si el adjunto falla
+    
+    @staticmethod
+    def _pass_filename(guest_name: str) -> str:
+        # Nombre del archivo limpio (solo ASCII)
+        import unicodedata
+        # Normalizar y remover acentos
+        normalized_name = unicodedata.normalize('NFKD', guest_name)
+        ascii_name = normalized_name.encode('ASCII', 'ignore').decode('ASCII')
+        safe_name = "".join(c for c in ascii_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        return f"pase_acceso_{safe_name.replace(' ', '_')}.png"
+    
+    def _add_pass_attachment(self, message: "MIMEMultipart", attachment: "MIMEBase", guest_name: str):
+        filename = self._pass_filename(guest_name)
+        
+        # Usar codificación RFC 2231 para nombres de archivo con caracteres especiales
+        attachment.add_header(
+            'Content-Disposition',
+            'attachment',
+            filename=('utf-8', '', filename)
+        )
+        
+        # También agregar Content-ID para mostrar inline si es necesario
+        attachment.add_header('Content-ID', '<pass_image>')
+        
+        message.attach(attachment)
+        print(f"📎 Pase adjuntado: {filename}")
 
-# Instancia global del servicio
+# Instancia global del servicio (se configura en el primer uso)
 email_service = EmailService()
\ No newline at end of file
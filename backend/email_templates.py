@@ -0,0 +1,157 @@
+"""
+Plantillas de email precompiladas
+
+La plantilla se divide una sola vez (al importar) en segmentos fijos -ya
+codificados en UTF-8- y campos del invitado. Renderizar es solo intercalar los
+campos escapados con html.escape entre los segmentos, sin volver a construir el
+documento ni el bloque de estilos.
+
+Sintaxis: {{ campo }} marca un valor del invitado; todo lo demás (incluidas las
+llaves del CSS) se copia tal cual.
+"""
+
+import html
+import re
+from typing import Dict, List
+
+_FIELD = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class CompiledTemplate:
+    def __init__(self, source: str):
+        self.segments: List[str] = []
+        self.fields: List[str] = []
+        position = 0
+        for match in _FIELD.finditer(source):
+            self.segments.append(source[position:match.start()])
+            self.fields.append(match.group(1))
+            position = match.end()
+        self.segments.append(source[position:])
+        self.segments_utf8 = [segment.encode('utf-8') for segment in self.segments]
+
+    def _values(self, values: Dict[str, object]) -> List[str]:
+        return [html.escape(str(values[field]), quote=True) for field in self.fields]
+
+    def render(self, **values) -> str:
+        """Documento con los campos escapados"""
+        parts = [self.segments[0]]
+        for value, segment in zip(self._values(values), self.segments[1:]):
+            parts.append(value)
+            parts.append(segment)
+        return "".join(parts)
+
+    def render_utf8(self, **values) -> bytes:
+        """Igual que render() pero directo a UTF-8 (los segmentos ya están codificados)"""
+        parts = [self.segments_utf8[0]]
+        for value, segment in zip(self._values(values), self.segments_utf8[1:]):
+            parts.append(value.encode('utf-8'))
+            parts.append(segment)
+        return b"".join(parts)
+
+
+def _hashable(value):
+    # Los datos pueden venir del cliente (p. ej. una lista en guests): la tupla
+    # sirve de llave de caché, así que todo lo que no sea str/int va como texto
+    # (render() lo convierte con str() de todos modos)
+    return value if value is None or isinstance(value, (str, int)) else str(value)
+
+
+def confirmation_fields(guest_name: str, event_details: dict) -> tuple:
+    """Campos del invitado para CONFIRMATION_HTML, en el orden de la plantilla (hashables)"""
+    return (
+        ("guest_name", _hashable(guest_name)),
+        ("email", _hashable(event_details.get('email', 'No especificado'))),
+        ("attendance", 'SÍ ASISTIRÉ' if event_details.get('attending') else 'NO ASISTIRÉ'),
+        ("companions", _hashable(event_details.get('companions', 0))),
+        ("whatsapp", _hashable(event_details.get('whatsapp', 'No especificado'))),
+        ("confirmed_at", _hashable(event_details.get('confirmed_at', 'Ahora'))),
+    )
+
+
+# Email de confirmación con el pase de acceso adjunto
+CONFIRMATION_HTML = CompiledTemplate("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <style>
+                body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }
+                .container { max-width: 600px; margin: 0 auto; background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }
+                .header { background: linear-gradient(135deg, #B8860B, #DAA520); color: white; padding: 30px; text-align: center; }
+                .content { padding: 30px; }
+                .confirmation-badge { background: #22C55E; color: white; padding: 10px 20px; border-radius: 25px; display: inline-block; margin: 20px 0; }
+                .details { background: #f9f9f9; padding: 20px; border-radius: 8px; margin: 20px 0; }
+                .detail-item { margin: 10px 0; display: flex; align-items: center; }
+                .icon { margin-right: 10px; font-size: 18px; }
+                .footer { background: #f9f9f9; padding: 20px; text-align: center; color: #666; }
+                .button { background: #B8860B; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🎓 Posgrado en TIC's</h1>
+                    <h2>¡Confirmación de Asistencia!</h2>
+                </div>
+                
+                <div class="content">
+                    <div class="confirmation-badge">
+                        ✅ Tu confirmación se guardó exitosamente
+                    </div>
+                    
+                    <p>Estimado/a <strong>{{ guest_name }}</strong>,</p>
+                    
+                    <p>¡Excelente! Hemos recibido tu confirmación de asistencia para nuestro evento del Posgrado en TIC's.</p>
+                    
+                    <div class="details">
+                        <h3>📋 Datos de tu confirmación:</h3>
+                        <div class="detail-item">
+                            <span class="icon">👤</span>
+                            <strong>Nombre:</strong> {{ guest_name }}
+                        </div>
+                        <div class="detail-item">
+                            <span class="icon">📧</span>
+                            <strong>Email:</strong> {{ email }}
+                        </div>
+                        <div class="detail-item">
+                            <span class="icon">✅</span>
+                            <strong>Asistencia:</strong> {{ attendance }}
+                        </div>
+                        <div class="detail-item">
+                            <span class="icon">👥</span>
+                            <strong>Acompañantes:</strong> {{ companions }}
+                        </div>
+                        <div class="detail-item">
+                            <span class="icon">📱</span>
+                            <strong>WhatsApp:</strong> {{ whatsapp }}
+                        </div>
+                        <div class="detail-item">
+                            <span class="icon">🕐</span>
+                            <strong>Confirmado:</strong> {{ confirmed_at }}
+                        </div>
+                    </div>
+                    
+                    <div style="background: #f0f9ff; padding: 15px; border-radius: 8px; border-left: 4px solid #3b82f6; margin: 20px 0;">
+                        <p><strong>📎 PASE DE ACCESO ADJUNTO</strong></p>
+                        <p>Hemos adjuntado tu pase de acceso oficial como archivo PNG a este correo.</p>
+                    </div>
+                    
+                    <p>🎯 <strong>Información importante:</strong></p>
+                    <ul>
+                        <li><strong>📎 Descarga el archivo adjunto</strong> "pase_acceso_[tu_nombre].png"</li>
+                        <li><strong>📱 Presenta el pase</strong> el día del evento (impreso o digital)</li>
+                        <li><strong>✅ Guarda el archivo</strong> en tu dispositivo móvil para fácil acceso</li>
+                        <li><strong>❓ Dudas:</strong> Contacta a la persona que te envió la invitación</li>
+                    </ul>
+                    
+                    <p>¡Te esperamos en este importante evento del Posgrado en TIC's!</p>
+                </div>
+                
+                <div class="footer">
+                    <p><small>Sistema de invitaciones desarrollado por <strong>IUX - Software Jurídico</strong></small></p>
+                    <p><small>Este es un mensaje automático, por favor no responder a este correo.</small></p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """)
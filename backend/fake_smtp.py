@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Servidor SMTP falso para pruebas y benchmarks locales
+
+Acepta EHLO/HELO, AUTH (PLAIN/LOGIN, cualquier credencial), MAIL, RCPT, DATA,
+RSET, NOOP y QUIT, y solo cuenta los mensajes recibidos (no envía nada). No
+anuncia STARTTLS, así que EmailService debe usarse con SMTP_USE_TLS=false.
+
+Para que el costo de abrir sesiones sea visible, se puede simular la latencia
+del saludo inicial y del AUTH (connect_delay, auth_delay).
+
+Uso:
+    python fake_smtp.py --port 1025
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode('ascii'))
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        time.sleep(server.connect_delay)
+        with server.stats_lock:
+            server.connections += 1
+        self.reply("220 fake-smtp listo")
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode('utf-8', 'replace').strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n")
+                self.wfile.flush()
+            elif verb == "AUTH":
+                time.sleep(server.auth_delay)
+                parts = command.split()
+                if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                    # Usuario y contraseña en dos pasos
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                self.reply("235 Autenticado")
+            elif verb in ("MAIL", "RCPT", "RSET"):
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 Termina con <CRLF>.<CRLF>")
+                size = 0
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    size += len(line)
+                with server.stats_lock:
+                    server.messages += 1
+                    server.bytes_received += size
+                self.reply("250 Mensaje aceptado")
+            elif verb == "QUIT":
+                self.reply("221 Adios")
+                return
+            else:
+                self.reply("502 Comando no implementado")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 connect_delay: float = 0.0, auth_delay: float = 0.0):
+        super().__init__((host, port), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.auth_delay = auth_delay
+        self.stats_lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.bytes_received = 0
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeSMTPServer":
+        """Atiende en un hilo en segundo plano"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor SMTP falso")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    parser.add_argument("--auth-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(args.host, args.port, args.connect_delay, args.auth_delay)
+    print(f"📭 SMTP falso escuchando en {args.host}:{server.port} (Ctrl+C para detener)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.messages} mensajes en {server.connections} conexiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+JSON rápido con respaldo en la biblioteca estándar
+
+Un solo punto para codificar/decodificar JSON en el log de confirmaciones, la
+base de datos, el caché de respuestas y los eventos SSE. Usa orjson o msgspec
+si están instalados y json de la biblioteca estándar si no; los tres producen
+el mismo formato compacto en UTF-8, así que los archivos son intercambiables.
+
+JSON_BACKEND=auto|orjson|msgspec|stdlib elige la implementación (auto: la
+primera disponible en ese orden). use() la cambia en tiempo de ejecución
+(benchmarks).
+
+Los objetos con to_dict() (p. ej. Confirmation) se serializan como su dict.
+Una lista de objetos con to_json() (el listado de confirmaciones, solo o como
+"items" de una página) se arma uniendo el JSON que cada uno guarda, sin
+pasar cada registro por el hook default= del codificador.
+"""
+
+import json
+import os
+from typing import Any, Callable, Tuple
+
+from fastapi.responses import JSONResponse
+
+from metrics import stage
+
+BACKENDS = ("orjson", "msgspec", "stdlib")
+
+
+def _default(obj: Any) -> Any:
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+    return to_dict()
+
+
+def _stdlib() -> Tuple[Callable[[Any], bytes], Callable[[Any], Any]]:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, allow_nan=False,
+                          separators=(',', ':'), default=_default).encode('utf-8')
+    return dumps, json.loads
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default)
+    return dumps, orjson.loads
+
+
+def _msgspec():
+    import msgspec
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+    return encoder.encode, decoder.decode
+
+
+_LOADERS = {"orjson": _orjson, "msgspec": _msgspec, "stdlib": _stdlib}
+
+backend = "stdlib"
+_dumps, _loads = _stdlib()
+
+
+def use(name: str = "auto") -> str:
+    """Selecciona la implementación; regresa la que quedó activa"""
+    global backend, _dumps, _loads
+    candidates = BACKENDS if name == "auto" else (name,)
+    for candidate in candidates:
+        if candidate not in _LOADERS:
+            raise ValueError(f"JSON_BACKEND no soportado: {candidate}")
+        try:
+            _dumps, _loads = _LOADERS[candidate]()
+        except ImportError:
+            if name != "auto":
+                print(f"⚠️  {candidate} no está instalado, se usa json estándar")
+            continue
+        backend = candidate
+        return backend
+    _dumps, _loads = _stdlib()
+    backend = "stdlib"
+    return backend
+
+
+def _is_records(value: Any) -> bool:
+    if type(value) is not list or not value or not hasattr(value[0], "to_json"):
+        return False
+    kind = type(value[0])
+    return all(type(item) is kind for item in value)
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto en UTF-8 (sin escapar acentos)"""
+    if _is_records(obj):
+        return b"[" + b",".join(item.to_json(_dumps) for item in obj) + b"]"
+    if type(obj) is dict and any(_is_records(value) for value in obj.values()):
+        # Página {"items": [...], "total", "next_cursor"}
+        return b"{" + b",".join(_dumps(key) + b":" + dumps(value) for key, value in obj.items()) + b"}"
+    return _dumps(obj)
+
+
+def loads(data) -> Any:
+    """Acepta str o bytes; lanza ValueError si no es JSON válido"""
+    return _loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con el backend activo"""
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return dumps(content)
+
+
+use(os.getenv("JSON_BACKEND", "auto").lower())
@@ -0,0 +1,57 @@
+"""
+Caché en memoria con caducidad para reintentos de POST /api/confirmations
+
+Guarda llave -> folio por unos minutos ("key:<Idempotency-Key>" o
+"contact:<correo|teléfono>"), de modo que un doble clic o un reintento por red
+lenta se responde con el folio original sin validar contra el store ni
+escribir nada. La fuente de verdad sigue siendo el índice único del store:
+este caché solo evita el trabajo en el caso común.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TTLCache:
+    def __init__(self, ttl: float = 600.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # llave -> (expira, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            # Las entradas se insertan en orden de caducidad: las más viejas van primero
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._expire()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires >= now:
+                break
+            del self._entries[key]
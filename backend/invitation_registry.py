@@ -0,0 +1,311 @@
+"""
+Registro de invitaciones (data/invitations.json)
+
+La lista de invitados se importa desde un CSV exportado de la hoja de cálculo
+(POST /api/invitations/import). Cada invitación tiene un código, nombre,
+correo, teléfono y cuántos acompañantes puede llevar (max_guests; vacío = sin
+límite). En memoria hay dos índices, por código y por correo normalizado, así
+que al confirmar (POST /api/confirmations) la invitación se encuentra con una
+búsqueda en un dict, sin recorrer la lista.
+
+Importación:
+- El CSV se lee como texto por renglones (csv.reader acepta campos entre
+  comillas con saltos de línea) y se valida en lotes de batch_size renglones
+  con un solo TypeAdapter de pydantic por lote.
+- Los correos se validan con email_validator (como EmailStr), pero cada
+  dominio una sola vez: validar el dominio (IDNA) es casi todo el costo y una
+  lista de invitados repite unos cuantos dominios. Una parte local ASCII
+  común (dot-atom) se revisa con una expresión regular; cualquier otra forma
+  pasa por la validación completa.
+- Los encabezados se aceptan en español o inglés (código/code, nombre/name,
+  correo/email, teléfono/phone, acompañantes/max_guests), separados por
+  coma o por punto y coma (Excel en español).
+- Un renglón inválido, con código repetido o con un correo que ya tiene otra
+  invitación se omite y se reporta; los demás se importan. Sin código se
+  usa el de la invitación que ya tenga ese correo o se genera uno
+  (INV-XXXXXXXX).
+- replace=True sustituye el registro completo; si no, se agregan o
+  actualizan por código. dry_run=True solo valida.
+
+El archivo se reescribe completo (archivo temporal + os.replace) en cada
+importación, que son pocas. Otros workers lo vuelven a leer cuando cambia su
+fecha de modificación (se revisa como mucho cada reload_interval segundos).
+"""
+
+import csv
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from email_validator import EmailNotValidError, validate_email
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+
+import fast_json
+
+MAX_ERRORS_REPORTED = 100
+
+# Encabezado normalizado (minúsculas, sin acentos ni espacios) -> campo
+HEADER_ALIASES = {
+    "code": "code", "codigo": "code", "invitation_code": "code", "codigo_invitacion": "code",
+    "name": "name", "nombre": "name", "nombre_completo": "name", "invitado": "name",
+    "email": "email", "correo": "email", "correo_electronico": "email", "e-mail": "email",
+    "phone": "phone", "telefono": "phone", "whatsapp": "phone", "celular": "phone",
+    "max_guests": "max_guests", "guests": "max_guests", "acompanantes": "max_guests",
+    "max_acompanantes": "max_guests",
+}
+
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+
+# Parte local "dot-atom" de RFC 5322 (la forma de casi todos los correos)
+_DOT_ATOM = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*\Z")
+
+
+@functools.lru_cache(maxsize=4096)
+def _valid_domain(domain: str) -> str:
+    """Dominio normalizado por email_validator (ValueError si no es válido)"""
+    try:
+        return validate_email(f"x@{domain}", check_deliverability=False).domain
+    except EmailNotValidError as e:
+        raise ValueError(str(e))
+
+
+def check_email(value: str) -> str:
+    """Mismo resultado que EmailStr, validando cada dominio una sola vez"""
+    value = value.strip()
+    local, at, domain = value.rpartition("@")
+    if at and len(value) <= 254 and len(local) <= 64 and _DOT_ATOM.match(local):
+        return f"{local}@{_valid_domain(domain)}"
+    try:
+        return validate_email(value, check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(str(e))
+
+
+def _normalize_header(header: str) -> str:
+    ascii_header = unicodedata.normalize('NFKD', header).encode('ascii', 'ignore').decode('ascii')
+    return "_".join(ascii_header.strip().lower().split())
+
+
+class InvitationRow(BaseModel):
+    """Un renglón del CSV ya validado"""
+    code: Optional[str] = Field(None, max_length=64)
+    name: str = Field(..., min_length=1, max_length=200)
+    email: str
+    phone: Optional[str] = Field(None, max_length=40)
+    max_guests: Optional[int] = Field(None, ge=0, le=50)
+
+    @field_validator("code", "phone", "max_guests", mode="before")
+    @classmethod
+    def _empty_as_none(cls, value):
+        if isinstance(value, str):
+            value = value.strip()
+        return value if value != "" else None
+
+    @field_validator("email")
+    @classmethod
+    def _valid_email(cls, value: str) -> str:
+        return check_email(value)
+
+
+_ROWS = TypeAdapter(List[InvitationRow])
+
+
+class Invitation:
+    __slots__ = ("code", "name", "email", "phone", "max_guests")
+
+    def __init__(self, code: str, name: str, email: str, phone: Optional[str] = None,
+                 max_guests: Optional[int] = None):
+        self.code = code
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.max_guests = max_guests
+
+    def to_dict(self) -> dict:
+        return {"code": self.code, "name": self.name, "email": self.email,
+                "phone": self.phone, "max_guests": self.max_guests}
+
+    def allows(self, guests: int) -> bool:
+        return self.max_guests is None or guests <= self.max_guests
+
+
+class InvitationRegistry:
+    def __init__(self, path: str, reload_interval: float = 1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._by_code: Dict[str, Invitation] = {}
+        self._by_email: Dict[str, Invitation] = {}
+        self._loaded_stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Lecturas (O(1))
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._by_code)
+
+    def get(self, code: str) -> Optional[Invitation]:
+        self._refresh()
+        return self._by_code.get(code.strip().upper())
+
+    def find_by_email(self, email: str) -> Optional[Invitation]:
+        self._refresh()
+        return self._by_email.get(normalize_email(email))
+
+    def match(self, code: Optional[str], email: Optional[str]) -> Optional[Invitation]:
+        """La invitación de un RSVP: por código si lo trae, si no por correo"""
+        if code:
+            return self.get(code)
+        return self.find_by_email(email) if email else None
+
+    # ------------------------------------------------------------------
+    # Importación
+    # ------------------------------------------------------------------
+    def import_csv(self, text: TextIO, replace: bool = False, dry_run: bool = False,
+                   batch_size: int = 1000) -> dict:
+        """Importa un CSV (ver docstring del módulo) y regresa el resumen"""
+        with self._lock:
+            self._refresh(force=True)
+            by_code = {} if replace else dict(self._by_code)
+            by_email = {} if replace else dict(self._by_email)
+            seen = set()
+            summary = {"rows": 0, "created": 0, "updated": 0, "skipped": 0, "errors": []}
+
+            def reject(row_number: int, message: str):
+                summary["skipped"] += 1
+                if len(summary["errors"]) < MAX_ERRORS_REPORTED:
+                    summary["errors"].append({"row": row_number, "message": message})
+
+            for batch in self._batches(text, batch_size):
+                summary["rows"] += len(batch)
+                for row_number, row in self._validate(batch, reject):
+                    email = normalize_email(row.email)
+                    owner = by_email.get(email)
+                    if row.code:
+                        code = row.code.upper()
+                    else:
+                        code = owner.code if owner is not None else f"INV-{uuid.uuid4().hex[:8].upper()}"
+                    if code in seen:
+                        reject(row_number, f"Código repetido en el archivo: {code}")
+                        continue
+                    if owner is not None and owner.code != code:
+                        reject(row_number, f"El correo {email} ya tiene la invitación {owner.code}")
+                        continue
+                    seen.add(code)
+                    previous = by_code.get(code)
+                    if previous is not None:
+                        summary["updated"] += 1
+                        if by_email.get(normalize_email(previous.email)) is previous:
+                            del by_email[normalize_email(previous.email)]
+                    else:
+                        summary["created"] += 1
+                    invitation = Invitation(code, row.name.strip(), email, row.phone, row.max_guests)
+                    by_code[code] = invitation
+                    by_email[email] = invitation
+
+            summary["total"] = len(by_code)
+            if not dry_run:
+                self._save(by_code)
+                self._by_code, self._by_email = by_code, by_email
+            return summary
+
+    @staticmethod
+    def _batches(text: TextIO, batch_size: int) -> Iterator[List[Tuple[int, dict]]]:
+        """Renglones del CSV como (número de renglón, {campo: valor}) en lotes"""
+        first_line = text.readline()
+        delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+        reader = csv.reader(itertools.chain([first_line], text), delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = [HEADER_ALIASES.get(_normalize_header(column)) for column in header]
+        if "name" not in fields or "email" not in fields:
+            raise ValueError("El CSV necesita columnas de nombre y correo")
+        batch: List[Tuple[int, dict]] = []
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            row = {field: value for field, value in zip(fields, values) if field is not None}
+            batch.append((reader.line_num, row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _validate(batch: List[Tuple[int, dict]], reject) -> List[Tuple[int, InvitationRow]]:
+        """Valida el lote de una vez; si hay errores, los reporta y valida el resto"""
+        try:
+            rows = _ROWS.validate_python([row for _, row in batch])
+        except ValidationError as e:
+            invalid: Dict[int, str] = {}
+            for error in e.errors():
+                index, field = error["loc"][0], error["loc"][-1]
+                invalid.setdefault(index, f"{field}: {error['msg']}")
+            for index, message in invalid.items():
+                reject(batch[index][0], message)
+            batch = [item for index, item in enumerate(batch) if index not in invalid]
+            rows = _ROWS.validate_python([row for _, row in batch])
+        return [(row_number, row) for (row_number, _), row in zip(batch, rows)]
+
+    # ------------------------------------------------------------------
+    # Archivo
+    # ------------------------------------------------------------------
+    def _save(self, by_code: Dict[str, Invitation]):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(fast_json.dumps([invitation.to_dict() for invitation in by_code.values()]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._loaded_stat = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self, force: bool = False):
+        """Vuelve a leer el archivo si otro worker lo cambió"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        if self._stat() != self._loaded_stat:
+            self._load()
+
+    def _load(self):
+        stat = self._stat()
+        by_code: Dict[str, Invitation] = {}
+        by_email: Dict[str, Invitation] = {}
+        if stat is not None:
+            try:
+                with open(self.path, 'rb') as f:
+                    entries = fast_json.loads(f.read() or b"[]")
+            except ValueError as e:
+                print(f"❌ Error leyendo {self.path}: {str(e)}")
+                entries = []
+            for entry in entries:
+                invitation = Invitation(entry["code"], entry["name"], entry["email"],
+                                        entry.get("phone"), entry.get("max_guests"))
+                by_code[invitation.code] = invitation
+                by_email[invitation.email] = invitation
+        self._by_code, self._by_email = by_code, by_email
+        self._loaded_stat = stat
+        if by_code:
+            print(f"📋 {len(by_code)} invitaciones cargadas")
@@ -1,15 +1,42 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel, EmailStr
-from typing import Optional
-import json
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import io
 import os
+import shutil
+import tempfile
 from datetime import datetime
 import uuid
-from email_service import email_service
+from dotenv import load_dotenv
+
+# Variables de .env antes de importar los módulos que leen su configuración
+load_dotenv()
 
-app = FastAPI(title="Sistema de Invitaciones")
+from email_service import email_service
+from sql_store import create_store
+from confirmation_index import contact_key
+from confirmation_record import Confirmation, QR_URL_PREFIX
+from idempotency import TTLCache
+from confirmation_events import ConfirmationEvents
+from checkin_sync import CheckinSync
+from invitation_registry import Invitation, InvitationRegistry, normalize_email
+from rate_limit import (
+    DEFAULT_TRUSTED_PROXIES, ConcurrencyLimiter, create_rate_limiter, is_trusted_proxy, parse_networks, retry_after,
+)
+from response_cache import ResponseCache, cached_json_response
+from fast_json import FastJSONResponse
+import metrics
+from metrics import MetricsMiddleware, stage
+from email_outbox import EmailOutbox
+from email_campaigns import CampaignManager, event_details_for
+from pass_batch import export_passes
+from confirmation_export import (
+    CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, accepts_gzip, gzip_stream, iter_confirmations, stream_csv, stream_xlsx,
+)
 
 # Modelo para confirmación
 class ConfirmationRequest(BaseModel):
@@ -20,12 +47,319 @@ class ConfirmationRequest(BaseModel):
     phone: str
     comments: Optional[str] = None
     privacy_accept: bool = True
+    invitation_code: Optional[str] = Field(None, max_length=64)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _timed_validation(cls, data, handler):
+        # Etapa "validation" en /metrics
+        with stage("validation"):
+            return handler(data)
+
+# Llegadas en la entrada (escáneres de QR)
+class CheckinRequest(BaseModel):
+    scanned_at: Optional[datetime] = None
+    scanner_id: Optional[str] = Field(None, max_length=64)
+
+class OfflineCheckin(BaseModel):
+    folio: str = Field(..., max_length=64)
+    scanned_at: datetime
+    scanner_id: Optional[str] = Field(None, max_length=64)
+
+MAX_CHECKIN_BATCH = int(os.getenv("CHECKIN_SYNC_MAX_BATCH", "1000"))
+
+class CheckinSyncRequest(BaseModel):
+    scanner_id: Optional[str] = Field(None, max_length=64)
+    since: Optional[str] = Field(None, max_length=64)
+    checkins: List[OfflineCheckin] = Field(default_factory=list, max_length=MAX_CHECKIN_BATCH)
 
 # Rutas relativas desde backend/
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "static")
-DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data"))
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Almacenamiento de confirmaciones: log append-only en data/ o base de datos
+# si hay DATABASE_URL (en ambos casos con índice en memoria para las lecturas)
+confirmation_store = create_store(DATA_DIR)
+# Segundos que /health espera al store antes de responder 503
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT_SECONDS", "2"))
+
+# Reintentos y doble clic: Idempotency-Key y, opcionalmente, correo+teléfono
+# repetidos regresan el folio original sin escribir otra confirmación
+CONFIRMATION_DEDUP = os.getenv("CONFIRMATION_DEDUP", "false").lower() in ("1", "true", "yes")
+MAX_IDEMPOTENCY_KEY_LENGTH = 200
+idempotency_cache = TTLCache(
+    ttl=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600")),
+    max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+)
+
+# Altas y bajas en vivo para el panel (GET /api/confirmations/events)
+confirmation_events = ConfirmationEvents(
+    confirmation_store,
+    queue_size=int(os.getenv("EVENTS_QUEUE_SIZE", "100")),
+    max_clients=int(os.getenv("EVENTS_MAX_CLIENTS", "50")),
+)
+
+# Lista de invitados y llegadas para los escáneres (POST /api/checkin/sync)
+checkin_sync = CheckinSync(
+    confirmation_store,
+    journal_size=int(os.getenv("CHECKIN_JOURNAL_SIZE", "50000")),
+)
+
+# Invitaciones importadas de la hoja de cálculo (data/invitations.json), con
+# índices por código y correo para validar cada RSVP
+invitation_registry = InvitationRegistry(os.path.join(DATA_DIR, "invitations.json"))
+INVITATIONS_REQUIRED = os.getenv("INVITATIONS_REQUIRED", "true").lower() in ("1", "true", "yes")
+MAX_INVITATIONS_CSV_BYTES = int(os.getenv("MAX_INVITATIONS_CSV_BYTES", str(50 * 1024 * 1024)))
+INVITATIONS_BATCH_SIZE = int(os.getenv("INVITATIONS_BATCH_SIZE", "1000"))
+
+# Respuestas de lectura ya serializadas (con ETag), invalidadas por versión de datos
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+# Límites por IP y por correo en los endpoints públicos (429) y cupo de envíos
+# de pases simultáneos (503); ver rate_limit
+rate_limiter = create_rate_limiter(DATA_DIR)
+send_pass_slots = ConcurrencyLimiter(int(os.getenv("SEND_PASS_MAX_CONCURRENCY", "32")))
+TRUSTED_PROXIES = parse_networks(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", DEFAULT_TRUSTED_PROXIES))
+rejected_requests = metrics.registry.counter(
+    "invitaciones_rejected_requests_total", "Solicitudes rechazadas por límite o por carga", ("endpoint", "reason"))
+
+def client_ip(request: Request) -> str:
+    """IP del cliente; si la conexión viene de un proxy de confianza (nginx), la de X-Real-IP"""
+    peer = request.client.host if request.client else ""
+    if is_trusted_proxy(peer, TRUSTED_PROXIES):
+        real_ip = request.headers.get("x-real-ip", "").strip()
+        if real_ip:
+            return real_ip
+    return peer
+
+def enforce_rate_limit(endpoint: str, ip: Optional[str] = None, email: Optional[str] = None):
+    """429 con Retry-After si la IP o el correo ya agotaron sus solicitudes"""
+    wait = rate_limiter.check(endpoint, ip=ip, email=email.strip().lower() if email else None)
+    if wait:
+        rejected_requests.inc(endpoint, "rate_limit")
+        raise HTTPException(status_code=429, detail="Demasiadas solicitudes, intenta de nuevo más tarde",
+                            headers={"Retry-After": retry_after(wait)})
+
+def acquire_send_pass_slot():
+    """503 con Retry-After si ya hay SEND_PASS_MAX_CONCURRENCY envíos en curso (liberar con release())"""
+    if not send_pass_slots.try_acquire():
+        rejected_requests.inc("send_pass", "overload")
+        raise HTTPException(status_code=503, detail="Servicio saturado, intenta de nuevo en unos segundos",
+                            headers={"Retry-After": "5"})
+
+def check_invitation(confirmation: ConfirmationRequest) -> Optional[Invitation]:
+    """
+    Invitación del RSVP (por código o por correo, búsqueda O(1)). Sin
+    invitaciones importadas no se valida nada; con ellas, 403 si no hay
+    invitación (INVITATIONS_REQUIRED) y 422 si excede los acompañantes.
+    """
+    if len(invitation_registry) == 0:
+        return None
+    invitation = invitation_registry.match(confirmation.invitation_code, confirmation.email)
+    if invitation is None:
+        if INVITATIONS_REQUIRED:
+            raise HTTPException(status_code=403, detail="No encontramos una invitación para este correo o código")
+        return None
+    if confirmation.will_attend and not invitation.allows(confirmation.guests):
+        raise HTTPException(status_code=422,
+                            detail=f"Tu invitación permite hasta {invitation.max_guests} acompañantes")
+    return invitation
+
+# Respuestas del formulario que un reintento trae iguales; correo y teléfono
+# se comparan normalizados (contact_key), como en la deduplicación
+ANSWER_FIELDS = ("name", "will_attend", "guests", "comments", "privacy_accept")
+
+def same_answers(record: Confirmation, confirmation: ConfirmationRequest) -> bool:
+    """La confirmación guardada tiene las mismas respuestas que el envío (huella del cuerpo)"""
+    return (all(getattr(record, field) == getattr(confirmation, field) for field in ANSWER_FIELDS)
+            and contact_key(record.email, record.phone) == contact_key(confirmation.email, confirmation.phone))
+
+def replayed_confirmation(record: Confirmation, confirmation: ConfirmationRequest,
+                          idempotency_key: Optional[str]) -> FastJSONResponse:
+    """
+    Respuesta para un envío repetido: la confirmación original, sin crear otra,
+    solo si trae las mismas respuestas. La misma Idempotency-Key con otro cuerpo
+    es 422; el mismo correo + teléfono con otras respuestas es 409 (la nueva
+    respuesta no se pierde en silencio).
+    """
+    if not same_answers(record, confirmation):
+        if idempotency_key and record.idempotency_key == idempotency_key:
+            raise HTTPException(status_code=422,
+                                detail="La Idempotency-Key ya se usó con otros datos")
+        raise HTTPException(status_code=409,
+                            detail=f"Ya existe una confirmación con este correo y teléfono "
+                                   f"({record.folio}) con otras respuestas")
+    return FastJSONResponse(status_code=200, content=record, headers={"Idempotent-Replayed": "true"})
+
+def arrival_time(scanned_at: Optional[datetime]) -> str:
+    """Hora de llegada en ISO-8601 local sin zona (como timestamp); una hora futura se toma como ahora"""
+    now = datetime.now()
+    if scanned_at is None:
+        return now.isoformat()
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone().replace(tzinfo=None)
+    return min(scanned_at, now).isoformat()
+
+def checkin_result(folio: str, record: Optional[Confirmation], changed: bool) -> dict:
+    """Resultado de registrar una llegada, con la hora que quedó guardada"""
+    if record is None:
+        return {"folio": folio, "status": "not_found"}
+    return {
+        "folio": folio,
+        "status": "checked_in" if changed else "already_checked_in",
+        "name": record.name,
+        "guests": record.guests,
+        "will_attend": record.will_attend,
+        "checked_in_at": record.checked_in_at,
+        "checked_in_by": record.checked_in_by,
+    }
+
+def render_pass_for_folio(folio: Optional[str]) -> Optional[str]:
+    """Pase en base64 generado en el servidor (None si el folio no existe)"""
+    record = confirmation_store.get(folio) if folio else None
+    if record is None:
+        return None
+    # Pillow solo se carga al generar el primer pase
+    from pass_generator import pass_generator
+    with stage("pass_render"):
+        return pass_generator.pass_for_confirmation(record)
+
+def send_pass_email_job(payload: dict) -> dict:
+    """Envía el email de un trabajo del outbox (se ejecuta en un hilo del worker)"""
+    pass_image_path = payload.get('pass_image_path')
+    pass_image_base64 = payload.get('pass_image_base64')
+    if not pass_image_path and not pass_image_base64:
+        pass_image_base64 = render_pass_for_folio(payload.get('folio'))
+        if pass_image_base64 is None:
+            # Sin pase no se envía: el outbox reintenta con backoff y marca
+            # el trabajo como failed al agotar los intentos
+            raise LookupError(f"Confirmación {payload.get('folio')} no encontrada para generar el pase")
+    
+    result = email_service.send_confirmation_email_sync(
+        to_email=payload['email'],
+        guest_name=payload['name'],
+        event_details=payload['event_details'],
+        pass_image_base64=pass_image_base64,
+        pass_image_path=pass_image_path
+    )
+    # El PNG subido solo se necesita hasta que el email sale; si el envío
+    # falla se conserva para los reintentos
+    if result.get("success") and pass_image_path:
+        try:
+            os.remove(pass_image_path)
+        except OSError:
+            pass
+    return result
+
+async def pass_owner(folio: Optional[str], email: Optional[str]) -> Confirmation:
+    """
+    Confirmación del pase que se quiere enviar. El pase solo se envía al
+    correo con el que se registró: 404 si el folio no existe y 403 si el
+    correo no es el de la confirmación.
+    """
+    record = await confirmation_store.fetch(folio) if folio else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Confirmación no encontrada")
+    if normalize_email(record.email) != normalize_email(email):
+        raise HTTPException(status_code=403, detail="El correo no corresponde a la confirmación")
+    return record
+
+# Cola durable de emails (SQLite) con workers y reintentos
+email_outbox = EmailOutbox(
+    os.path.join(DATA_DIR, "email_outbox.db"),
+    sender=send_pass_email_job,
+    workers=int(os.getenv("EMAIL_WORKERS", "2")),
+    max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "5")),
+)
+
+def send_campaign_email(record: Confirmation) -> dict:
+    """Reenvía el email de confirmación de una campaña (se ejecuta en un hilo)"""
+    from pass_generator import pass_generator
+    return email_service.send_confirmation_email_sync(
+        to_email=record.email,
+        guest_name=record.name,
+        event_details=event_details_for(record),
+        pass_image_base64=pass_generator.pass_for_confirmation(record)
+    )
+
+# Pases subidos como PNG binario (POST /api/send-pass-email/upload)
+ATTACHMENTS_DIR = os.path.join(DATA_DIR, "email_attachments")
+MAX_PASS_IMAGE_BYTES = int(os.getenv("MAX_PASS_IMAGE_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def persist_upload(spool, path: str):
+    """Copia el archivo temporal a disco por bloques (se ejecuta en un hilo)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    spool.seek(0)
+    with open(path + ".tmp", 'wb') as f:
+        shutil.copyfileobj(spool, f)
+    os.replace(path + ".tmp", path)
+
+# Campañas de reenvío masivo con límite de velocidad y checkpoints en disco
+campaign_manager = CampaignManager(DATA_DIR, confirmation_store, send=send_campaign_email)
+
+# Modelo para crear una campaña de reenvío
+class CampaignRequest(BaseModel):
+    rate_per_second: float = Field(float(os.getenv("CAMPAIGN_RATE_PER_SECOND", "5")), gt=0, le=100)
+    concurrency: int = Field(int(os.getenv("CAMPAIGN_CONCURRENCY", "4")), ge=1, le=32)
+    only_attending: bool = True
+
+def start_email_warm_up() -> Optional[asyncio.Task]:
+    """
+    Prepara EmailService en segundo plano (EMAIL_WARMUP): true = configuración,
+    contexto SSL y módulos; connect = además abre una sesión SMTP; false = nada
+    (se inicializa con el primer envío). No retrasa el arranque del servidor.
+    """
+    mode = os.getenv("EMAIL_WARMUP", "true").lower()
+    if mode in ("0", "false", "no"):
+        return None
+
+    async def warm_up():
+        try:
+            await asyncio.to_thread(email_service.warm_up, connect=(mode == "connect"))
+        except Exception as e:
+            print(f"⚠️ No se pudo preparar el servicio de email: {str(e)}")
+
+    return asyncio.create_task(warm_up())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await confirmation_store.start()
+    await confirmation_events.start()
+    checkin_sync.start()
+    await email_outbox.start()
+    await campaign_manager.resume_all()
+    warm_up = start_email_warm_up()
+    yield
+    if warm_up is not None:
+        await warm_up
+    await confirmation_events.stop()
+    await campaign_manager.stop()
+    await email_outbox.stop()
+    email_service.close()
+    await confirmation_store.stop()
+
+app = FastAPI(title="Sistema de Invitaciones", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Latencia por ruta y etapas internas en GET /metrics (formato Prometheus)
+if metrics.ENABLED:
+    app.add_middleware(MetricsMiddleware)
+metrics.registry.gauge("invitaciones_confirmations", "Confirmaciones en el índice en memoria",
+                       lambda: len(confirmation_store))
+metrics.registry.gauge("invitaciones_checked_in", "Invitados que ya registraron su llegada",
+                       lambda: checkin_sync.checked_in_count)
+metrics.registry.gauge("invitaciones_sse_clients", "Paneles conectados a /api/confirmations/events",
+                       lambda: confirmation_events.client_count)
+metrics.registry.gauge("invitaciones_email_jobs", "Trabajos de la bandeja de emails por estado",
+                       email_outbox.counts, label="status")
+metrics.registry.gauge("invitaciones_response_cache", "Caché de respuestas (entradas, bytes, aciertos, fallos)",
+                       response_cache.stats, label="stat")
+
 # Ruta para servir archivos estáticos
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
@@ -43,57 +377,150 @@ def confirmation_page():
 def test():
     return {"status": "ok", "message": "API funcionando correctamente"}
 
+@app.get("/health")
+async def health():
+    """Estado para el healthcheck de docker-compose: el store (y su base de datos) responde"""
+    try:
+        await asyncio.wait_for(confirmation_store.ping(), HEALTH_TIMEOUT)
+        confirmations = len(confirmation_store)
+    except asyncio.TimeoutError:
+        return FastJSONResponse(status_code=503, content={"status": "error", "detail": "El store no respondió a tiempo"})
+    except Exception as e:
+        return FastJSONResponse(status_code=503, content={"status": "error", "detail": str(e)})
+    return {"status": "ok", "store": type(confirmation_store).__name__, "confirmations": confirmations}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Métricas en formato de texto de Prometheus"""
+    # Los gauges consultan SQLite (bandeja de emails) y el log: fuera del event loop
+    content = await asyncio.to_thread(metrics.registry.render)
+    return Response(content=content, media_type=metrics.CONTENT_TYPE)
+
 @app.post("/api/confirmations")
-async def create_confirmation(confirmation: ConfirmationRequest):
-    """Crear una nueva confirmación de asistencia"""
+async def create_confirmation(
+    confirmation: ConfirmationRequest,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
+):
+    """
+    Crear una nueva confirmación de asistencia.
+    Con el header Idempotency-Key (o el mismo correo + teléfono, si
+    CONFIRMATION_DEDUP está activo) un reintento con las mismas respuestas
+    regresa la confirmación original con 200 e Idempotent-Replayed: true.
+    """
+    enforce_rate_limit("confirm", ip=client_ip(request), email=confirmation.email)
+    invitation = check_invitation(confirmation)
     try:
+        cache_keys = []
+        if idempotency_key:
+            cache_keys.append(f"key:{idempotency_key}")
+        contact = contact_key(confirmation.email, confirmation.phone)
+        if CONFIRMATION_DEDUP and contact:
+            cache_keys.append(f"contact:{contact}")
+        for cache_key in cache_keys:
+            folio = idempotency_cache.get(cache_key)
+            existing = confirmation_store.get(folio) if folio else None
+            if existing is not None:
+                return replayed_confirmation(existing, confirmation, idempotency_key)
+
         # Generar folio único
         folio = f"UP-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
         
         # Crear objeto de confirmación
-        confirmation_data = {
-            "folio": folio,
-            "name": confirmation.name,
-            "email": confirmation.email,
-            "will_attend": confirmation.will_attend,
-            "guests": confirmation.guests,
-            "phone": confirmation.phone,
-            "comments": confirmation.comments,
-            "privacy_accept": confirmation.privacy_accept,
-            "timestamp": datetime.now().isoformat(),
-            "qr_url": f"http://localhost:8000/confirmation/{folio}"
-        }
-        
-        # Guardar en archivo JSON
-        confirmations_file = os.path.join(DATA_DIR, "confirmations.json")
-        
-        # Leer confirmaciones existentes
-        confirmations = []
-        if os.path.exists(confirmations_file):
-            with open(confirmations_file, 'r', encoding='utf-8') as f:
-                try:
-                    confirmations = json.load(f)
-                except json.JSONDecodeError:
-                    confirmations = []
-        
-        # Agregar nueva confirmación
-        confirmations.append(confirmation_data)
+        confirmation_data = Confirmation(
+            folio=folio,
+            name=confirmation.name,
+            email=confirmation.email,
+            will_attend=confirmation.will_attend,
+            guests=confirmation.guests,
+            phone=confirmation.phone,
+            comments=confirmation.comments,
+            privacy_accept=confirmation.privacy_accept,
+            timestamp=datetime.now().isoformat(),
+            qr_url=f"{QR_URL_PREFIX}{folio}",
+            idempotency_key=idempotency_key,
+            invitation_code=invitation.code if invitation is not None else None,
+        )
         
-        # Guardar todas las confirmaciones
-        with open(confirmations_file, 'w', encoding='utf-8') as f:
-            json.dump(confirmations, f, ensure_ascii=False, indent=2)
+        # Guardar en el log de confirmaciones (una sola línea por alta), salvo
+        # que el índice único encuentre la confirmación original
+        with stage("store_write"):
+            stored, created = await confirmation_store.add_unique(confirmation_data, dedup=CONFIRMATION_DEDUP)
+        for cache_key in cache_keys if stored.folio else ():
+            idempotency_cache.set(cache_key, stored.folio)
+        if not created:
+            return replayed_confirmation(stored, confirmation, idempotency_key)
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=201,
             content=confirmation_data
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al guardar confirmación: {str(e)}")
 
+def import_invitations_csv(spool, replace: bool, dry_run: bool) -> dict:
+    """Importa el CSV ya recibido (se ejecuta en un hilo); UTF-8 o, si no lo es, Windows-1252 (Excel)"""
+    for encoding in ("utf-8-sig", "cp1252"):
+        spool.seek(0)
+        text = io.TextIOWrapper(spool, encoding=encoding, newline="")
+        try:
+            return invitation_registry.import_csv(text, replace=replace, dry_run=dry_run,
+                                                  batch_size=INVITATIONS_BATCH_SIZE)
+        except UnicodeDecodeError:
+            continue
+        finally:
+            text.detach()
+    raise ValueError("El CSV debe estar en UTF-8")
+
+@app.post("/api/invitations/import")
+async def import_invitations(request: Request, replace: bool = False, dry_run: bool = False):
+    """
+    Importa la lista de invitados: el cuerpo es el CSV tal cual
+    (Content-Type: text/csv), con encabezados nombre, correo y opcionalmente
+    código, teléfono y acompañantes. Se recibe por bloques a un archivo
+    temporal y se valida por lotes (ver invitation_registry). replace=true
+    sustituye el registro; dry_run=true solo valida.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_INVITATIONS_CSV_BYTES:
+                raise HTTPException(status_code=413, detail="El archivo de invitaciones es demasiado grande")
+            spool.write(chunk)
+        
+        try:
+            summary = await asyncio.to_thread(import_invitations_csv, spool, replace, dry_run)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    print(f"📋 Invitaciones: {summary['created']} nuevas, {summary['updated']} actualizadas,"
+          f" {summary['skipped']} omitidas{' (prueba)' if dry_run else ''}")
+    return {"success": True, "dry_run": dry_run, **summary}
+
+@app.get("/api/invitations/{code}")
+async def get_invitation(code: str):
+    """Datos de una invitación para el formulario (nombre y acompañantes permitidos)"""
+    invitation = invitation_registry.get(code)
+    if invitation is None:
+        raise HTTPException(status_code=404, detail="Invitación no encontrada")
+    return {"code": invitation.code, "name": invitation.name, "max_guests": invitation.max_guests}
+
 @app.post("/api/send-pass-email")
 async def send_pass_email(request: Request):
-    """Endpoint para recibir la imagen del pase y enviar por email"""
+    """
+    Endpoint para encolar el envío del pase por email.
+    Se requiere el folio y el correo con el que se confirmó (ver pass_owner);
+    el destinatario y los detalles se toman de la confirmación guardada.
+    Si no se incluye pass_image_base64, el pase se genera en el servidor a
+    partir del folio. Regresa 202 con el id del trabajo; el estado se consulta
+    en GET /api/send-pass-email/{job_id}.
+    """
+    enforce_rate_limit("send_pass", ip=client_ip(request))
+    acquire_send_pass_slot()
     try:
         data = await request.json()
         email = data.get('email')
@@ -103,98 +530,397 @@ async def send_pass_email(request: Request):
         
         print(f"📧 Pase recibido para envío: {name} ({email}) - Folio: {folio}")
         
-        # Preparar detalles del evento para el email
-        event_details = {
-            'email': email,
-            'attending': True,
-            'companions': data.get('guests', 0),
-            'whatsapp': data.get('phone', ''),
-            'confirmed_at': datetime.now().strftime('%d/%m/%Y %H:%M')
-        }
-        
-        # Enviar email con el pase adjunto
-        result = await email_service.send_confirmation_email(
-            to_email=email,
-            guest_name=name,
-            event_details=event_details,
-            pass_image_base64=pass_image_base64
+        if not email or not folio:
+            return FastJSONResponse(
+                status_code=400,
+                content={"success": False, "message": "Se requieren email y folio"}
+            )
+        enforce_rate_limit("send_pass", email=email)
+        record = await pass_owner(folio, email)
+        
+        # Encolar el email con el pase adjunto (lo envían los workers del outbox)
+        with stage("outbox_enqueue"):
+            job_id = await asyncio.to_thread(email_outbox.enqueue, {
+                'email': record.email,
+                'name': record.name,
+                'folio': folio,
+                'event_details': event_details_for(record),
+                'pass_image_base64': pass_image_base64
+            })
+        
+        return FastJSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "job_id": job_id,
+                "status": "pending",
+                "message": "Email en cola de envío"
+            }
         )
         
-        if result['success']:
-            print(f"✅ Email enviado exitosamente a {email}")
-        else:
-            print(f"❌ Error enviando email: {result['message']}")
-        
-        return result
-        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error en send-pass-email: {str(e)}")
         return {"success": False, "message": str(e)}
+    finally:
+        send_pass_slots.release()
 
-@app.get("/api/confirmations")
-async def get_confirmations():
-    """Obtener todas las confirmaciones"""
+@app.post("/api/send-pass-email/upload")
+async def send_pass_email_upload(
+    request: Request,
+    email: str,
+    folio: str,
+    name: Optional[str] = None,
+    guests: int = 0,
+    phone: str = '',
+):
+    """
+    Variante binaria de /api/send-pass-email: los datos van en la query y el
+    cuerpo es el PNG tal cual (Content-Type: image/png). El cuerpo se lee por
+    bloques a un archivo temporal (en memoria hasta 1 MB), se valida tamaño y
+    firma PNG sin decodificarlo, y el outbox lo adjunta directo desde disco.
+    Como en /api/send-pass-email, el correo debe ser el de la confirmación y
+    name, guests y phone se toman de ella (se aceptan por compatibilidad).
+    """
+    enforce_rate_limit("send_pass", ip=client_ip(request), email=email)
+    record = await pass_owner(folio, email)
+    acquire_send_pass_slot()
     try:
-        confirmations_file = os.path.join(DATA_DIR, "confirmations.json")
-        
-        if not os.path.exists(confirmations_file):
-            return []
+        return await receive_pass_upload(request, record)
+    finally:
+        send_pass_slots.release()
+
+async def receive_pass_upload(request: Request, record: Confirmation) -> FastJSONResponse:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_PASS_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="La imagen del pase es demasiado grande")
+    
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_PASS_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail="La imagen del pase es demasiado grande")
+            spool.write(chunk)
+        
+        spool.seek(0)
+        if spool.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+            raise HTTPException(status_code=415, detail="El pase debe ser una imagen PNG")
+        
+        print(f"📧 Pase recibido para envío: {record.name} ({record.email}) - Folio: {record.folio} - {size} bytes")
+        
+        try:
+            pass_image_path = os.path.join(ATTACHMENTS_DIR, f"{uuid.uuid4().hex}.png")
+            await asyncio.to_thread(persist_upload, spool, pass_image_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al guardar el pase: {str(e)}")
+    
+    with stage("outbox_enqueue"):
+        job_id = await asyncio.to_thread(email_outbox.enqueue, {
+            'email': record.email,
+            'name': record.name,
+            'folio': record.folio,
+            'event_details': event_details_for(record),
+            'pass_image_path': pass_image_path
+        })
+    
+    return FastJSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "job_id": job_id,
+            "status": "pending",
+            "message": "Email en cola de envío"
+        }
+    )
+
+@app.get("/api/send-pass-email/{job_id}")
+async def get_pass_email_status(job_id: str):
+    """Estado de un envío encolado: pending, sending, sent o failed"""
+    job = await asyncio.to_thread(email_outbox.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de email no encontrado")
+    return job
+
+@app.post("/api/campaigns/resend-passes")
+async def create_resend_campaign(campaign: CampaignRequest):
+    """
+    Reenviar el email a todas las confirmaciones (por defecto solo a las que
+    asisten). La campaña corre en segundo plano; el progreso se consulta en
+    GET /api/campaigns/{campaign_id}.
+    """
+    try:
+        state = await asyncio.to_thread(
+            campaign_manager.create,
+            rate_per_second=campaign.rate_per_second,
+            concurrency=campaign.concurrency,
+            only_attending=campaign.only_attending,
+        )
+        campaign_manager.start(state["id"])
         
-        with open(confirmations_file, 'r', encoding='utf-8') as f:
-            confirmations = json.load(f)
+        return FastJSONResponse(
+            status_code=202,
+            content=await asyncio.to_thread(campaign_manager.get, state["id"])
+        )
         
-        return confirmations
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al crear campaña: {str(e)}")
+
+@app.get("/api/campaigns")
+async def list_campaigns():
+    """Listar campañas de reenvío (la más reciente primero)"""
+    return await asyncio.to_thread(campaign_manager.list)
+
+@app.get("/api/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    """Progreso de una campaña: enviados, fallidos y detalle de fallos"""
+    campaign = await asyncio.to_thread(campaign_manager.get, campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaña no encontrada")
+    return campaign
+
+@app.post("/api/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    """Detener una campaña en curso (conserva el progreso)"""
+    campaign = await campaign_manager.cancel(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaña no encontrada")
+    return campaign
+
+@app.get("/api/passes/export")
+async def export_all_passes(
+    format: str = Query("zip", pattern="^(zip|pdf)$"),
+    only_attending: bool = True,
+):
+    """
+    Descargar los pases de todas las confirmaciones: ZIP con un PNG por pase
+    o PDF con una página por pase. Se generan en varios procesos y se envían
+    conforme terminan.
+    """
+    try:
+        records = [
+            record for record in confirmation_store.all()
+            if record.folio and (record.will_attend or not only_attending)
+        ]
+        workers = int(os.getenv("PASS_RENDER_WORKERS", "0")) or None
+        media_type = "application/pdf" if format == "pdf" else "application/zip"
+        
+        return StreamingResponse(
+            export_passes(records, format, workers=workers),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="pases.{format}"'}
+        )
         
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar pases: {str(e)}")
+
+@app.get("/api/confirmations")
+async def get_confirmations(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    will_attend: Optional[bool] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    folio_prefix: Optional[str] = None,
+    sort: str = Query("timestamp", pattern="^(timestamp|name|guests|folio)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    """
+    Obtener confirmaciones.
+
+    Sin parámetros regresa la lista completa (compatibilidad). Con cualquier
+    parámetro regresa una página {"items", "total", "next_cursor"} filtrada y
+    ordenada desde los índices secundarios; para la siguiente página se envía
+    cursor=next_cursor con los mismos filtros.
+    """
+    try:
+        # Misma versión de datos y mismos parámetros: mismos bytes (y ETag)
+        cache_key = ("confirmations", confirmation_store.version, tuple(sorted(request.query_params.multi_items())))
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached_json_response(request, cached)
+
+        if not request.query_params:
+            with stage("store_read"):
+                records = confirmation_store.all()
+            return cached_json_response(request, response_cache.put(cache_key, records))
+        
+        with stage("store_read"):
+            page = confirmation_store.query(
+                will_attend=will_attend,
+                date_from=date_from,
+                date_to=date_to,
+                name=name,
+                email=email,
+                phone=phone,
+                folio_prefix=folio_prefix,
+                sort=sort,
+                descending=(order == "desc"),
+                cursor=cursor,
+                limit=limit,
+            )
+        return cached_json_response(request, response_cache.put(cache_key, page))
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener confirmaciones: {str(e)}")
 
+@app.get("/api/confirmations/export")
+async def export_confirmations(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    will_attend: Optional[bool] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    folio_prefix: Optional[str] = None,
+    sort: str = Query("timestamp", pattern="^(timestamp|name|guests|folio)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+):
+    """
+    Descargar las confirmaciones en CSV o XLSX con los mismos filtros y orden
+    del listado. El archivo se genera en streaming desde el store; el CSV se
+    comprime con gzip si el Accept-Encoding del cliente lo admite (q > 0).
+    """
+    records = iter_confirmations(
+        confirmation_store,
+        will_attend=will_attend,
+        date_from=date_from,
+        date_to=date_to,
+        name=name,
+        email=email,
+        phone=phone,
+        folio_prefix=folio_prefix,
+        sort=sort,
+        descending=(order == "desc"),
+    )
+    filename = f"asistentes_{datetime.now().strftime('%Y-%m-%d')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "xlsx":
+        return StreamingResponse(stream_xlsx(records), media_type=XLSX_MEDIA_TYPE, headers=headers)
+
+    body = stream_csv(records)
+    headers["Vary"] = "Accept-Encoding"
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=CSV_MEDIA_TYPE, headers=headers)
+
+@app.get("/api/confirmations/events")
+async def confirmation_events_stream(request: Request):
+    """
+    Server-Sent Events para el panel: created/updated/deleted con el registro,
+    stats con los contadores y reset cuando el panel debe recargar.
+    """
+    if confirmation_events.is_full():
+        raise HTTPException(status_code=503, detail="Demasiados paneles conectados",
+                            headers={"Retry-After": "10"})
+    return StreamingResponse(
+        confirmation_events.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/confirmations/stats")
+async def get_confirmation_stats(request: Request):
+    """Estadísticas de asistencia (contadores incrementales y serie por día)"""
+    try:
+        cache_key = ("stats", confirmation_store.version)
+        cached = response_cache.get(cache_key) or response_cache.put(cache_key, confirmation_store.stats())
+        return cached_json_response(request, cached)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
+
 @app.get("/confirmation/{folio}")
-async def get_confirmation_by_folio(folio: str):
+async def get_confirmation_by_folio(folio: str, request: Request):
     """Obtener una confirmación específica por folio"""
     try:
-        confirmations_file = os.path.join(DATA_DIR, "confirmations.json")
+        # Buscar confirmación por folio en el índice (fetch sincroniza si es de
+        # otro worker); la respuesta serializada sigue en caché mientras el
+        # registro sea el mismo objeto
+        with stage("store_read"):
+            conf = await confirmation_store.fetch(folio)
+        if conf is not None:
+            cache_key = ("folio", folio)
+            cached = response_cache.get(cache_key, conf) or response_cache.put(cache_key, conf, conf)
+            return cached_json_response(request, cached)
         
-        if not os.path.exists(confirmations_file):
-            raise HTTPException(status_code=404, detail="Confirmación no encontrada")
+        raise HTTPException(status_code=404, detail="Confirmación no encontrada")
         
-        with open(confirmations_file, 'r', encoding='utf-8') as f:
-            confirmations = json.load(f)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al buscar confirmación: {str(e)}")
+
+@app.post("/api/checkin/sync")
+async def sync_checkins(sync: CheckinSyncRequest):
+    """
+    Sincronización de un escáner: registra las llegadas que acumuló sin
+    conexión (en un conflicto gana la hora de llegada más temprana) y regresa
+    los cambios de la lista de invitados desde su cursor (ver checkin_sync).
+    """
+    try:
+        with stage("store_write"):
+            stored = await asyncio.gather(*(
+                confirmation_store.check_in(item.folio, arrival_time(item.scanned_at),
+                                            item.scanner_id or sync.scanner_id)
+                for item in sync.checkins
+            ))
+        # La hora que quedó guardada (la más temprana), aunque otro escaneo del lote la haya ganado
+        results = [checkin_result(item.folio, confirmation_store.get(item.folio) if record is not None else None, changed)
+                   for item, (record, changed) in zip(sync.checkins, stored)]
+        return {"results": results, **checkin_sync.delta(sync.since)}
         
-        # Buscar confirmación por folio
-        for conf in confirmations:
-            if conf['folio'] == folio:
-                return conf
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al sincronizar llegadas: {str(e)}")
+
+@app.post("/api/checkin/{folio}")
+async def check_in_guest(folio: str, checkin: Optional[CheckinRequest] = None):
+    """
+    Registrar la llegada de un invitado (lectura del QR en la entrada).
+    Idempotente: repetir el escaneo regresa 200 con la llegada original.
+    """
+    try:
+        checkin = checkin or CheckinRequest()
+        with stage("store_write"):
+            record, changed = await confirmation_store.check_in(
+                folio, arrival_time(checkin.scanned_at), checkin.scanner_id
+            )
+        if record is None:
+            raise HTTPException(status_code=404, detail="Confirmación no encontrada")
         
-        raise HTTPException(status_code=404, detail="Confirmación no encontrada")
+        return FastJSONResponse(
+            status_code=201 if changed else 200,
+            content=checkin_result(folio, record, changed)
+        )
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al buscar confirmación: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al registrar llegada: {str(e)}")
 
 @app.delete("/api/confirmations/{folio}")
 async def delete_confirmation(folio: str):
     """Eliminar una confirmación específica por folio"""
     try:
-        confirmations_file = os.path.join(DATA_DIR, "confirmations.json")
-        
-        if not os.path.exists(confirmations_file):
-            raise HTTPException(status_code=404, detail="No hay confirmaciones registradas")
-        
-        with open(confirmations_file, 'r', encoding='utf-8') as f:
-            confirmations = json.load(f)
-        
-        # Buscar y eliminar confirmación por folio
-        initial_count = len(confirmations)
-        confirmations = [conf for conf in confirmations if conf['folio'] != folio]
-        
-        if len(confirmations) == initial_count:
+        # Eliminar confirmación por folio (se registra un tombstone en el log)
+        with stage("store_write"):
+            deleted = await confirmation_store.delete(folio)
+        if not deleted:
+            if len(confirmation_store) == 0:
+                raise HTTPException(status_code=404, detail="No hay confirmaciones registradas")
             raise HTTPException(status_code=404, detail=f"Confirmación con folio {folio} no encontrada")
         
-        # Guardar confirmaciones actualizadas
-        with open(confirmations_file, 'w', encoding='utf-8') as f:
-            json.dump(confirmations, f, ensure_ascii=False, indent=2)
-        
         return {"success": True, "message": f"Confirmación {folio} eliminada exitosamente"}
         
     except HTTPException:
@@ -206,21 +932,14 @@ async def delete_confirmation(folio: str):
 async def delete_all_confirmations():
     """Eliminar todas las confirmaciones"""
     try:
-        confirmations_file = os.path.join(DATA_DIR, "confirmations.json")
+        # Eliminar todas (un solo registro "clear" en el log)
+        with stage("store_write"):
+            deleted_count = await confirmation_store.clear()
+        idempotency_cache.clear()
         
-        if not os.path.exists(confirmations_file):
+        if deleted_count == 0:
             return {"success": True, "message": "No hay confirmaciones para eliminar", "deleted_count": 0}
         
-        # Leer cuántas confirmaciones hay antes de eliminar
-        with open(confirmations_file, 'r', encoding='utf-8') as f:
-            confirmations = json.load(f)
-        
-        deleted_count = len(confirmations)
-        
-        # Vaciar el archivo (guardar lista vacía)
-        with open(confirmations_file, 'w', encoding='utf-8') as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
-        
         return {"success": True, "message": f"Todas las confirmaciones eliminadas", "deleted_count": deleted_count}
         
     except Exception as e:
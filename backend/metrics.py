@@ -0,0 +1,222 @@
+"""
+Métricas en formato Prometheus (GET /metrics)
+
+Sin dependencias externas: contadores e histogramas en memoria del proceso,
+protegidos por un candado (registrar una observación cuesta alrededor de un
+microsegundo), que se exponen en el formato de texto de Prometheus. Cada
+worker de uvicorn tiene sus propias métricas; Prometheus las distingue por
+instancia.
+
+- MetricsMiddleware (ASGI): duración de cada solicitud por método, ruta (la
+  plantilla, p. ej. /confirmation/{folio}) y código de respuesta.
+- stage("store_write"): duración de una etapa dentro de la solicitud (store,
+  serialización, validación, armado MIME, conexión/login/envío SMTP).
+- registry.gauge(): valores que se leen al momento de exponer (confirmaciones,
+  paneles conectados, bandeja de emails).
+
+METRICS_ENABLED=false desactiva el middleware y stage() deja de medir.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence
+
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [conteo por cubeta (la última es +Inf), suma]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Valor leído al exponer: read() regresa un número o {valor de la etiqueta: número}"""
+
+    def __init__(self, name: str, documentation: str, read: Callable, label: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.label = label
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []  # una fuente caída no impide exponer lo demás
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if self.label is None:
+            lines.append(f"{self.name} {_number(value)}")
+        else:
+            for key, number in value.items():
+                lines.append(f"{self.name}{_labels((self.label,), (key,))} {_number(number)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable, label: Optional[str] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, read, label))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Duración de las solicitudes HTTP", ("method", "route", "status"))
+stage_seconds = registry.histogram(
+    "invitaciones_stage_duration_seconds", "Duración de cada etapa dentro de una solicitud", ("stage",))
+stage_errors = registry.counter(
+    "invitaciones_stage_errors_total", "Etapas que terminaron con una excepción", ("stage",))
+
+
+class stage:
+    """
+    with stage("smtp_send"): ...  registra la duración de la etapa (y si
+    terminó con excepción). Funciona igual en código síncrono y asíncrono.
+    """
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            stage_seconds.observe(time.perf_counter() - self.started, self.name)
+            if exc_type is not None:
+                stage_errors.inc(self.name)
+        return False
+
+
+class MetricsMiddleware:
+    """Middleware ASGI (sin BaseHTTPMiddleware, que agrega una tarea por solicitud)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        response: Dict[str, object] = {"status": 500, "stream": False}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        response["stream"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Las conexiones SSE duran lo que el panel esté abierto: no son latencia
+            if not response["stream"]:
+                http_request_seconds.observe(time.perf_counter() - started, scope["method"],
+                                             route_label(scope), str(response["status"]))
+
+
+def route_label(scope) -> str:
+    """Plantilla de la ruta (no la URL, para no crear una serie por folio)"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "sin_ruta"
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Generación masiva de pases para toda la lista de invitados
+
+Reparte el dibujo de los pases en un ProcessPoolExecutor (cada proceso prepara
+sus fuentes y fondo una sola vez) y va escribiendo los resultados en un ZIP de
+PNGs o en un PDF de una página por pase conforme terminan, sin juntar todas
+las imágenes en memoria: solo hay unos cuantos lotes en vuelo a la vez.
+
+Se usa desde GET /api/passes/export y desde la línea de comandos:
+    python pass_batch.py --format zip --output pases.zip [--workers 4] [--all]
+"""
+
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+FORMATS = ("zip", "pdf")
+CHUNK_SIZE = 16
+PDF_JPEG_QUALITY = 90
+PDF_DPI = 96
+
+
+# ----------------------------------------------------------------------
+# Trabajo en los procesos
+# ----------------------------------------------------------------------
+def _render_chunk(rows: List[tuple], format: str) -> List[Tuple[str, bytes]]:
+    """Dibuja un lote de pases (se ejecuta en un proceso del pool)"""
+    from pass_generator import pass_generator
+
+    results = []
+    for name, folio, companions, whatsapp, attending in rows:
+        image = pass_generator.draw_pass(name, folio, companions, whatsapp, attending)
+        if format == "pdf":
+            data = pass_generator.encode(image, "JPEG", quality=PDF_JPEG_QUALITY)
+        else:
+            data = pass_generator.encode(image, "PNG")
+        results.append((folio, data))
+    return results
+
+
+def _warm_up():
+    # Prepara fuentes y fondo al iniciar el proceso
+    from pass_generator import pass_generator
+    pass_generator.prepare()
+
+
+def _row(record: dict) -> tuple:
+    return (
+        record.get("name", ""),
+        record.get("folio", ""),
+        record.get("guests", 0),
+        record.get("phone", ""),
+        bool(record.get("will_attend", True)),
+    )
+
+
+def _chunks(records: Iterable[dict], size: int) -> Iterator[List[tuple]]:
+    iterator = iter(records)
+    while True:
+        chunk = [_row(record) for record in islice(iterator, size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchStats:
+    def __init__(self):
+        self.passes = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def passes_per_second(self) -> float:
+        return self.passes / self.elapsed if self.elapsed else 0.0
+
+
+def render_passes(records: Iterable[dict], format: str = "zip", workers: Optional[int] = None,
+                  chunk_size: int = CHUNK_SIZE, stats: Optional[BatchStats] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Genera (folio, imagen) en el orden de records. Como máximo hay 2 lotes por
+    proceso en vuelo, así que la memoria no crece con el tamaño de la lista.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = stats or BatchStats()
+    chunks = _chunks(records, chunk_size)
+    # spawn: no hereda hilos ni sockets del servidor
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_warm_up) as pool:
+        pending = deque(pool.submit(_render_chunk, chunk, format) for chunk in islice(chunks, workers * 2))
+        try:
+            while pending:
+                results = pending.popleft().result()
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    pending.append(pool.submit(_render_chunk, next_chunk, format))
+                for result in results:
+                    stats.passes += 1
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            stats.elapsed = time.perf_counter() - stats.started
+
+
+# ----------------------------------------------------------------------
+# Salida en streaming
+# ----------------------------------------------------------------------
+class StreamSink(io.RawIOBase):
+    """Archivo de solo escritura que acumula lo escrito hasta que se drena"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _safe_name(folio: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", folio) or "sin_folio"
+
+
+def stream_zip(passes: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """ZIP con un PNG por pase (sin compresión: los PNG ya están comprimidos)"""
+    sink = StreamSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for folio, png in passes:
+            archive.writestr(f"pase-acceso-{_safe_name(folio)}.png", png)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_pdf(passes: Iterable[Tuple[str, bytes]], width: int = 800, height: int = 1000) -> Iterator[bytes]:
+    """
+    PDF con una página por pase. Cada página es un JPEG (DCTDecode) que se
+    escribe en cuanto llega; el árbol de páginas y la tabla xref van al final.
+    """
+    page_width = width * 72 / PDF_DPI
+    page_height = height * 72 / PDF_DPI
+    offsets = {}
+    position = 0
+    kids = []
+
+    def obj(number: int, body: bytes) -> bytes:
+        nonlocal position
+        offsets[number] = position
+        data = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        position += len(data)
+        return data
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    position = len(header)
+    yield header
+
+    # 1 = catálogo, 2 = árbol de páginas; cada pase usa 3 objetos desde el 3
+    number = 3
+    content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (page_width, page_height)
+    for _, jpeg in passes:
+        image_id, content_id, page_id = number, number + 1, number + 2
+        number += 3
+        kids.append(page_id)
+        yield (
+            obj(image_id, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB"
+                          b" /BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n"
+                % (width, height, len(jpeg)) + jpeg + b"\nendstream")
+            + obj(content_id, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+            + obj(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f]"
+                           b" /Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                  % (page_width, page_height, image_id, content_id))
+        )
+
+    tail = obj(2, b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % kid for kid in kids)
+               + b"] /Count %d >>" % len(kids))
+    tail += obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    xref_offset = position
+    tail += b"xref\n0 %d\n0000000000 65535 f \n" % number
+    tail += b"".join(b"%010d 00000 n \n" % offsets[i] for i in range(1, number))
+    tail += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (number, xref_offset)
+    yield tail
+
+
+def export_passes(records: Iterable[dict], format: str = "zip", workers: Optional[int] = None,
+                  stats: Optional[BatchStats] = None) -> Iterator[bytes]:
+    """Bytes del ZIP o PDF con los pases de records, conforme se generan"""
+    if format not in FORMATS:
+        raise ValueError(f"Formato no soportado: {format}")
+    stats = stats or BatchStats()
+    passes = render_passes(records, format, workers=workers, stats=stats)
+    writer = stream_pdf if format == "pdf" else stream_zip
+    yield from writer(passes)
+    print(f"🖨️  {stats.passes} pases ({format}) en {stats.elapsed:.1f}s "
+          f"({stats.passes_per_second:.1f} pases/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar los pases de todas las confirmaciones")
+    parser.add_argument("--format", choices=FORMATS, default="zip")
+    parser.add_argument("--output", help="Archivo de salida (por defecto pases.<formato>)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, núcleos)")
+    parser.add_argument("--all", action="store_true", help="Incluir a quienes no asistirán")
+    parser.add_argument("--data-dir", default=os.getenv(
+        "DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data")))
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(__file__))
+    from sql_store import create_store
+
+    async def load_records():
+        store = create_store(args.data_dir)
+        await store.start()
+        try:
+            return [r for r in store.all() if r.get("folio") and (args.all or r.get("will_attend"))]
+        finally:
+            await store.stop()
+
+    records = asyncio.run(load_records())
+    output = args.output or f"pases.{args.format}"
+
+    print(f"🎨 Generando {len(records)} pases en {args.workers or os.cpu_count()} procesos -> {output}")
+    with open(output, "wb") as f:
+        for data in export_passes(records, args.format, workers=args.workers):
+            f.write(data)
+
+
+if __name__ == "__main__":
+    main()
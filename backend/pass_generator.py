@@ -0,0 +1,232 @@
+"""
+Generador de pases de acceso en el servidor (Pillow)
+
+Dibuja el mismo pase que generatePassCanvas() en static/confirmation.html:
+nombre, folio, acompañantes, WhatsApp y el QR de ubicación. Las fuentes y el
+fondo (degradado, borde, textos fijos del evento y QR) se preparan una sola vez,
+con el primer pase (o con prepare()); cada pase solo copia el fondo y escribe
+sus datos.
+
+Los PNG generados se guardan en un caché LRU en memoria con llave
+(folio, hash del contenido), así un reenvío no vuelve a dibujar el pase y el
+navegador ya no necesita subir la imagen.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "static")
+
+WIDTH, HEIGHT = 800, 1000
+QR_SIZE = 120
+LEFT_MARGIN = 80
+LINE_SPACING = 35
+DATA_TOP = 470
+QR_TOP = DATA_TOP + 5 * LINE_SPACING + 40
+
+# Colores de la paleta up-gold (los mismos del canvas)
+GOLD_50 = (254, 253, 248)
+GOLD_100 = (253, 249, 233)
+GOLD_600 = (212, 149, 15)
+GOLD_700 = (179, 123, 13)
+GOLD_800 = (143, 94, 20)
+GRAY_400 = (156, 163, 175)
+GRAY_500 = (107, 114, 128)
+GRAY_700 = (55, 65, 81)
+
+# Fuentes a probar en orden (Arial como en el canvas, luego equivalentes libres)
+REGULAR_FONTS = ["Arial.ttf", "arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf",
+                 "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                 "/Library/Fonts/Arial.ttf", "/System/Library/Fonts/Supplemental/Arial.ttf"]
+BOLD_FONTS = ["Arial Bold.ttf", "arialbd.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf",
+              "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+              "/Library/Fonts/Arial Bold.ttf", "/System/Library/Fonts/Supplemental/Arial Bold.ttf"]
+
+
+def _load_font(candidates, size: int):
+    for path in candidates:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+class PassGenerator:
+    def __init__(self, cache_size: int = 256, qr_path: Optional[str] = None):
+        self.cache_size = cache_size
+        self.qr_path = qr_path or os.getenv("PASS_QR_PATH") or os.path.join(STATIC_DIR, "qr_ubicacion.png")
+
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.cache_hits = 0
+        self.fonts = None
+        self.background = None
+
+    def prepare(self):
+        """Carga las fuentes y dibuja el fondo (una sola vez, en el primer pase)"""
+        if self.background is not None:
+            return
+        with self._lock:
+            if self.background is not None:
+                return
+            self._load_fonts()
+            self.background = self._render_background()
+
+    def _load_fonts(self):
+        regular = [os.getenv("PASS_FONT_PATH")] + REGULAR_FONTS if os.getenv("PASS_FONT_PATH") else REGULAR_FONTS
+        bold = [os.getenv("PASS_FONT_BOLD_PATH")] + BOLD_FONTS if os.getenv("PASS_FONT_BOLD_PATH") else BOLD_FONTS
+        self.fonts = {
+            "title": _load_font(bold, 36),
+            "subtitle": _load_font(bold, 28),
+            "event": _load_font(bold, 26),
+            "section": _load_font(bold, 24),
+            "schedule": _load_font(regular, 20),
+            "place": _load_font(bold, 18),
+            "data": _load_font(regular, 18),
+            "present": _load_font(bold, 16),
+            "qr_title": _load_font(bold, 14),
+            "small": _load_font(regular, 12),
+            "tiny": _load_font(regular, 10),
+        }
+
+    # ------------------------------------------------------------------
+    # Plantilla
+    # ------------------------------------------------------------------
+    def _center(self, draw: ImageDraw.ImageDraw, text: str, y: float, font, fill):
+        # El canvas usa la línea base como y; "ms" = centro horizontal, línea base
+        draw.text((WIDTH / 2, y), text, font=font, fill=fill, anchor="ms")
+
+    def _render_background(self) -> Image.Image:
+        """Fondo del pase con todo lo que no cambia entre invitados"""
+        image = Image.new("RGB", (WIDTH, HEIGHT))
+        draw = ImageDraw.Draw(image)
+
+        # Fondo degradado dorado
+        for y in range(HEIGHT):
+            t = y / (HEIGHT - 1)
+            color = tuple(round(a + (b - a) * t) for a, b in zip(GOLD_50, GOLD_100))
+            draw.line([(0, y), (WIDTH, y)], fill=color)
+
+        # Borde dorado
+        draw.rectangle([16, 16, WIDTH - 17, HEIGHT - 17], outline=GOLD_600, width=8)
+
+        f = self.fonts
+        self._center(draw, "PASE DE ACCESO", 120, f["title"], GOLD_800)
+        self._center(draw, "Posgrado en TIC's", 170, f["subtitle"], GOLD_700)
+        self._center(draw, "Fiesta de Finalización del Posgrado", 260, f["event"], GOLD_800)
+        self._center(draw, "Viernes 14 noviembre 2025", 300, f["schedule"], GRAY_700)
+        self._center(draw, "17:00 hrs", 330, f["schedule"], GRAY_700)
+        self._center(draw, "Calzada de los Fresnos 123", 365, f["place"], GOLD_800)
+        self._center(draw, "Ciudad Granja", 390, f["place"], GOLD_800)
+        draw.line([(80, 370), (WIDTH - 80, 370)], fill=GOLD_600, width=3)
+        self._center(draw, "DATOS DE CONFIRMACIÓN", 420, f["section"], GOLD_800)
+
+        # QR de ubicación (Google Maps); sin imagen se dibuja el mismo placeholder que el canvas
+        qr_x = WIDTH // 2 - QR_SIZE // 2
+        try:
+            with Image.open(self.qr_path) as qr:
+                qr = qr.convert("RGBA").resize((QR_SIZE, QR_SIZE), Image.LANCZOS)
+                image.paste(qr, (qr_x, QR_TOP), qr)
+        except OSError as e:
+            if os.path.exists(self.qr_path):
+                print(f"⚠️  No se pudo cargar el QR de ubicación {self.qr_path}: {str(e)}")
+            draw.rectangle([qr_x, QR_TOP, qr_x + QR_SIZE, QR_TOP + QR_SIZE], fill=(229, 231, 235), outline=(209, 213, 219))
+
+        qr_bottom = QR_TOP + QR_SIZE
+        self._center(draw, "Código QR de Ubicación", qr_bottom + 25, f["qr_title"], GOLD_800)
+        self._center(draw, "Escanea para ver ubicación en Google Maps", qr_bottom + 63, f["tiny"], GRAY_500)
+        self._center(draw, "PRESENTA ESTE PASE EN EL EVENTO", qr_bottom + 95, f["present"], GOLD_700)
+        self._center(draw, "Sistema desarrollado por IUX - Software Jurídico", HEIGHT - 60, f["small"], GRAY_400)
+        return image
+
+    # ------------------------------------------------------------------
+    # Pases
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _content_key(name: str, folio: str, companions: int, whatsapp: str, attending: bool) -> tuple:
+        content = "\x1f".join([name, folio, str(companions), whatsapp or "", "1" if attending else "0"])
+        return folio, hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def draw_pass(self, name: str, folio: str, companions: int = 0, whatsapp: str = "",
+                  attending: bool = True) -> Image.Image:
+        """Dibuja el pase sobre una copia del fondo (sin caché ni codificar)"""
+        self.prepare()
+        image = self.background.copy()
+        draw = ImageDraw.Draw(image)
+        f = self.fonts
+
+        lines = [
+            f"Folio: {folio}",
+            f"Nombre: {name}",
+            f"Asistencia: {'SÍ ASISTIRÉ' if attending else 'NO ASISTIRÉ'}",
+            f"Acompañantes: {companions}",
+            f"WhatsApp: {whatsapp or ''}",
+            "Ubicación: Calzada de los Fresnos 123, Ciudad Granja",
+        ]
+        y = DATA_TOP
+        for line in lines:
+            draw.text((LEFT_MARGIN, y), line, font=f["data"], fill=GRAY_700, anchor="ls")
+            y += LINE_SPACING
+
+        self._center(draw, f"Folio: {folio}", QR_TOP + QR_SIZE + 45, f["small"], GRAY_500)
+        return image
+
+    @staticmethod
+    def encode(image: Image.Image, format: str = "PNG", **options) -> bytes:
+        buffer = io.BytesIO()
+        image.save(buffer, format=format, **options)
+        return buffer.getvalue()
+
+    def render_png(self, name: str, folio: str, companions: int = 0, whatsapp: str = "",
+                   attending: bool = True) -> bytes:
+        """PNG del pase (desde el caché si ya se generó con los mismos datos)"""
+        key = self._content_key(name, folio, companions, whatsapp, attending)
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return png
+
+        png = self.encode(self.draw_pass(name, folio, companions, whatsapp, attending))
+
+        with self._lock:
+            self.renders += 1
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return png
+
+    def generate_pass_image(self, name: str, folio: str, companions: int = 0, whatsapp: str = "",
+                            attending: bool = True) -> Optional[str]:
+        """Pase en base64 (como lo espera EmailService), o None si falla"""
+        try:
+            png = self.render_png(name, folio, companions, whatsapp, attending)
+            return base64.b64encode(png).decode('ascii')
+        except Exception as e:
+            print(f"❌ Error generando pase {folio}: {str(e)}")
+            return None
+
+    def pass_for_confirmation(self, record: dict) -> Optional[str]:
+        """Pase en base64 a partir de una confirmación guardada"""
+        return self.generate_pass_image(
+            name=record.get("name", ""),
+            folio=record.get("folio", ""),
+            companions=record.get("guests", 0),
+            whatsapp=record.get("phone", ""),
+            attending=bool(record.get("will_attend", True)),
+        )
+
+
+# Instancia global (las fuentes y el fondo se preparan con el primer pase)
+pass_generator = PassGenerator(cache_size=int(os.getenv("PASS_CACHE_SIZE", "256")))
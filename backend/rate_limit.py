@@ -0,0 +1,223 @@
+"""
+Límites por cliente y control de admisión para los endpoints públicos
+
+POST /api/confirmations y POST /api/send-pass-email no requieren sesión: un
+bot o un cliente que reintenta en bucle podía provocar escrituras y envíos
+SMTP sin límite. Aquí hay dos defensas baratas:
+
+- RateLimiter: token bucket por llave ("<endpoint>:ip:<ip>",
+  "<endpoint>:email:<correo>"). Cada llave tiene burst fichas y recupera
+  per_minute fichas por minuto; check() regresa 0 si la solicitud se admite
+  o los segundos que faltan para la siguiente ficha (Retry-After del 429).
+- ConcurrencyLimiter: como máximo limit solicitudes a la vez; la siguiente se
+  rechaza de inmediato (503 + Retry-After) en lugar de hacer fila.
+
+Los buckets viven en un backend intercambiable (RATE_LIMIT_BACKEND):
+
+- memory: en el proceso, repartido en shards, cada uno con su candado y a lo
+  más max_keys llaves (se descarta la menos usada, que equivale a un bucket
+  lleno). Dos solicitudes concurrentes casi nunca esperan el mismo candado.
+- shared: tabla de ranuras de tamaño fijo en un archivo mapeado en memoria
+  (data/rate_limits.bin) que comparten los workers de uvicorn del mismo host;
+  cada ranura se protege con un candado de rango de fcntl. Si dos llaves caen
+  en la misma ranura, la nueva reemplaza a la anterior (se pierde el conteo,
+  nunca se bloquea de más).
+
+Cualquier objeto con hit(key, rate, burst) -> segundos sirve de backend
+(p. ej. uno sobre Redis para varios hosts).
+
+La IP del cliente sale de X-Real-IP solo si la conexión viene de un proxy de
+confianza (RATE_LIMIT_TRUSTED_PROXIES, ver is_trusted_proxy); si no, cada
+invitado detrás de nginx compartiría el bucket de la IP de nginx.
+"""
+
+import hashlib
+import ipaddress
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candados entre procesos
+    fcntl = None
+
+# Ranura del backend compartido: digest de la llave, fichas, última actualización
+SLOT = struct.Struct("<Qdd")
+
+# Proxies de los que se acepta X-Real-IP: loopback y redes privadas (nginx en
+# la red de docker-compose)
+DEFAULT_TRUSTED_PROXIES = "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7"
+
+
+def retry_after(seconds: float) -> str:
+    """Valor del header Retry-After (segundos enteros, al menos 1)"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def parse_networks(value: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """Redes separadas por comas ("172.16.0.0/12,127.0.0.1"); vacío = ninguna"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+def is_trusted_proxy(host: str, networks) -> bool:
+    """La IP de la conexión pertenece a alguna de las redes de proxies de confianza"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return any(address in network for network in networks)
+
+
+class MemoryBuckets:
+    def __init__(self, shards: int = 16, max_keys: int = 10000):
+        # Número de shards potencia de 2 para elegir con una máscara
+        count = 1 << max(0, shards - 1).bit_length()
+        self._mask = count - 1
+        self._locks = [threading.Lock() for _ in range(count)]
+        self._buckets = [OrderedDict() for _ in range(count)]  # llave -> [fichas, actualizado]
+        self.max_keys = max(1, max_keys // count)
+
+    def hit(self, key: str, rate: float, burst: float) -> float:
+        shard = hash(key) & self._mask
+        buckets = self._buckets[shard]
+        now = time.monotonic()
+        with self._locks[shard]:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [burst, now]
+                if len(buckets) > self.max_keys:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self._buckets)
+
+
+class SharedBuckets:
+    def __init__(self, path: str, slots: int = 65536, shards: int = 16):
+        self.path = path
+        self.slots = slots
+        size = slots * SLOT.size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            # Otro tamaño (o archivo nuevo): los conteos anteriores no sirven
+            os.ftruncate(self._fd, 0)
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        # fcntl no excluye a los hilos del mismo proceso: además un candado por shard
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def hit(self, key: str, rate: float, burst: float) -> float:
+        digest = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), "little") or 1
+        slot = digest % self.slots
+        offset = slot * SLOT.size
+        with self._locks[slot % len(self._locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, SLOT.size, offset)
+            try:
+                owner, tokens, updated = SLOT.unpack_from(self._map, offset)
+                now = time.time()
+                if owner != digest:
+                    tokens = burst
+                else:
+                    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                SLOT.pack_into(self._map, offset, digest, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, SLOT.size, offset)
+        return wait
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: Dict[str, Tuple[float, float]], enabled: bool = True):
+        """limits: dimensión ("ip", "email") -> (fichas por minuto, ráfaga)"""
+        self.backend = backend
+        self.limits = {name: (per_minute / 60.0, burst) for name, (per_minute, burst) in limits.items()
+                       if per_minute > 0}
+        self.enabled = enabled
+
+    def check(self, scope: str, **values: Optional[str]) -> float:
+        """
+        Consume una ficha de cada dimensión con valor (check("confirm", ip=...,
+        email=...)) y regresa cuántos segundos esperar; 0 = admitida.
+        """
+        if not self.enabled:
+            return 0.0
+        wait = 0.0
+        for dimension, value in values.items():
+            limit = self.limits.get(dimension)
+            if limit is None or not value:
+                continue
+            wait = max(wait, self.backend.hit(f"{scope}:{dimension}:{value}", *limit))
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Cupo de solicitudes simultáneas sin fila: try_acquire() o se rechaza"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.limit > 0 and self.active >= self.limit:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+def create_rate_limiter(data_dir: str) -> RateLimiter:
+    """Límites según el entorno (RATE_LIMIT_*); ver .env.example"""
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend_name == "shared" and fcntl is not None:
+        backend = SharedBuckets(
+            os.path.join(data_dir, "rate_limits.bin"),
+            slots=int(os.getenv("RATE_LIMIT_SHARED_SLOTS", "65536")),
+        )
+    elif backend_name in ("memory", "shared"):
+        if backend_name == "shared":
+            print("⚠️ RATE_LIMIT_BACKEND=shared requiere fcntl; se usan límites por proceso")
+        backend = MemoryBuckets(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")))
+    else:
+        raise ValueError(f"RATE_LIMIT_BACKEND no soportado: {backend_name}")
+    return RateLimiter(
+        backend,
+        limits={
+            "ip": (float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "60")),
+                   float(os.getenv("RATE_LIMIT_IP_BURST", "30"))),
+            "email": (float(os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", "6")),
+                      float(os.getenv("RATE_LIMIT_EMAIL_BURST", "3"))),
+        },
+        enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes"),
+    )
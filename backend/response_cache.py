@@ -0,0 +1,119 @@
+"""
+Caché de respuestas JSON ya serializadas, con ETag
+
+Las lecturas de confirmaciones (listado, estadísticas y /confirmation/{folio})
+guardan aquí los bytes de la respuesta y su ETag:
+
+- El listado y las estadísticas usan como llave la versión de los datos del
+  store (avanza en cada escritura) más los parámetros de la consulta, así que
+  una escritura invalida todo sin tener que recorrer el caché.
+- Una confirmación por folio se guarda junto con el objeto del registro: la
+  entrada sigue siendo válida mientras el store regrese ese mismo objeto, y
+  las altas de otros invitados no la invalidan.
+
+El ETag es un hash del contenido (no de la versión), así que es fuerte y
+coincide entre workers. Las entradas se descartan por LRU al pasar de
+max_entries o de max_bytes en total.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+import fast_json
+from metrics import stage
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "source")
+
+    def __init__(self, body: bytes, etag: str, source: Any = None):
+        self.body = body
+        self.etag = etag
+        self.source = source
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match usa comparación débil: se ignora el prefijo W/"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def serialize(content: Any) -> bytes:
+    """Mismo JSON compacto que las demás respuestas (ver fast_json)"""
+    with stage("serialize"):
+        return fast_json.dumps(content)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Una respuesta muy grande (p. ej. la lista completa) no desplaza a todo lo demás
+        self.max_entry_bytes = max_bytes // 4
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, source: Any = None) -> Optional[CachedResponse]:
+        """Entrada vigente para key (si se da source, debe ser el mismo objeto)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.source is not source:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, content: Any, source: Any = None) -> CachedResponse:
+        """Serializa content y lo guarda (si cabe); regresa la entrada"""
+        body = serialize(content)
+        entry = CachedResponse(body, etag_for(body), source)
+        if len(body) > self.max_entry_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    """200 con el JSON guardado, o 304 si el cliente ya tiene esa versión"""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,124 @@
+"""
+Pool de conexiones SMTP autenticadas
+
+Conectar, hacer STARTTLS y AUTH cuesta varios viajes de red por mensaje. El
+pool mantiene hasta max_size sesiones abiertas y las reutiliza:
+- Si una sesión estuvo inactiva más de noop_after segundos se verifica con NOOP
+  antes de usarla; si estuvo inactiva más de idle_timeout se cierra.
+- Cada sesión envía como máximo max_messages mensajes y luego se renueva
+  (los proveedores suelen limitar mensajes por conexión).
+- Si un envío falla por desconexión, la sesión se descarta y el siguiente
+  préstamo abre una nueva.
+"""
+
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+
+class PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+
+class SMTPConnectionPool:
+    def __init__(self, factory: Callable[[], smtplib.SMTP], max_size: int = 4,
+                 max_messages: int = 100, idle_timeout: float = 120.0,
+                 noop_after: float = 15.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+
+        self._idle: deque = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.connections_opened = 0
+
+    @contextmanager
+    def connection(self, fresh: bool = False):
+        """
+        Presta una sesión SMTP lista para send_message(). Con fresh=True se abre
+        una sesión nueva en lugar de reutilizar una inactiva.
+        """
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._open() if fresh else self._checkout()
+            yield conn.server
+            conn.messages_sent += 1
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError):
+            if conn is not None:
+                conn.broken = True
+            raise
+        except smtplib.SMTPResponseException as e:
+            # 421 = el servidor cerrará la conexión
+            if conn is not None and e.smtp_code == 421:
+                conn.broken = True
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def _checkout(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                break
+            idle = time.monotonic() - conn.last_used
+            if idle > self.idle_timeout:
+                self._quit(conn)
+                continue
+            if idle > self.noop_after and not self._alive(conn):
+                self._quit(conn)
+                continue
+            return conn
+        return self._open()
+
+    def _open(self) -> PooledConnection:
+        server = self.factory()
+        with self._lock:
+            self.connections_opened += 1
+        return PooledConnection(server)
+
+    def _checkin(self, conn: PooledConnection):
+        if conn.broken or conn.messages_sent >= self.max_messages:
+            self._quit(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    @staticmethod
+    def _alive(conn: PooledConnection) -> bool:
+        try:
+            code, _ = conn.server.noop()
+            return code == 250
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(conn: PooledConnection):
+        try:
+            conn.server.quit()
+        except Exception:
+            try:
+                conn.server.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        """Cierra todas las sesiones inactivas"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._quit(conn)
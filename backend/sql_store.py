@@ -0,0 +1,626 @@
+"""
+Almacenamiento de confirmaciones en base de datos (PostgreSQL o SQLite)
+
+Alternativa a ConfirmationStore (log en data/) con la misma interfaz: las
+lecturas se sirven desde memoria (índice por folio + ConfirmationIndexes) y las
+escrituras van primero a la base de datos.
+
+- PostgreSQL usa asyncpg con un pool de conexiones; cada consulta se prepara
+  una vez por conexión (caché de sentencias de asyncpg).
+- SQLite sirve como sustituto local para pruebas y benchmarks
+  (DATABASE_URL=sqlite:///ruta/archivo.db).
+
+Cada fila lleva un número de secuencia (seq) que se renueva en cada alta,
+cambio o baja; las bajas son lógicas (deleted). Así cada proceso mantiene su
+copia en memoria al día leyendo solo las filas con seq mayor al último visto:
+después de cada escritura propia y, para lo que escriban otros workers, cada
+poll_interval segundos. En PostgreSQL las escrituras toman un advisory lock de
+transacción para que los seq se confirmen en orden.
+
+Las altas del formulario llevan además contact_key (correo+teléfono
+normalizados) e idempotency_key, con índices únicos parciales sobre las filas
+vigentes: un reintento que llega a otro worker tampoco crea un registro nuevo.
+
+La primera vez que la tabla está vacía se migran las confirmaciones de
+data/confirmations.jsonl (o del antiguo data/confirmations.json), con su
+contact_key e idempotency_key (si dos registros comparten una, la conserva el
+primero, como en ConfirmationIndexes).
+
+Un folio que no está en la copia en memoria puede haberlo escrito otro worker
+hace menos de poll_interval: fetch() (y get() desde un hilo) sincronizan antes
+de responder que no existe.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import sqlite3
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fast_json
+from confirmation_index import ConfirmationIndexes, contact_key
+from confirmation_record import Confirmation
+
+# Llave del advisory lock que serializa las escrituras en PostgreSQL
+WRITE_LOCK_KEY = 7310042
+
+Change = Tuple[int, str, Optional[str], bool]  # (seq, folio, data JSON, deleted)
+
+# Columnas agregadas después de la primera versión de la tabla
+UNIQUE_COLUMNS = ("contact_key", "idempotency_key")
+
+
+def _row(key: str, record: dict) -> tuple:
+    """Columnas indexables + el registro completo en JSON"""
+    return (
+        key,
+        record.get("name") or "",
+        record.get("email") or "",
+        bool(record.get("will_attend")),
+        int(record.get("guests") or 0),
+        record.get("phone") or "",
+        # ISO-8601: el orden de texto es el orden cronológico
+        record.get("timestamp") or "",
+        fast_json.dumps(record).decode('utf-8'),
+    )
+
+
+# ----------------------------------------------------------------------
+# Drivers
+# ----------------------------------------------------------------------
+class PostgresDriver:
+    SCHEMA = """
+    CREATE SEQUENCE IF NOT EXISTS confirmations_seq;
+    CREATE TABLE IF NOT EXISTS confirmations (
+        folio TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        will_attend BOOLEAN NOT NULL,
+        guests INTEGER NOT NULL DEFAULT 0,
+        phone TEXT NOT NULL DEFAULT '',
+        "timestamp" TEXT NOT NULL DEFAULT '',
+        data JSONB NOT NULL,
+        deleted BOOLEAN NOT NULL DEFAULT FALSE,
+        seq BIGINT NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_folio ON confirmations (folio);
+    CREATE INDEX IF NOT EXISTS idx_confirmations_email ON confirmations (lower(email));
+    CREATE INDEX IF NOT EXISTS idx_confirmations_timestamp ON confirmations ("timestamp");
+    CREATE INDEX IF NOT EXISTS idx_confirmations_seq ON confirmations (seq);
+    ALTER TABLE confirmations ADD COLUMN IF NOT EXISTS contact_key TEXT;
+    ALTER TABLE confirmations ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_contact
+        ON confirmations (contact_key) WHERE NOT deleted;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_idempotency
+        ON confirmations (idempotency_key) WHERE NOT deleted;
+    """
+
+    UPSERT = """
+    INSERT INTO confirmations (folio, name, email, will_attend, guests, phone, "timestamp", data,
+                               contact_key, idempotency_key, deleted, seq)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8::jsonb, $9, $10, FALSE, nextval('confirmations_seq'))
+    ON CONFLICT (folio) DO UPDATE SET
+        name = EXCLUDED.name, email = EXCLUDED.email, will_attend = EXCLUDED.will_attend,
+        guests = EXCLUDED.guests, phone = EXCLUDED.phone, "timestamp" = EXCLUDED."timestamp",
+        data = EXCLUDED.data, deleted = FALSE, seq = EXCLUDED.seq,
+        contact_key = COALESCE(EXCLUDED.contact_key, confirmations.contact_key),
+        idempotency_key = COALESCE(EXCLUDED.idempotency_key, confirmations.idempotency_key)
+    """
+    # Sin destino de conflicto: cubre folio, contact_key e idempotency_key
+    INSERT_UNIQUE = """
+    INSERT INTO confirmations (folio, name, email, will_attend, guests, phone, "timestamp", data,
+                               contact_key, idempotency_key, deleted, seq)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8::jsonb, $9, $10, FALSE, nextval('confirmations_seq'))
+    ON CONFLICT DO NOTHING
+    """
+    FIND_UNIQUE = ("SELECT data::text FROM confirmations WHERE NOT deleted"
+                   " AND (contact_key = $1 OR idempotency_key = $2) LIMIT 1")
+    DELETE = ("UPDATE confirmations SET deleted = TRUE, seq = nextval('confirmations_seq')"
+              " WHERE folio = $1 AND NOT deleted")
+    CLEAR = "UPDATE confirmations SET deleted = TRUE, seq = nextval('confirmations_seq') WHERE NOT deleted"
+    SELECT_DATA = "SELECT data::text FROM confirmations WHERE folio = $1 AND NOT deleted"
+    UPDATE_DATA = "UPDATE confirmations SET data = $2::jsonb, seq = nextval('confirmations_seq') WHERE folio = $1"
+    CHANGES = "SELECT seq, folio, data::text, deleted FROM confirmations WHERE seq > $1 ORDER BY seq"
+    # Incluye bajas lógicas: una tabla vaciada con DELETE ya no se vuelve a migrar
+    ANY_ROW = "SELECT EXISTS (SELECT 1 FROM confirmations)"
+    PING = "SELECT 1"
+
+    def __init__(self, url: str, min_size: int = 1, max_size: int = 10):
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def connect(self):
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("Se requiere asyncpg para usar PostgreSQL (pip install asyncpg)")
+        self.pool = await asyncpg.create_pool(self.url, min_size=self.min_size, max_size=self.max_size)
+        async with self.pool.acquire() as conn:
+            await conn.execute(self.SCHEMA)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def is_empty(self) -> bool:
+        async with self.pool.acquire() as conn:
+            return not await conn.fetchval(self.ANY_ROW)
+
+    async def ping(self):
+        """Una consulta trivial: falla si el servidor no responde"""
+        if self.pool is None:
+            raise RuntimeError("Sin conexión a PostgreSQL")
+        async with self.pool.acquire() as conn:
+            await conn.fetchval(self.PING)
+
+    async def upsert(self, rows: List[tuple]):
+        """rows: _row(...) + (contact_key, idempotency_key); None conserva los actuales"""
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", WRITE_LOCK_KEY)
+            await conn.executemany(self.UPSERT, rows)
+
+    async def insert_unique(self, row: tuple, contact: Optional[str], idempotency_key: Optional[str]) -> Optional[str]:
+        """Inserta la fila si no viola una llave única; si la viola, regresa el JSON existente"""
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", WRITE_LOCK_KEY)
+            status = await conn.execute(self.INSERT_UNIQUE, *row, contact, idempotency_key)
+            if status.endswith(" 1"):
+                return None
+            return await conn.fetchval(self.FIND_UNIQUE, contact, idempotency_key)
+
+    async def modify(self, key: str, change: Callable[[str], Optional[str]]) -> Tuple[bool, bool]:
+        """
+        Reescribe el JSON de una fila con change(data) dentro de la transacción
+        (None = sin cambios). Regresa (existe, cambió).
+        """
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", WRITE_LOCK_KEY)
+            data = await conn.fetchval(self.SELECT_DATA, key)
+            if data is None:
+                return False, False
+            updated = change(data)
+            if updated is None:
+                return True, False
+            await conn.execute(self.UPDATE_DATA, key, updated)
+            return True, True
+
+    async def delete(self, key: str) -> bool:
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", WRITE_LOCK_KEY)
+            status = await conn.execute(self.DELETE, key)
+        return status.endswith(" 1")
+
+    async def clear(self) -> int:
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", WRITE_LOCK_KEY)
+            status = await conn.execute(self.CLEAR)
+        return int(status.split()[-1])
+
+    async def changes_since(self, seq: int) -> List[Change]:
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(self.CHANGES, seq)
+        return [(row[0], row[1], row[2], row[3]) for row in rows]
+
+
+class SQLiteDriver:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS confirmations (
+        folio TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        will_attend INTEGER NOT NULL,
+        guests INTEGER NOT NULL DEFAULT 0,
+        phone TEXT NOT NULL DEFAULT '',
+        "timestamp" TEXT NOT NULL DEFAULT '',
+        data TEXT NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        seq INTEGER NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_folio ON confirmations (folio);
+    CREATE INDEX IF NOT EXISTS idx_confirmations_email ON confirmations (lower(email));
+    CREATE INDEX IF NOT EXISTS idx_confirmations_timestamp ON confirmations ("timestamp");
+    CREATE INDEX IF NOT EXISTS idx_confirmations_seq ON confirmations (seq);
+    """
+
+    NEXT_SEQ = "(SELECT COALESCE(MAX(seq), 0) + 1 FROM confirmations)"
+    UPSERT = f"""
+    INSERT INTO confirmations (folio, name, email, will_attend, guests, phone, "timestamp", data,
+                               contact_key, idempotency_key, deleted, seq)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, {NEXT_SEQ})
+    ON CONFLICT (folio) DO UPDATE SET
+        name = excluded.name, email = excluded.email, will_attend = excluded.will_attend,
+        guests = excluded.guests, phone = excluded.phone, "timestamp" = excluded."timestamp",
+        data = excluded.data, deleted = 0, seq = excluded.seq,
+        contact_key = COALESCE(excluded.contact_key, confirmations.contact_key),
+        idempotency_key = COALESCE(excluded.idempotency_key, confirmations.idempotency_key)
+    """
+    INSERT_UNIQUE = f"""
+    INSERT INTO confirmations (folio, name, email, will_attend, guests, phone, "timestamp", data,
+                               contact_key, idempotency_key, deleted, seq)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, {NEXT_SEQ})
+    ON CONFLICT DO NOTHING
+    """
+    FIND_UNIQUE = ("SELECT data FROM confirmations WHERE NOT deleted"
+                   " AND (contact_key = ? OR idempotency_key = ?) LIMIT 1")
+    UNIQUE_INDEXES = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_contact
+        ON confirmations (contact_key) WHERE NOT deleted;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_confirmations_idempotency
+        ON confirmations (idempotency_key) WHERE NOT deleted;
+    """
+    DELETE = f"UPDATE confirmations SET deleted = 1, seq = {NEXT_SEQ} WHERE folio = ? AND NOT deleted"
+    CLEAR = f"UPDATE confirmations SET deleted = 1, seq = {NEXT_SEQ} WHERE NOT deleted"
+    SELECT_DATA = "SELECT data FROM confirmations WHERE folio = ? AND NOT deleted"
+    UPDATE_DATA = f"UPDATE confirmations SET data = ?, seq = {NEXT_SEQ} WHERE folio = ?"
+    CHANGES = "SELECT seq, folio, data, deleted FROM confirmations WHERE seq > ? ORDER BY seq"
+    # Incluye bajas lógicas: una tabla vaciada con DELETE ya no se vuelve a migrar
+    ANY_ROW = "SELECT EXISTS (SELECT 1 FROM confirmations)"
+    PING = "SELECT 1 FROM confirmations LIMIT 1"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _run(self, fn):
+        # Una sola conexión compartida; sqlite3 serializa por el candado
+        def call():
+            with self._lock:
+                return fn(self.conn)
+        return asyncio.to_thread(call)
+
+    def _write(self, sql: str, params=(), many: bool = False):
+        def write(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount
+        return self._run(write)
+
+    async def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        # SQLite no tiene ADD COLUMN IF NOT EXISTS
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(confirmations)")}
+        for column in UNIQUE_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE confirmations ADD COLUMN {column} TEXT")
+        self.conn.executescript(self.UNIQUE_INDEXES)
+
+    async def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    async def is_empty(self) -> bool:
+        return not await self._run(lambda conn: conn.execute(self.ANY_ROW).fetchone()[0])
+
+    async def ping(self):
+        """Lee la tabla (SELECT 1 no tocaría el archivo): falla si la base no responde"""
+        if self.conn is None:
+            raise RuntimeError("Sin conexión a SQLite")
+        await self._run(lambda conn: conn.execute(self.PING).fetchone())
+
+    async def upsert(self, rows: List[tuple]):
+        await self._write(self.UPSERT, rows, many=True)
+
+    async def insert_unique(self, row: tuple, contact: Optional[str], idempotency_key: Optional[str]) -> Optional[str]:
+        def write(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = conn.execute(self.INSERT_UNIQUE, (*row, contact, idempotency_key)).rowcount
+                existing = None if inserted else \
+                    conn.execute(self.FIND_UNIQUE, (contact, idempotency_key)).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return existing[0] if existing else None
+        return await self._run(write)
+
+    async def modify(self, key: str, change: Callable[[str], Optional[str]]) -> Tuple[bool, bool]:
+        def write(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(self.SELECT_DATA, (key,)).fetchone()
+                updated = change(row[0]) if row else None
+                if updated is not None:
+                    conn.execute(self.UPDATE_DATA, (updated, key))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return row is not None, updated is not None
+        return await self._run(write)
+
+    async def delete(self, key: str) -> bool:
+        return await self._write(self.DELETE, (key,)) > 0
+
+    async def clear(self) -> int:
+        return await self._write(self.CLEAR)
+
+    async def changes_since(self, seq: int) -> List[Change]:
+        rows = await self._run(lambda conn: conn.execute(self.CHANGES, (seq,)).fetchall())
+        return [(row[0], row[1], row[2], bool(row[3])) for row in rows]
+
+
+# ----------------------------------------------------------------------
+# Store
+# ----------------------------------------------------------------------
+class SQLConfirmationStore:
+    def __init__(self, driver, data_dir: Optional[str] = None, poll_interval: float = 1.0):
+        self.driver = driver
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+
+        self._records: Dict[str, dict] = {}
+        self._indexes = ConfirmationIndexes()
+        self._seq = 0
+        self._lock = threading.RLock()
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._anonymous = 0
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self._version = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    async def start(self):
+        """Conecta, migra los archivos si la tabla está vacía y carga la copia en memoria"""
+        self._sync_lock = asyncio.Lock()
+        self._loop = asyncio.get_running_loop()
+        await self.driver.connect()
+        if self.data_dir and await self.driver.is_empty():
+            await self.migrate_from_files()
+        await self._sync()
+        self._poller = asyncio.create_task(self._poll_loop())
+        print(f"🐘 Confirmaciones en {type(self.driver).__name__}: {len(self._records)} registros")
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        await self.driver.close()
+        self._loop = None
+
+    async def migrate_from_files(self) -> int:
+        """Importa data/confirmations.jsonl (o confirmations.json) a la tabla"""
+        from confirmation_store import ConfirmationStore, LEGACY_FILENAME, LOG_FILENAME
+
+        if not any(os.path.exists(os.path.join(self.data_dir, name))
+                   for name in (LOG_FILENAME, LEGACY_FILENAME)):
+            return 0
+        file_store = ConfirmationStore(self.data_dir)
+        try:
+            await asyncio.to_thread(file_store.open)
+            records = list(file_store._records.items())
+        finally:
+            file_store.close()
+        # Llaves únicas para que el dedup reconozca a los migrados; con
+        # llaves repetidas (registros de antes del dedup) gana el primero
+        rows = []
+        contacts, idempotency_keys = set(), set()
+        for key, record in records:
+            contact = contact_key(record.get("email"), record.get("phone")) or None
+            idempotency_key = record.get("idempotency_key") or None
+            if contact in contacts:
+                contact = None
+            if idempotency_key in idempotency_keys:
+                idempotency_key = None
+            contacts.add(contact)
+            idempotency_keys.add(idempotency_key)
+            rows.append((*_row(key, record), contact, idempotency_key))
+        if rows:
+            await self.driver.upsert(rows)
+        print(f"📥 Migradas {len(rows)} confirmaciones desde {self.data_dir} a la base de datos")
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Lecturas (siempre desde memoria)
+    # ------------------------------------------------------------------
+    def get(self, folio: str) -> Optional[dict]:
+        """
+        Busca en la copia en memoria. Llamado desde un hilo (p. ej. el outbox),
+        si no está se espera un _sync en el event loop; en el event loop, usar
+        fetch() (aquí no se puede esperar a la base de datos).
+        """
+        record = self._records.get(folio)
+        if record is not None or not folio or self._loop is None:
+            return record
+        try:
+            asyncio.get_running_loop()
+            return None
+        except RuntimeError:
+            pass
+        future = asyncio.run_coroutine_threadsafe(self._sync(), self._loop)
+        try:
+            future.result(timeout=30)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return None
+        except Exception as e:
+            print(f"❌ Error sincronizando confirmaciones: {str(e)}")
+            return None
+        return self._records.get(folio)
+
+    async def fetch(self, folio: str) -> Optional[dict]:
+        """Como get(), pero si el folio no está en memoria se sincroniza con la base de datos"""
+        record = self._records.get(folio)
+        if record is None and folio:
+            await self._sync()
+            record = self._records.get(folio)
+        return record
+
+    def all(self) -> List[dict]:
+        with self._lock:
+            return list(self._records.values())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def query(self, **filters) -> dict:
+        with self._lock:
+            return self._indexes.query(self._records, **filters)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._indexes.stats.snapshot()
+
+    @property
+    def version(self) -> int:
+        """Como ConfirmationStore.version: avanza en cada _sync que aplica cambios"""
+        return self._version
+
+    @property
+    def sequence(self) -> Tuple[str, int]:
+        """Como ConfirmationStore.sequence: el último seq aplicado (una sola generación)"""
+        return "0", self._seq
+
+    async def ping(self):
+        """Comprueba que la base de datos responde (healthcheck)"""
+        await self.driver.ping()
+
+    def add_listener(self, callback: Callable[[List[dict]], None]):
+        """Como ConfirmationStore.add_listener: recibe los cambios que aplica _sync"""
+        self._listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+    async def add(self, record: dict) -> dict:
+        await self.driver.upsert([(*_row(self._key_for(record), record), None, None)])
+        await self._sync()
+        return record
+
+    async def add_unique(self, record: dict, dedup: bool = True) -> Tuple[dict, bool]:
+        """Como ConfirmationStore.add_unique; los índices únicos de la tabla cubren a los demás workers"""
+        with self._lock:
+            existing = self._indexes.find_duplicate(record, dedup)
+            if existing is not None and existing in self._records:
+                return self._records[existing], False
+        contact = contact_key(record.get("email"), record.get("phone")) if dedup else ""
+        data = await self.driver.insert_unique(
+            _row(self._key_for(record), record), contact or None, record.get("idempotency_key")
+        )
+        await self._sync()
+        if data is None:
+            return record, True
+        return Confirmation.from_dict(fast_json.loads(data)), False
+
+    async def check_in(self, folio: str, at: str, by: Optional[str] = None) -> Tuple[Optional[dict], bool]:
+        """Como ConfirmationStore.check_in; la llegada se resuelve dentro de la transacción"""
+        def change(data: str) -> Optional[str]:
+            updated = Confirmation.from_dict(fast_json.loads(data)).checked_in(at, by)
+            return None if updated is None else fast_json.dumps(updated).decode('utf-8')
+
+        found, changed = await self.driver.modify(folio, change)
+        await self._sync()
+        return (self._records.get(folio) if found else None), changed
+
+    async def delete(self, folio: str) -> bool:
+        deleted = await self.driver.delete(folio)
+        await self._sync()
+        return deleted
+
+    async def clear(self) -> int:
+        deleted_count = await self.driver.clear()
+        await self._sync()
+        return deleted_count
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+    def _key_for(self, record: dict) -> str:
+        folio = record.get("folio")
+        if folio:
+            return folio
+        with self._lock:
+            self._anonymous += 1
+            return f"_sin_folio_{self._anonymous}"
+
+    async def _sync(self):
+        """Aplica a la copia en memoria los cambios con seq mayor al último visto"""
+        async with self._sync_lock:
+            changes = await self.driver.changes_since(self._seq)
+            if not changes:
+                return
+            applied = []
+            with self._lock:
+                for seq, key, data, deleted in changes:
+                    key = sys.intern(key)
+                    previous = self._records.pop(key, None)
+                    record = None if deleted else Confirmation.from_dict(fast_json.loads(data))
+                    if previous is not None and record is not None and self._indexes.same_entry(previous, record):
+                        # Solo cambió algo no indexado (p. ej. la llegada): O(1)
+                        self._records[key] = record
+                    else:
+                        if previous is not None:
+                            self._indexes.remove(key, previous)
+                        if record is not None:
+                            self._records[key] = record
+                            self._indexes.add(key, record)
+                    if record is not None:
+                        if key.startswith("_sin_folio_") and key[11:].isdigit():
+                            self._anonymous = max(self._anonymous, int(key[11:]))
+                        applied.append({"type": "updated" if previous is not None else "created",
+                                        "folio": key, "record": record})
+                    elif previous is not None:
+                        applied.append({"type": "deleted", "folio": key, "record": previous})
+                    self._seq = max(self._seq, seq)
+                self._version += 1
+            if applied:
+                for callback in self._listeners:
+                    try:
+                        callback(applied)
+                    except Exception as e:
+                        print(f"❌ Error notificando cambios de confirmaciones: {str(e)}")
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error sincronizando confirmaciones: {str(e)}")
+
+
+def create_store(data_dir: str):
+    """
+    Store según el entorno: DATABASE_URL (postgresql://... o sqlite:///...)
+    usa la base de datos; sin ella, o con STORAGE_BACKEND=file, el log en data/.
+    """
+    from confirmation_store import ConfirmationStore
+
+    url = os.getenv("DATABASE_URL", "")
+    if not url or os.getenv("STORAGE_BACKEND", "").lower() == "file":
+        return ConfirmationStore(data_dir)
+
+    poll_interval = float(os.getenv("STORE_POLL_INTERVAL", "1.0"))
+    if url.startswith(("postgres://", "postgresql://")):
+        driver = PostgresDriver(
+            url,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        )
+    elif url.startswith("sqlite:///"):
+        driver = SQLiteDriver(url[len("sqlite:///"):])
+    else:
+        raise ValueError(f"DATABASE_URL no soportada: {url.split(':', 1)[0]}")
+    return SQLConfirmationStore(driver, data_dir, poll_interval=poll_interval)
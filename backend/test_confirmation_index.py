@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Prueba de los índices secundarios contra una búsqueda por fuerza bruta
+
+Con registros aleatorios (acentos, teléfonos con formato, fechas repetidas,
+altas y bajas intercaladas para que se depuren los trigramas) cada consulta
+de ConfirmationIndexes.query, recorrida página por página con el cursor, debe
+regresar los mismos folios, en el mismo orden y con el mismo total que filtrar
+y ordenar todos los registros a mano.
+
+    python test_confirmation_index.py      (o con pytest)
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from confirmation_index import (
+    SORT_FIELDS, ConfirmationIndexes, _sort_value, normalize_phone, normalize_text,
+)
+from confirmation_record import Confirmation
+
+NAMES = ["José Pérez", "Ana María López", "JOSÉ ÁLVAREZ", "Zoë Núñez", "Luis", "ana lopez", "Ñoño Gómez"]
+DOMAINS = ["mail.com", "Correo.MX", "example.org"]
+
+
+def random_record(rng: random.Random, n: int) -> Confirmation:
+    day = rng.randint(1, 5)
+    return Confirmation.from_dict({
+        "folio": f"UP-2025110{day}-{n:06X}",
+        "name": f"{rng.choice(NAMES)} {rng.randint(1, 40)}",
+        "email": f"{rng.choice(['ana', 'jose', 'luis'])}{n % 50}@{rng.choice(DOMAINS)}",
+        "will_attend": rng.random() < 0.7,
+        "guests": rng.randint(0, 4),
+        "phone": rng.choice(["+52 33 ", "33-", "(33) "]) + f"{rng.randint(0, 99999999):08d}",
+        "comments": None,
+        "privacy_accept": True,
+        "timestamp": f"2025-11-0{day}T{rng.randint(8, 20):02d}:{rng.randint(0, 59):02d}:00",
+    })
+
+
+def brute_force(records, will_attend=None, date_from=None, date_to=None, name=None, email=None,
+                phone=None, folio_prefix=None, sort="timestamp", descending=True):
+    """Folios que cumplen los filtros, en el orden del listado, recorriendo todo"""
+    result = []
+    for key, record in records.items():
+        timestamp = str(record.get("timestamp") or "")
+        if will_attend is not None and bool(record.get("will_attend")) != will_attend:
+            continue
+        if date_from and timestamp < date_from:
+            continue
+        if date_to and timestamp >= date_to + "\uffff":
+            continue
+        if folio_prefix and not (folio_prefix <= key < folio_prefix + "\uffff"):
+            continue
+        if name and normalize_text(name) not in normalize_text(record.get("name")):
+            continue
+        if email and normalize_text(email) not in normalize_text(record.get("email")):
+            continue
+        if phone and normalize_phone(phone) not in normalize_phone(record.get("phone")):
+            continue
+        result.append((_sort_value(sort, record), key))
+    result.sort(reverse=descending)
+    return [key for _, key in result]
+
+
+def paged(indexes, records, limit, **filters):
+    """Todas las páginas de query() siguiendo next_cursor"""
+    folios, cursor, total = [], None, None
+    while True:
+        page = indexes.query(records, cursor=cursor, limit=limit, **filters)
+        if total is None:
+            total = page["total"]
+        folios.extend(record.get("folio") for record in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return folios, total
+
+
+def random_filters(rng: random.Random) -> dict:
+    filters = {"sort": rng.choice(SORT_FIELDS), "descending": rng.random() < 0.5}
+    if rng.random() < 0.4:
+        filters["will_attend"] = rng.random() < 0.5
+    if rng.random() < 0.3:
+        filters["date_from"] = f"2025-11-0{rng.randint(1, 5)}"
+    if rng.random() < 0.3:
+        filters["date_to"] = f"2025-11-0{rng.randint(1, 5)}"
+    if rng.random() < 0.3:
+        filters["name"] = rng.choice(["jose", "JOSÉ", "ana", "lópez", "ñ", "zoe", "no existe"])
+    if rng.random() < 0.2:
+        filters["email"] = rng.choice(["ana", "@correo.mx", "jose1", "MAIL"])
+    if rng.random() < 0.2:
+        filters["phone"] = rng.choice(["33", "+52 33", "12", "(33) 0"])
+    if rng.random() < 0.2:
+        filters["folio_prefix"] = rng.choice(["UP-20251101", "UP-2025110", "UP-20251103-0"])
+    return filters
+
+
+def check_queries(rng: random.Random, indexes, records, rounds: int):
+    for _ in range(rounds):
+        filters = random_filters(rng)
+        expected = brute_force(records, **filters)
+        folios, total = paged(indexes, records, rng.choice([3, 7, 50, 1000]), **filters)
+        assert folios == expected, f"{filters}: {len(folios)} folios, se esperaban {len(expected)}"
+        assert total == len(expected), f"{filters}: total {total}, se esperaban {len(expected)}"
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(2025)
+    records = {}
+    indexes = ConfirmationIndexes()
+    for n in range(3000):
+        record = random_record(rng, n)
+        records[record.folio] = record
+        indexes.add(record.folio, record)
+        # Bajas y cambios intercalados (más de 1000 bajas: depura los trigramas)
+        if n % 3 == 0 and len(records) > 10:
+            key = rng.choice(list(records))
+            indexes.remove(key, records.pop(key))
+        elif n % 7 == 0:
+            key = rng.choice(list(records))
+            previous = records[key]
+            changed = Confirmation.from_dict({**previous.to_dict(), "name": rng.choice(NAMES),
+                                              "will_attend": not previous.will_attend})
+            indexes.remove(key, previous)
+            indexes.add(key, changed)
+            records[key] = changed
+    check_queries(rng, indexes, records, rounds=200)
+    # El mismo resultado reconstruyendo los índices de una vez
+    check_queries(rng, ConfirmationIndexes.build(records), records, rounds=50)
+
+
+def test_stats_match_brute_force():
+    rng = random.Random(7)
+    records = {}
+    indexes = ConfirmationIndexes()
+    for n in range(500):
+        record = random_record(rng, n)
+        records[record.folio] = record
+        indexes.add(record.folio, record)
+        if n % 4 == 0:
+            key = rng.choice(list(records))
+            indexes.remove(key, records.pop(key))
+    stats = indexes.stats.snapshot()
+    attending = [r for r in records.values() if r.will_attend]
+    assert stats["total_registrations"] == len(records)
+    assert stats["confirmed"] == len(attending)
+    assert stats["declined"] == len(records) - len(attending)
+    assert stats["total_guests"] == sum(r.guests for r in attending)
+    assert stats["total_people"] == sum(1 + r.guests for r in attending)
+
+
+if __name__ == "__main__":
+    print("🧪 Probando índices de confirmaciones contra fuerza bruta...")
+    test_query_matches_brute_force()
+    test_stats_match_brute_force()
+    print("✅ Consultas, paginación y contadores coinciden")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Prueba del log de confirmaciones con varios procesos (como los workers de uvicorn)
+
+Cada proceso agrega, elimina y compacta el mismo log mientras los demás se
+ponen al día; al final todos deben tener en memoria exactamente lo que hay en
+disco. Las compactaciones seguidas reutilizan números de inode, así que un
+worker que solo comparara el inode leería el log nuevo desde un offset viejo.
+
+    python test_confirmation_store.py      (o con pytest)
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from confirmation_store import ConfirmationStore
+
+WORKERS = 4
+ROUNDS = 40
+
+
+def record(worker: int, round_: int, n: int) -> dict:
+    return {
+        "folio": f"T-{worker}-{round_}-{n}",
+        "name": f"Invitado {worker}-{round_}-{n}",
+        "email": f"w{worker}r{round_}n{n}@example.com",
+        "phone": f"33{worker}{round_:03d}{n}",
+        "will_attend": n % 2 == 0,
+        "guests": n % 3,
+        "timestamp": f"2025-10-{1 + round_ % 28:02d}T12:00:{n:02d}",
+    }
+
+
+def worker(data_dir: str, index: int, barrier, results):
+    store = ConfirmationStore(data_dir, fsync=False)
+    store.open()
+    for round_ in range(ROUNDS):
+        # Sin event loop: el mismo commit que usa el group commit
+        store.commit([{"op": "put", "data": record(index, round_, n)} for n in range(5)])
+        store.commit([{"op": "del", "key": f"T-{index}-{round_}-{n}"} for n in range(3)])
+        # Compactar seguido (y a destiempo entre workers) para reutilizar inodes
+        if (round_ + index) % 3 == 0:
+            store.compact()
+        elif round_ % 4 == index % 4:
+            store.get("T-0-0-0")  # ponerse al día solo de vez en cuando
+    barrier.wait()
+    results[index] = sorted(record.get("folio") for record in store.all())
+    store.close()
+
+
+def test_multiprocess_compaction_catch_up():
+    data_dir = tempfile.mkdtemp()
+    ConfirmationStore(data_dir).open()
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        barrier = manager.Barrier(WORKERS)
+        results = manager.dict()
+        processes = [context.Process(target=worker, args=(data_dir, i, barrier, results))
+                     for i in range(WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+            assert process.exitcode == 0, f"worker terminó con {process.exitcode}"
+        results = dict(results)
+
+    on_disk = ConfirmationStore(data_dir)
+    on_disk.open()
+    expected = sorted(record.get("folio") for record in on_disk.all())
+    on_disk.close()
+    assert len(expected) == WORKERS * ROUNDS * 2
+    for index, folios in results.items():
+        missing = set(expected) - set(folios)
+        extra = set(folios) - set(expected)
+        assert not missing and not extra, (
+            f"worker {index}: {len(folios)} en memoria, {len(expected)} en disco, "
+            f"{len(missing)} faltan, {len(extra)} sobran")
+
+
+if __name__ == "__main__":
+    print("🧪 Probando compactación y puesta al día entre procesos...")
+    test_multiprocess_compaction_catch_up()
+    print("✅ Todos los workers coinciden con el log en disco")